@@ -0,0 +1,69 @@
+"""Cold-start benchmark of the Lambda handler.
+
+    python -m benchmarks.coldstart --runs 10
+
+Every run starts a fresh interpreter, imports the handler and invokes one
+route for the first time.  Reports the median import time, first invocation
+time and whether boto3 has been imported per route.  /dns runs against the
+in-memory providers, so it measures the handler's own import graph.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from dynamicdns.aws.functions import handler
+imported = time.perf_counter()
+event = json.loads(sys.argv[1])
+if event['resource'] == '/dns':
+    import dynamicdns.backend
+    from dynamicdns.memory import MemoryConfigProvider, MemoryDNSProvider
+    config = { 'host.bench.example.com': { 'route_53_region': 'us-east-1', 'route_53_zone_id': 'ZONE',
+        'route_53_record_ttl': 300, 'route_53_record_type': 'A', 'shared_secret': 'secret' } }
+    providers = (MemoryConfigProvider(config), MemoryDNSProvider())
+    dynamicdns.backend.use(lambda: providers)
+invoked = time.perf_counter()
+handler.handle(event, {})
+done = time.perf_counter()
+print(json.dumps({ 'import': imported - start, 'invoke': done - invoked, 'boto3': 'boto3' in sys.modules }))
+"""
+
+
+EVENTS = [
+    { 'resource': '/version', 'httpMethod': 'GET' },
+    { 'resource': '/myip', 'httpMethod': 'GET', 'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } } },
+    { 'resource': '/script', 'httpMethod': 'GET' },
+    { 'resource': '/dns', 'httpMethod': 'POST', 'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } },
+        'queryStringParameters': { 'raw': '', 'hostname': 'host.bench.example.com',
+            'hash': '0000000000000000000000000000000000000000000000000000000000000000' } }
+]
+
+
+def probe(event: dict):
+    output = subprocess.run([sys.executable, '-c', PROBE, json.dumps(event)], check=True, stdout=subprocess.PIPE).stdout
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold-start benchmark of the Lambda handler.')
+    parser.add_argument('--runs', type=int, default=10, help='fresh interpreters per route')
+    args = parser.parse_args()
+
+    print("%-10s %12s %12s %8s" % ('route', 'import ms', 'invoke ms', 'boto3'))
+    for event in EVENTS:
+        results = [ probe(event) for _ in range(args.runs) ]
+        print("%-10s %12.1f %12.1f %8s" % (
+            event['resource'],
+            statistics.median(result['import'] for result in results) * 1000,
+            statistics.median(result['invoke'] for result in results) * 1000,
+            'yes' if any(result['boto3'] for result in results) else 'no'
+        ))
+
+
+if __name__ == '__main__':
+    main()
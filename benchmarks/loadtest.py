@@ -0,0 +1,127 @@
+"""Load test of the /dns route against the in-memory providers.
+
+    python -m benchmarks.loadtest --rate 500 --hosts 100 --duration 10
+
+Drives handler.handle with synthetic API Gateway events at a target request
+rate spread over N hostnames and reports throughput and p50/p95/p99 latency
+per stage (config load, hash check, read, update, response) as recorded by
+dynamicdns.metrics.  With --sqlite the requests run against a SQLite
+database instead, seeded with the same hosts and records.
+"""
+import argparse
+import hashlib
+import math
+import random
+import time
+
+import dynamicdns.backend
+import dynamicdns.sqlite
+
+from dynamicdns import metrics
+from dynamicdns.aws.functions import handler
+from dynamicdns.memory import Simulation, MemoryConfigProvider, MemoryDNSProvider
+
+
+STAGES = ['config', 'hashcheck', 'read', 'update', 'response', 'total']
+
+
+def percentile(values: list, p: float):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[max(0, math.ceil(p / 100.0 * len(values)) - 1)]
+
+
+def event(hostname: str, sourceip: str, sharedsecret: str):
+    return {
+        'resource': '/dns',
+        'httpMethod': 'POST',
+        'queryStringParameters': {
+            'raw': '',
+            'hostname': hostname,
+            'hash': hashlib.sha256((sourceip + hostname + sharedsecret).encode('utf-8')).hexdigest()
+        },
+        'requestContext': { 'identity': { 'sourceIp': sourceip } }
+    }
+
+
+def run(args):
+    hostnames = [ 'host' + str(i) + '.bench.example.com' for i in range(args.hosts) ]
+    config = { hostname: {
+        'route_53_region': 'us-east-1',
+        'route_53_zone_id': 'ZONE',
+        'route_53_record_ttl': 300,
+        'route_53_record_type': 'A',
+        'shared_secret': 'secret-' + hostname
+    } for hostname in hostnames }
+    addresses = { hostname: '10.0.' + str(i // 256 % 256) + '.' + str(i % 256) for i, hostname in enumerate(hostnames) }
+
+    samples = { stage: [] for stage in STAGES }
+    def collect(recorder: metrics.Metrics):
+        for stage in STAGES:
+            samples[stage].append(recorder.durations.get(stage, 0.0))
+
+    simulation = Simulation(args.latency, args.error_rate, args.max_rate)
+    config_provider = MemoryConfigProvider(config, simulation)
+    dns_provider = MemoryDNSProvider(addresses, simulation)
+    providers = lambda: (config_provider, dns_provider)
+    if args.sqlite:
+        database = dynamicdns.sqlite.database(args.sqlite)
+        dynamicdns.sqlite.import_config(database, config)
+        config_provider = dynamicdns.sqlite.SQLiteConfigProvider(database)
+        dynamicdns.sqlite.SQLiteDNSProvider(database, config_provider).update_batch(addresses)
+        def providers():
+            sqlite_config = dynamicdns.sqlite.SQLiteConfigProvider(database)
+            return sqlite_config, dynamicdns.sqlite.SQLiteDNSProvider(database, sqlite_config)
+
+    previous = (dynamicdns.backend.current, dynamicdns.backend.current_queue, dynamicdns.backend.current_buckets, dynamicdns.backend.current_nonces, metrics.mode, metrics.sink)
+    dynamicdns.backend.use(providers)
+    metrics.configure('collect', collect)
+    failures = 0
+    try:
+        interval = 1.0 / args.rate
+        started = time.perf_counter()
+        deadline = started + args.duration
+        scheduled = started
+        requests = 0
+        while scheduled < deadline:
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+            hostname = random.choice(hostnames)
+            if random.random() < args.change_rate:
+                addresses[hostname] = '10.1.' + str(random.randint(0, 255)) + '.' + str(random.randint(1, 254))
+
+            response = handler.handle(event(hostname, addresses[hostname], config[hostname]['shared_secret']), {})
+            if not response['body'].startswith('SUCCESS'):
+                failures += 1
+            requests += 1
+            scheduled += interval
+        elapsed = time.perf_counter() - started
+    finally:
+        dynamicdns.backend.use(previous[0], previous[1], previous[2], previous[3])
+        metrics.configure(previous[4], previous[5])
+
+    print("requests:   %d (%d failed, %d throttled)" % (requests, failures, simulation.throttled))
+    print("throughput: %.1f req/s (target %.1f req/s)" % (requests / elapsed, args.rate))
+    print("%-10s %10s %10s %10s" % ('stage', 'p50 ms', 'p95 ms', 'p99 ms'))
+    for stage in STAGES:
+        print("%-10s %10.3f %10.3f %10.3f" % (stage, percentile(samples[stage], 50) * 1000, percentile(samples[stage], 95) * 1000, percentile(samples[stage], 99) * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test of the /dns route against the in-memory providers.')
+    parser.add_argument('--rate', type=float, default=200.0, help='target requests per second')
+    parser.add_argument('--hosts', type=int, default=100, help='number of hostnames the requests are spread over')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds to run')
+    parser.add_argument('--change-rate', type=float, default=0.05, help='share of requests carrying a new ip address')
+    parser.add_argument('--latency', type=float, default=0.0, help='simulated seconds per provider call')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of provider calls failing')
+    parser.add_argument('--max-rate', type=float, default=0.0, help='provider calls per second before throttling (0 disables)')
+    parser.add_argument('--sqlite', help='SQLite database file to run against instead of the in-memory providers')
+    run(parser.parse_args())
+
+
+if __name__ == '__main__':
+    main()
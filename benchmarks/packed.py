@@ -0,0 +1,96 @@
+"""Benchmark of the packed configuration against the JSON configuration.
+
+    python -m benchmarks.packed --sizes 10,1000,100000,1000000
+
+Writes a configuration of N hostnames as JSON and as packed configuration,
+then every run starts a fresh interpreter that loads one of them the way a
+cold container does (s3config.parse of the JSON document, packed.mapping of
+the packed file) and looks up random hostnames.  Reports the median load
+time, lookup time and growth of the resident memory (Linux) per format and
+size, split into private memory and pages of mapped files.  Mapped pages are
+shared with the page cache and reclaimable, and depend on the read-ahead of
+the kernel rather than on the lookups.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from dynamicdns import packed
+
+
+PROBE = """
+import json, random, sys, time
+from dynamicdns import packed
+from dynamicdns.aws import s3config
+format, path, hosts = sys.argv[1], sys.argv[2], int(sys.argv[3])
+def resident():
+    with open('/proc/self/status') as file:
+        fields = dict(line.split(':', 1) for line in file)
+    return [ int(fields[name].split()[0]) * 1024 for name in ('RssAnon', 'RssFile') ]
+hostnames = [ 'host' + str(random.randrange(hosts)) + '.bench.example.com' for _ in range(1000) ]
+before = resident()
+start = time.perf_counter()
+if format == 'json':
+    with open(path) as file:
+        config = s3config.parse(file.read())
+else:
+    config = packed.mapping(path)
+loaded = time.perf_counter()
+for hostname in hostnames:
+    config.get(hostname).shared_secret
+done = time.perf_counter()
+after = resident()
+print(json.dumps({ 'load': loaded - start, 'lookup': (done - loaded) / len(hostnames), 'private': after[0] - before[0], 'mapped': after[1] - before[1] }))
+"""
+
+
+def generate(hosts: int):
+    return { 'host' + str(i) + '.bench.example.com': {
+        'route_53_region': 'us-east-1',
+        'route_53_zone_id': 'ZONE' + str(i % 16),
+        'route_53_record_ttl': 300,
+        'route_53_record_type': 'A',
+        'shared_secret': 'secret-%032d' % i
+    } for i in range(hosts) }
+
+
+def probe(format: str, path: str, hosts: int):
+    output = subprocess.run([sys.executable, '-c', PROBE, format, path, str(hosts)], check=True, stdout=subprocess.PIPE).stdout
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the packed configuration against the JSON configuration.')
+    parser.add_argument('--sizes', default='10,1000,100000,1000000', help='comma separated numbers of hostnames')
+    parser.add_argument('--runs', type=int, default=3, help='fresh interpreters per format and size')
+    args = parser.parse_args()
+
+    print("%-8s %9s %10s %10s %12s %12s %12s" % ('format', 'hosts', 'file MB', 'load ms', 'lookup us', 'private MB', 'mapped MB'))
+    with tempfile.TemporaryDirectory() as directory:
+        for hosts in [ int(size) for size in args.sizes.split(',') ]:
+            config = generate(hosts)
+            paths = { 'json': os.path.join(directory, 'config.json'), 'packed': os.path.join(directory, 'config.packed') }
+            with open(paths['json'], 'w') as file:
+                json.dump(config, file)
+            packed.write(config, paths['packed'])
+            del config
+
+            for format, path in paths.items():
+                results = [ probe(format, path, hosts) for _ in range(args.runs) ]
+                print("%-8s %9d %10.1f %10.3f %12.2f %12.1f %12.1f" % (
+                    format,
+                    hosts,
+                    os.path.getsize(path) / 1048576,
+                    statistics.median(result['load'] for result in results) * 1000,
+                    statistics.median(result['lookup'] for result in results) * 1000000,
+                    statistics.median(result['private'] for result in results) / 1048576,
+                    statistics.median(result['mapped'] for result in results) / 1048576
+                ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Throughput of the self-hosted server compared with Lambda-style execution.
+
+    python -m benchmarks.server --requests 2000 --clients 64 --latency 0.005
+
+Lambda-style runs handler.handle once per request, one request after the
+other, as a single container does.  The server run starts dynamicdns.server
+in-process and drives it with --clients concurrent keep-alive connections.
+Both run /dns against the in-memory providers, --latency simulates the
+seconds of each S3 and Route 53 call.  Reports throughput and p50/p95/p99
+latency per mode.
+"""
+import argparse
+import asyncio
+import random
+import time
+import urllib.parse
+
+import dynamicdns.backend
+
+from dynamicdns import ratelimit, server
+from dynamicdns.aws.functions import handler
+from dynamicdns.memory import Simulation, MemoryConfigProvider, MemoryDNSProvider
+
+from benchmarks.loadtest import event, percentile
+
+
+def setup(args):
+    hostnames = [ 'host' + str(i) + '.bench.example.com' for i in range(args.hosts) ]
+    config = { hostname: {
+        'route_53_region': 'us-east-1',
+        'route_53_zone_id': 'ZONE',
+        'route_53_record_ttl': 300,
+        'route_53_record_type': 'A',
+        'shared_secret': 'secret-' + hostname
+    } for hostname in hostnames }
+    simulation = Simulation(args.latency)
+    providers = (MemoryConfigProvider(config, simulation), MemoryDNSProvider({ hostname: '127.0.0.1' for hostname in hostnames }, simulation))
+    dynamicdns.backend.use(lambda: providers)
+    return [ event(hostname, '127.0.0.1', 'secret-' + hostname) for hostname in [ random.choice(hostnames) for _ in range(args.requests) ] ]
+
+
+def lambda_style(events: list):
+    latencies = []
+    failures = 0
+    started = time.perf_counter()
+    for request in events:
+        start = time.perf_counter()
+        if not handler.handle(request, {})['body'].startswith('SUCCESS'):
+            failures += 1
+        latencies.append(time.perf_counter() - start)
+    return time.perf_counter() - started, latencies, failures
+
+
+async def client(port: int, events: list, latencies: list, failures: list):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    for request in events:
+        start = time.perf_counter()
+        target = request['resource'] + "?" + urllib.parse.urlencode(request['queryStringParameters'])
+        writer.write((request['httpMethod'] + " " + target + " HTTP/1.1\r\nHost: bench\r\nContent-Length: 0\r\n\r\n").encode('latin-1'))
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = [ int(line.split(b":")[1]) for line in head.split(b"\r\n") if line.lower().startswith(b"content-length:") ][0]
+        if not (await reader.readexactly(length)).startswith(b'SUCCESS'):
+            failures.append(request)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+
+async def served(events: list, args):
+    instance = server.Server(args.workers, args.concurrency, 5.0)
+    listener = await instance.start('127.0.0.1', 0)
+    port = listener.sockets[0].getsockname()[1]
+    latencies = []
+    failures = []
+    started = time.perf_counter()
+    await asyncio.gather(*[ client(port, events[i::args.clients], latencies, failures) for i in range(args.clients) ])
+    elapsed = time.perf_counter() - started
+    listener.close()
+    await listener.wait_closed()
+    instance.close()
+    return elapsed, latencies, len(failures)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Throughput of the self-hosted server compared with Lambda-style execution.')
+    parser.add_argument('--requests', type=int, default=2000, help='requests per mode')
+    parser.add_argument('--hosts', type=int, default=100, help='number of hostnames the requests are spread over')
+    parser.add_argument('--clients', type=int, default=64, help='concurrent keep-alive connections of the server run')
+    parser.add_argument('--workers', type=int, default=32, help='worker threads of the server')
+    parser.add_argument('--concurrency', type=int, default=256, help='requests the server executes at once')
+    parser.add_argument('--latency', type=float, default=0.005, help='simulated seconds per provider call')
+    args = parser.parse_args()
+
+    previous = (dynamicdns.backend.current, dynamicdns.backend.current_queue, dynamicdns.backend.current_buckets, dynamicdns.backend.current_nonces)
+    try:
+        events = setup(args)
+        results = [ ('lambda', lambda_style(events)) ]
+        ratelimit.buckets.clear()
+        results.append(('server', asyncio.run(served(events, args))))
+    finally:
+        dynamicdns.backend.use(previous[0], previous[1], previous[2], previous[3])
+
+    print("%-8s %10s %10s %12s %10s %10s %10s" % ('mode', 'requests', 'failed', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms'))
+    for mode, (elapsed, latencies, failures) in results:
+        print("%-8s %10d %10d %12.1f %10.3f %10.3f %10.3f" % (mode, len(latencies), failures, len(latencies) / elapsed,
+            percentile(latencies, 50) * 1000, percentile(latencies, 95) * 1000, percentile(latencies, 99) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import os
+import threading
+
+from dynamicdns.models import ConfigProvider, DNSProvider, AsyncConfigProvider, AsyncDNSProvider
+
+
+class WorkerPool:
+    """Threads running the blocking calls of adapted providers, created on first use and shared by all requests of a process"""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.executor = None
+
+    def submit(self, function, *args):
+        """Run function in a worker, within the context (e.g. the metrics) of the caller.  Returns an awaitable"""
+        if self.executor is None:
+            with self.lock:
+                if self.executor is None:
+                    self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='dynamicdns-aio')
+        call = functools.partial(contextvars.copy_context().run, function, *args)
+        return asyncio.get_event_loop().run_in_executor(self.executor, call)
+
+    def reset(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False)
+            self.executor = None
+
+
+pool = WorkerPool(int(os.environ.get('AIO_WORKERS', '8')))
+
+
+loops = threading.local()
+
+
+def run(coroutine):
+    """Result of a coroutine, for sync callers.  Runs on an event loop per thread, created on first use and kept for the following calls"""
+    loop = getattr(loops, 'loop', None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        loops.loop = loop
+    return loop.run_until_complete(coroutine)
+
+
+def config(provider):
+    """Async view of a ConfigProvider.  Returns AsyncConfigProvider"""
+    if isinstance(provider, AsyncConfigProvider):
+        return provider
+    if isinstance(provider, SyncConfigAdapter):
+        return provider.config
+    return AsyncConfigAdapter(provider)
+
+
+def dns(provider):
+    """Async view of a DNSProvider.  Returns AsyncDNSProvider"""
+    if isinstance(provider, AsyncDNSProvider):
+        return provider
+    if isinstance(provider, SyncDNSAdapter):
+        return provider.dns
+    return AsyncDNSAdapter(provider)
+
+
+class AsyncConfigAdapter(AsyncConfigProvider):
+    """AsyncConfigProvider running the calls of a ConfigProvider in the worker pool"""
+
+    def __init__(self, config: ConfigProvider, worker_pool: WorkerPool = None):
+        self.config = config
+        self.worker_pool = worker_pool if worker_pool is not None else pool
+
+    async def load(self):
+        return await self.worker_pool.submit(self.config.load)
+
+    async def host(self, hostname: str):
+        return await self.worker_pool.submit(self.config.host, hostname)
+
+    async def shared_secret(self, hostname: str):
+        return await self.worker_pool.submit(self.config.shared_secret, hostname)
+
+    def cached(self, hostname: str):
+        return self.config.cached(hostname)
+
+
+class AsyncDNSAdapter(AsyncDNSProvider):
+    """AsyncDNSProvider running the calls of a DNSProvider in the worker pool"""
+
+    def __init__(self, dns: DNSProvider, worker_pool: WorkerPool = None):
+        self.dns = dns
+        self.worker_pool = worker_pool if worker_pool is not None else pool
+
+    async def read(self, hostname: str):
+        return await self.worker_pool.submit(self.dns.read, hostname)
+
+    async def update(self, hostname: str, updateip: str):
+        return await self.worker_pool.submit(self.dns.update, hostname, updateip)
+
+    async def update_batch(self, updates: dict):
+        return await self.worker_pool.submit(self.dns.update_batch, updates)
+
+    async def read_records(self, hostname: str, record_types: list):
+        return await self.worker_pool.submit(self.dns.read_records, hostname, record_types)
+
+    async def update_records(self, hostname: str, records: dict):
+        return await self.worker_pool.submit(self.dns.update_records, hostname, records)
+
+    def change(self, hostname: str):
+        return self.dns.change(hostname)
+
+    def live(self):
+        return self.dns.live()
+
+    async def status(self, hostname: str, change_id: str = None):
+        return await self.worker_pool.submit(self.dns.status, hostname, change_id)
+
+    async def poll(self):
+        return await self.worker_pool.submit(self.dns.poll)
+
+
+class SyncConfigAdapter(ConfigProvider):
+    """ConfigProvider running each call of an AsyncConfigProvider to completion, for the sync handlers"""
+
+    def __init__(self, config: AsyncConfigProvider):
+        self.config = config
+
+    def load(self):
+        return run(self.config.load())
+
+    def host(self, hostname: str):
+        return run(self.config.host(hostname))
+
+    def shared_secret(self, hostname: str):
+        return run(self.config.shared_secret(hostname))
+
+    def cached(self, hostname: str):
+        return self.config.cached(hostname)
+
+
+class SyncDNSAdapter(DNSProvider):
+    """DNSProvider running each call of an AsyncDNSProvider to completion, for the sync handlers"""
+
+    def __init__(self, dns: AsyncDNSProvider):
+        self.dns = dns
+
+    def read(self, hostname: str):
+        return run(self.dns.read(hostname))
+
+    def update(self, hostname: str, updateip: str):
+        return run(self.dns.update(hostname, updateip))
+
+    def update_batch(self, updates: dict):
+        return run(self.dns.update_batch(updates))
+
+    def read_records(self, hostname: str, record_types: list):
+        return run(self.dns.read_records(hostname, record_types))
+
+    def update_records(self, hostname: str, records: dict):
+        return run(self.dns.update_records(hostname, records))
+
+    def change(self, hostname: str):
+        return self.dns.change(hostname)
+
+    def live(self):
+        return self.dns.live()
+
+    def status(self, hostname: str, change_id: str = None):
+        return run(self.dns.status(hostname, change_id))
+
+    def poll(self):
+        return run(self.dns.poll())
@@ -1,22 +1,169 @@
 import json
-import boto3
+import os
+import threading
+
+from dynamicdns import metrics
+
+
+# Services whose calls are retried by dynamicdns.aws.retry, their clients make a single attempt per call
+OWN_RETRIES = ('route53',)
 
 
 def factory():
     return Boto3Wrapper()
 
 
+def compatible(config_class, settings: dict):
+    """Settings accepted by the installed botocore, the release locked in Pipfile.lock (1.12) knows neither tcp_keepalive nor retry modes.  Returns dict"""
+    settings = dict(settings)
+    if not 'tcp_keepalive' in config_class.OPTION_DEFAULTS:
+        settings.pop('tcp_keepalive', None)
+    try:
+        config_class(retries=settings['retries'])
+    except Exception:
+        # Without retry modes max_attempts counts the retries only, a single attempt is max_attempts 0
+        retries = settings['retries']
+        settings['retries'] = { 'max_attempts': retries['max_attempts'] if 'max_attempts' in retries else retries['total_max_attempts'] - 1 }
+    return settings
+
+
+class ClientPool():
+    """Boto3 clients keyed by (service, region), created lazily and shared by all invocations of a warm container.
+    boto3 itself is only imported when the first client is created."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.configure(
+            max_pool_connections = int(os.environ.get('BOTO3_MAX_POOL_CONNECTIONS', '10')),
+            tcp_keepalive = os.environ.get('BOTO3_TCP_KEEPALIVE', 'true').lower() == 'true',
+            max_attempts = int(os.environ.get('BOTO3_MAX_ATTEMPTS', '3')),
+            retry_mode = os.environ.get('BOTO3_RETRY_MODE', 'standard')
+        )
+
+    def configure(self, max_pool_connections: int, tcp_keepalive: bool, max_attempts: int, retry_mode: str):
+        self.settings = {
+            'max_pool_connections': max_pool_connections,
+            'tcp_keepalive': tcp_keepalive,
+            'retries': { 'max_attempts': max_attempts, 'mode': retry_mode }
+        }
+        self.reset()
+
+    def client_config(self, service_name: str = None):
+        config = self.configs.get(service_name)
+        if config is None:
+            from botocore.config import Config
+            settings = self.settings
+            if service_name in OWN_RETRIES:
+                settings = dict(settings, retries={ 'total_max_attempts': 1, 'mode': settings['retries']['mode'] })
+            config = Config(**compatible(Config, settings))
+            self.configs[service_name] = config
+        return config
+
+    def client(self, service_name: str, region_name: str):
+        client = self.clients.get((service_name, region_name))
+        if client is None:
+            with self.lock:
+                client = self.clients.get((service_name, region_name))
+                if client is None:
+                    with metrics.current().stage('boto3_client'):
+                        if self.session is None:
+                            import boto3.session
+                            self.session = boto3.session.Session()
+                        client = self.session.client(service_name=service_name, region_name=region_name, config=self.client_config(service_name))
+                    self.clients[(service_name, region_name)] = client
+        return client
+
+    def reset(self):
+        with self.lock:
+            self.session = None
+            self.configs = {}
+            self.clients = {}
+
+
+pool = ClientPool()
+
+
 class Boto3Wrapper():
+
+    def __init__(self, client_pool: ClientPool = None):
+        self.client_pool = client_pool if client_pool is not None else pool
     
     def client_get_object(self, region, bucket, key):
-        client = boto3.client(service_name='s3',region_name=region)
-        data = client.get_object(Bucket=bucket, Key=key)
-        return data['Body'].read().decode('utf-8')
+        client = self.client_pool.client(service_name='s3', region_name=region)
+        with metrics.current().stage('s3_get_object'):
+            data = client.get_object(Bucket=bucket, Key=key)
+            return data['Body'].read().decode('utf-8')
+
+    def client_get_object_conditional(self, region, bucket, key, etag):
+        """Conditional GET on the ETag.  Returns (body, etag), body is None if not modified"""
+        from botocore.exceptions import ClientError
+        client = self.client_pool.client(service_name='s3', region_name=region)
+        with metrics.current().stage('s3_get_object'):
+            try:
+                if etag is None:
+                    data = client.get_object(Bucket=bucket, Key=key)
+                else:
+                    data = client.get_object(Bucket=bucket, Key=key, IfNoneMatch=etag)
+            except ClientError as ex:
+                if ex.response.get('Error', {}).get('Code') in ('304', 'NotModified'):
+                    return None, etag
+                raise
+            return data['Body'].read().decode('utf-8'), data.get('ETag')
 
     def client_list_resource_record_sets(self, region, hosted_zone_id, start_record_name, start_record_type, max_items):
-        client = boto3.client(service_name='route53', region_name=region)
-        return client.list_resource_record_sets(HostedZoneId = hosted_zone_id, StartRecordName = start_record_name, StartRecordType = start_record_type, MaxItems = max_items)
+        client = self.client_pool.client(service_name='route53', region_name=region)
+        with metrics.current().stage('route53_list_resource_record_sets'):
+            return client.list_resource_record_sets(HostedZoneId = hosted_zone_id, StartRecordName = start_record_name, StartRecordType = start_record_type, MaxItems = max_items)
+
+    def client_list_resource_record_set_pages(self, region, hosted_zone_id):
+        client = self.client_pool.client(service_name='route53', region_name=region)
+        paginator = client.get_paginator('list_resource_record_sets')
+        with metrics.current().stage('route53_list_resource_record_sets'):
+            return list(paginator.paginate(HostedZoneId = hosted_zone_id))
 
     def client_change_resource_record_sets(self, region, hosted_zone_id, change_batch):
-        client = boto3.client(service_name='route53',region_name=region)
-        return client.change_resource_record_sets(HostedZoneId = hosted_zone_id, ChangeBatch = change_batch)
+        client = self.client_pool.client(service_name='route53', region_name=region)
+        with metrics.current().stage('route53_change_resource_record_sets'):
+            return client.change_resource_record_sets(HostedZoneId = hosted_zone_id, ChangeBatch = change_batch)
+
+    def client_get_change(self, region, change_id):
+        client = self.client_pool.client(service_name='route53', region_name=region)
+        with metrics.current().stage('route53_get_change'):
+            return client.get_change(Id = change_id)
+
+    def client_send_message(self, region, queue_url, message_body):
+        client = self.client_pool.client(service_name='sqs', region_name=region)
+        with metrics.current().stage('sqs_send_message'):
+            return client.send_message(QueueUrl = queue_url, MessageBody = message_body)
+
+    def client_receive_message(self, region, queue_url, max_number_of_messages, wait_time_seconds):
+        client = self.client_pool.client(service_name='sqs', region_name=region)
+        with metrics.current().stage('sqs_receive_message'):
+            return client.receive_message(QueueUrl = queue_url, MaxNumberOfMessages = max_number_of_messages, WaitTimeSeconds = wait_time_seconds)
+
+    def client_delete_message_batch(self, region, queue_url, entries):
+        client = self.client_pool.client(service_name='sqs', region_name=region)
+        with metrics.current().stage('sqs_delete_message_batch'):
+            return client.delete_message_batch(QueueUrl = queue_url, Entries = entries)
+
+    def client_get_item(self, region, table, key):
+        """Consistent read of an item.  Returns the item or None"""
+        client = self.client_pool.client(service_name='dynamodb', region_name=region)
+        with metrics.current().stage('dynamodb_get_item'):
+            return client.get_item(TableName = table, Key = key, ConsistentRead = True).get('Item')
+
+    def client_put_item_conditional(self, region, table, item, previous):
+        """Put an item if its 'updated' attribute still is previous (None if the item must not exist).  Returns False if the condition failed"""
+        from botocore.exceptions import ClientError
+        client = self.client_pool.client(service_name='dynamodb', region_name=region)
+        with metrics.current().stage('dynamodb_put_item'):
+            try:
+                if previous is None:
+                    client.put_item(TableName = table, Item = item, ConditionExpression = 'attribute_not_exists(#k)', ExpressionAttributeNames = { '#k': 'key' })
+                else:
+                    client.put_item(TableName = table, Item = item, ConditionExpression = '#u = :previous', ExpressionAttributeNames = { '#u': 'updated' }, ExpressionAttributeValues = { ':previous': { 'N': previous } })
+            except ClientError as ex:
+                if ex.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+                    return False
+                raise
+            return True
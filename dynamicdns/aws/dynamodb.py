@@ -0,0 +1,93 @@
+import time
+
+from dynamicdns import ratelimit, signing
+from dynamicdns.models import BucketStore, NonceStore
+from dynamicdns.aws.boto3wrapper import Boto3Wrapper
+
+
+# Attempts of a conditional write before the request is let through
+MAX_ATTEMPTS = 3
+
+
+def factory(boto3_wrapper: Boto3Wrapper, region: str, table: str):
+    return DynamoDBBucketStore(boto3_wrapper, region, table)
+
+
+def nonce_factory(boto3_wrapper: Boto3Wrapper, region: str, table: str):
+    return DynamoDBNonceStore(boto3_wrapper, region, table, signing.nonces)
+
+
+class DynamoDBBucketStore(BucketStore):
+    """Token buckets shared by all containers, one item per key written with a conditional put on the previous update time.
+    The table needs a string partition key 'key', the attribute 'expires' can be used as TTL attribute"""
+
+    def __init__(self, boto3_wrapper: Boto3Wrapper, region: str, table: str):
+        self.boto3_wrapper = boto3_wrapper
+        self.region = region
+        self.table = table
+
+    def take(self, key: str, rate: float, burst: float):
+        for _ in range(MAX_ATTEMPTS):
+            item = self.boto3_wrapper.client_get_item(region=self.region, table=self.table, key={ 'key': { 'S': key } })
+            now = time.time()
+            if item is None:
+                tokens = burst
+                previous = None
+            else:
+                previous = item['updated']['N']
+                tokens = ratelimit.refill(float(item['tokens']['N']), float(previous), now, rate, burst)
+
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+
+            written = self.boto3_wrapper.client_put_item_conditional(
+                region=self.region,
+                table=self.table,
+                item={
+                    'key': { 'S': key },
+                    'tokens': { 'N': repr(tokens) },
+                    'updated': { 'N': repr(now) },
+                    'expires': { 'N': str(int(now + burst / rate) + 1) }
+                },
+                previous=previous
+            )
+            if written:
+                return wait
+        return 0.0
+
+
+class DynamoDBNonceStore(NonceStore):
+    """Nonces shared by all containers behind the nonces of this container.  A replay to the same container is rejected by the local nonces without I/O,
+    one to another container by a conditional put of one item per nonce, so only the first of concurrent requests is accepted.
+    The table needs a string partition key 'key' (it can be the table of the token buckets), the attribute 'expires' can be used as TTL attribute"""
+
+    def __init__(self, boto3_wrapper: Boto3Wrapper, region: str, table: str, local: NonceStore):
+        self.boto3_wrapper = boto3_wrapper
+        self.region = region
+        self.table = table
+        self.local = local
+
+    def seen(self, key: str):
+        """Only the local nonces are asked, a replay to another container is detected by add after the signature is checked"""
+        return self.local.seen(key)
+
+    def add(self, key: str):
+        if not self.local.add(key):
+            return False
+        now = time.time()
+        return self.boto3_wrapper.client_put_item_conditional(
+            region=self.region,
+            table=self.table,
+            item={
+                'key': { 'S': 'nonce:' + key },
+                'updated': { 'N': repr(now) },
+                'expires': { 'N': str(int(now + 2 * signing.MAX_AGE) + 1) }
+            },
+            previous=None
+        )
+
+    def shared(self):
+        return True
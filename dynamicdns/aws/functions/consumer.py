@@ -0,0 +1,57 @@
+import json
+
+from dynamicdns.models import Error
+
+import dynamicdns
+import dynamicdns.backend
+import dynamicdns.processor
+
+from dynamicdns import metrics
+
+
+def handle(event, context):
+    """Write the updates of a SQS batch, reports the messages of failed hostnames for redelivery"""
+
+    recorder = metrics.begin('consumer')
+    try:
+
+        # Extract Updates and the Message Ids per Hostname 
+        updates = []
+        messageids = {}
+        failures = []
+        for record in event.get('Records', []):
+            try:
+                update = json.loads(record['body'])
+                if not dynamicdns.processor.wellformed(update):
+                    failures.append(record['messageId'])
+                    continue
+                messageids.setdefault(update['hostname'], []).append(record['messageId'])
+                updates.append(update)
+            except Exception:
+                failures.append(record['messageId'])
+
+        # Providers - Configuration and DNS of the selected backend
+        config, dns = dynamicdns.backend.providers()
+
+        # Configuration - Read settings
+        with recorder.stage('config'):
+            error = config.load()
+        if isinstance(error, Error):
+            return { 'batchItemFailures': [ { 'itemIdentifier': record['messageId'] } for record in event.get('Records', []) ] }
+
+        # Write coalesced updates, the latest per hostname wins 
+        processor = dynamicdns.processor.factory(dns)
+        with recorder.stage('update'):
+            results = processor.flush(updates)
+        for hostname, result in results.items():
+            if isinstance(result, Error):
+                failures.extend(messageids[hostname])
+
+        # Poll the pending Route 53 changes that are due, their propagation time is recorded as metric 
+        with recorder.stage('poll'):
+            dns.poll()
+
+        return { 'batchItemFailures': [ { 'itemIdentifier': messageid } for messageid in failures ] }
+
+    finally:
+        metrics.end(recorder)
@@ -1,20 +1,20 @@
 import os
 import json
 
-from dynamicdns.models import Error, ConfigProvider, DNSProvider
+from dynamicdns.models import Error, Unavailable, HostNotFound, ConfigProvider, DNSProvider
 from dynamicdns.processor import Processor
 from dynamicdns.util import success, fail, keyExists
 
 import dynamicdns
+import dynamicdns.backend
+import dynamicdns.ratelimit
 
-from dynamicdns.aws import (s3config, route53, boto3wrapper)
-
-from dynamicdns.aws.boto3wrapper import Boto3Wrapper
-from dynamicdns.aws.s3config import S3ConfigProvider
-from dynamicdns.aws.route53 import Route53Provider
+from dynamicdns import metrics, rejections, signing
 
 
 def handle(event, context):
+
+    recorder = metrics.current()
     
     # Extract Raw Parameter 
     raw: bool = keyExists(event, 'queryStringParameters', 'raw')
@@ -24,10 +24,35 @@ def handle(event, context):
         return fail(Error("You have to pass 'hostname' querystring parameters."), raw)
     hostname: str = event['queryStringParameters']['hostname']
 
-    # Extract Validation Hash Parameter 
-    if not keyExists(event, 'queryStringParameters', 'hash'):
+    # Extract Fast Path Parameters (if present, the token alone confirms the observed address) 
+    knownip: str = None
+    token: str = None
+    if keyExists(event, 'queryStringParameters', 'token'):
+        token = event['queryStringParameters']['token']
+        if keyExists(event, 'queryStringParameters', 'knownip'):
+            knownip = event['queryStringParameters']['knownip']
+
+    # Extract Validation Hash Parameter (optional on the fast path) 
+    validationhash: str = None
+    if keyExists(event, 'queryStringParameters', 'hash'):
+        validationhash = event['queryStringParameters']['hash']
+    elif token is None:
         return fail(Error("You have to pass 'hash' querystring parameters."), raw)
-    validationhash: str = event['queryStringParameters']['hash']
+
+    # Extract Timestamp and Nonce Parameters of signed requests (if present) 
+    timestamp: str = None
+    if keyExists(event, 'queryStringParameters', 'timestamp'):
+        timestamp = event['queryStringParameters']['timestamp']
+    nonce: str = None
+    if keyExists(event, 'queryStringParameters', 'nonce'):
+        nonce = event['queryStringParameters']['nonce']
+
+    # Extract Sign Parameter - 'host' signs without the source IP, the request is bound to the observed one 
+    sign: str = 'sourceip'
+    if keyExists(event, 'queryStringParameters', 'sign'):
+        sign = event['queryStringParameters']['sign']
+        if not sign in signing.SIGN_MODES:
+            return fail(Error("You must pass 'sourceip' or 'host' in the sign= querystring parameter."), raw)
 
     # Extract Source IP Parameter 
     if not keyExists(event, 'requestContext', 'identity', 'sourceIp'):
@@ -39,31 +64,90 @@ def handle(event, context):
     if keyExists(event, 'queryStringParameters', 'internalip'):
         internalip = event['queryStringParameters']['internalip']
 
-    # Boto3 Wrapper - Utility for reading / writing AWS objects
-    boto3_wrapper: Boto3Wrapper = boto3wrapper.factory()
+    # Extract IPv4 / IPv6 Parameters of dual-stack requests (if present) 
+    ipv4: str = None
+    if keyExists(event, 'queryStringParameters', 'ipv4'):
+        ipv4 = event['queryStringParameters']['ipv4']
+    ipv6: str = None
+    if keyExists(event, 'queryStringParameters', 'ipv6'):
+        ipv6 = event['queryStringParameters']['ipv6']
 
-    # S3 Configuration - Read settings from a S3 bucket
-    config: ConfigProvider = s3config.factory(boto3_wrapper)
-    error = config.load()
+    # Rate Limit - Throttle hostname and source IP before reading configuration or DNS 
+    error = dynamicdns.ratelimit.factory(dynamicdns.backend.buckets()).check(hostname, sourceip)
+    if isinstance(error, Error):
+        return fail(str(error), raw, 429)
+
+    # Providers - Configuration (e.g. S3 bucket) and DNS (e.g. Route 53) of the selected backend
+    config, dns = dynamicdns.backend.providers()
+
+    # DNS - Read / write DNS entry 
+    processor = dynamicdns.processor.factory(dns, dynamicdns.backend.queue(), dynamicdns.backend.nonces())
+
+    # Fast Path - Answer an unchanged address confirmed by a token without reading configuration or DNS, 
+    # dual-stack requests always read and write both records 
+    if token is not None and ipv4 is None and ipv6 is None:
+        with recorder.stage('fastpath'):
+            result = processor.unchanged(hostname, sourceip, internalip, knownip, token)
+        if result is not None:
+            return success(result, raw, token)
+    if validationhash is None:
+        return fail(Error("You have to pass 'hash' querystring parameters."), raw)
+
+    # Reject outdated and replayed requests before reading configuration or DNS 
+    error = processor.checkreplay(hostname, timestamp, nonce)
     if isinstance(error, Error):
         return fail(str(error), raw)
-    
-    # Route 53 - Read / write DNS entry 
-    dns: DNSProvider = route53.factory(boto3_wrapper, config)
-    processor = dynamicdns.processor.factory(dns)
 
-    # Get shared secret from S3 bucket 
-    sharedsecret: str = config.shared_secret(hostname)
+    # Reject recently unknown hostnames and failed hashes before reading configuration or DNS 
+    error = rejections.cache.get(hostname, sourceip, validationhash)
+    if isinstance(error, Error):
+        return fail(str(error), raw)
 
-    # Check passed hash value 
-    error = processor.checkhash(hostname, validationhash, sourceip, sharedsecret)
+    # Configuration - Read settings. The current DNS entry is read after the hash check, so unauthenticated requests cause no DNS I/O 
+    with recorder.stage('config'):
+        error = config.load()
     if isinstance(error, Error):
         return fail(str(error), raw)
 
-    # Update entry on Route 53 
-    result = error = processor.update(hostname, sourceip, internalip)
+    # Get shared secret from configuration 
+    try:
+        sharedsecret: str = config.shared_secret(hostname)
+    except HostNotFound as ex:
+        error = Error(str(ex))
+        rejections.cache.reject_host(hostname, error)
+        return fail(str(error), raw)
+    except Exception as ex:
+        return fail(str(ex), raw)
+
+    # Check passed hash value 
+    with recorder.stage('hashcheck'):
+        error = processor.checkhash(hostname, validationhash, sourceip, sharedsecret, timestamp, nonce, sign, internalip, ipv4, ipv6)
     if isinstance(error, Error):
+        rejections.cache.reject_hash(hostname, sourceip, validationhash, error)
         return fail(str(error), raw)
 
-    # Return status success 
-    return success(result, raw)
+    # Update DNS entries of both address families at once 
+    if ipv4 is not None or ipv6 is not None:
+        addresses = error = processor.dualstack(sourceip, internalip, ipv4, ipv6)
+        if isinstance(error, Error):
+            return fail(str(error), raw)
+        previous = dns.change(hostname)
+        result = error = processor.update_records(hostname, addresses)
+
+        with recorder.stage('response'):
+            if isinstance(error, Error):
+                return fail(str(error), raw, 503 if isinstance(error, Unavailable) else 200)
+            change = dns.change(hostname)
+            return success(result, raw, change=change if change != previous else None)
+
+    # Update DNS entry 
+    previous = dns.change(hostname)
+    result = error = processor.update(hostname, sourceip, internalip)
+
+    with recorder.stage('response'):
+        if isinstance(error, Error):
+            return fail(str(error), raw, 503 if isinstance(error, Unavailable) else 200)
+
+        # Return status success, with a token of the fast path if the address is confirmed and the id of a submitted change 
+        change = dns.change(hostname)
+        return success(result, raw, processor.token(hostname, sourceip, internalip), change if change != previous else None)
@@ -0,0 +1,105 @@
+import os
+import json
+
+from dynamicdns.models import Error, HostNotFound, ConfigProvider, DNSProvider
+from dynamicdns.processor import Processor
+from dynamicdns.util import results, fail, keyExists
+
+import dynamicdns
+import dynamicdns.backend
+import dynamicdns.ratelimit
+
+from dynamicdns import metrics, rejections, signing
+
+
+def handle(event, context):
+
+    recorder = metrics.current()
+
+    # Extract Raw Parameter 
+    raw: bool = keyExists(event, 'queryStringParameters', 'raw')
+
+    # Extract Entries from Body, e.g. [{"hostname": "...", "hash": "...", "timestamp": "...", "nonce": "...", "sign": "host", "internalip": "..."}]
+    try:
+        entries = json.loads(event['body'])
+    except Exception:
+        return fail(Error("You have to pass a JSON list of entries in the request body."), raw)
+    if not isinstance(entries, list) or len(entries) == 0:
+        return fail(Error("You have to pass a JSON list of entries in the request body."), raw)
+    max_entries = int(os.environ.get('BATCH_MAX_ENTRIES', '100'))
+    if len(entries) > max_entries:
+        return fail(Error("You can pass at most " + str(max_entries) + " entries in the request body."), raw)
+    for entry in entries:
+        if not (isinstance(entry, dict) and keyExists(entry, 'hostname') and keyExists(entry, 'hash')
+            and all(isinstance(entry[key], str) for key in ('hostname', 'hash', 'internalip', 'timestamp', 'nonce') if key in entry)):
+            return fail(Error("You have to pass 'hostname' and 'hash' for every entry."), raw)
+        if not entry.get('sign', 'sourceip') in signing.SIGN_MODES:
+            return fail(Error("You must pass 'sourceip' or 'host' as 'sign' of an entry."), raw)
+
+    # Extract Source IP Parameter 
+    if not keyExists(event, 'requestContext', 'identity', 'sourceIp'):
+        return fail(Error("Source IP address cannot be extracted from request context."), raw)
+    sourceip: str = event['requestContext']['identity']['sourceIp']
+
+    # Rate Limit - Throttle the source IP once per request before reading configuration or DNS 
+    limiter = dynamicdns.ratelimit.factory(dynamicdns.backend.buckets())
+    error = limiter.check_source(sourceip)
+    if isinstance(error, Error):
+        return fail(str(error), raw, 429)
+
+    # Providers - Configuration (e.g. S3 bucket) and DNS (e.g. Route 53) of the selected backend
+    config, dns = dynamicdns.backend.providers()
+
+    # DNS - Read / write DNS entries 
+    processor = dynamicdns.processor.factory(dns, dynamicdns.backend.queue(), dynamicdns.backend.nonces())
+
+    # Reject throttled, outdated, replayed and recently rejected entries before reading configuration or DNS 
+    rejected = {}
+    signed = []
+    for entry in entries:
+        timestamp: str = entry['timestamp'] if keyExists(entry, 'timestamp') else None
+        nonce: str = entry['nonce'] if keyExists(entry, 'nonce') else None
+        error = limiter.check_host(entry['hostname'])
+        if not isinstance(error, Error):
+            error = processor.checkreplay(entry['hostname'], timestamp, nonce)
+        if not isinstance(error, Error):
+            error = rejections.cache.get(entry['hostname'], sourceip, entry['hash'])
+        if isinstance(error, Error):
+            rejected[entry['hostname']] = error
+            continue
+        signed.append((entry, timestamp, nonce))
+
+    # Configuration - Read settings
+    with recorder.stage('config'):
+        error = config.load()
+    if isinstance(error, Error):
+        return fail(str(error), raw)
+
+    # Check passed hash values, collect the valid entries 
+    valid = []
+    for entry, timestamp, nonce in signed:
+        hostname: str = entry['hostname']
+        try:
+            sharedsecret: str = config.shared_secret(hostname)
+        except HostNotFound as ex:
+            rejected[hostname] = Error(str(ex))
+            rejections.cache.reject_host(hostname, rejected[hostname])
+            continue
+        except Exception as ex:
+            rejected[hostname] = Error(str(ex))
+            continue
+        with recorder.stage('hashcheck'):
+            error = processor.checkhash(hostname, entry['hash'], sourceip, sharedsecret, timestamp, nonce, entry.get('sign', 'sourceip'), entry.get('internalip') or "")
+        if isinstance(error, Error):
+            rejections.cache.reject_hash(hostname, sourceip, entry['hash'], error)
+            rejected[hostname] = error
+            continue
+        rejected.pop(hostname, None)
+        valid.append((hostname, sourceip, entry.get('internalip') or ""))
+
+    # Update DNS entries, e.g. one Route 53 change batch per hosted zone 
+    updated = processor.update_batch(valid)
+
+    # Return status per hostname 
+    with recorder.stage('response'):
+        return results({ **rejected, **updated }, raw)
@@ -0,0 +1,114 @@
+from dynamicdns.models import Error, HostNotFound
+from dynamicdns.util import success, fail, keyExists
+
+import dynamicdns
+import dynamicdns.backend
+import dynamicdns.processor
+import dynamicdns.ratelimit
+
+from dynamicdns import metrics, rejections, signing
+
+
+def handle(event, context):
+
+    recorder = metrics.current()
+
+    # Extract Raw Parameter 
+    raw: bool = keyExists(event, 'queryStringParameters', 'raw')
+
+    # Extract Hostname Parameter  
+    if not keyExists(event, 'queryStringParameters', 'hostname'):
+        return fail(Error("You have to pass 'hostname' querystring parameters."), raw)
+    hostname: str = event['queryStringParameters']['hostname']
+
+    # Extract Validation Hash Parameter, computed like the one of the update 
+    if not keyExists(event, 'queryStringParameters', 'hash'):
+        return fail(Error("You have to pass 'hash' querystring parameters."), raw)
+    validationhash: str = event['queryStringParameters']['hash']
+
+    # Extract Timestamp, Nonce and Sign Parameters of signed requests (if present) 
+    timestamp: str = None
+    if keyExists(event, 'queryStringParameters', 'timestamp'):
+        timestamp = event['queryStringParameters']['timestamp']
+    nonce: str = None
+    if keyExists(event, 'queryStringParameters', 'nonce'):
+        nonce = event['queryStringParameters']['nonce']
+    sign: str = 'sourceip'
+    if keyExists(event, 'queryStringParameters', 'sign'):
+        sign = event['queryStringParameters']['sign']
+        if not sign in signing.SIGN_MODES:
+            return fail(Error("You must pass 'sourceip' or 'host' in the sign= querystring parameter."), raw)
+
+    # Extract Internal IP Parameter (if present), covered by signatures 
+    internalip: str = ""
+    if keyExists(event, 'queryStringParameters', 'internalip'):
+        internalip = event['queryStringParameters']['internalip']
+
+    # Extract IPv4 / IPv6 Parameters of dual-stack requests (if present), covered by signatures 
+    ipv4: str = None
+    if keyExists(event, 'queryStringParameters', 'ipv4'):
+        ipv4 = event['queryStringParameters']['ipv4']
+    ipv6: str = None
+    if keyExists(event, 'queryStringParameters', 'ipv6'):
+        ipv6 = event['queryStringParameters']['ipv6']
+
+    # Extract Change Parameter (if present), otherwise the last change of hostname known to this container 
+    change_id: str = None
+    if keyExists(event, 'queryStringParameters', 'change'):
+        change_id = event['queryStringParameters']['change']
+
+    # Extract Source IP Parameter 
+    if not keyExists(event, 'requestContext', 'identity', 'sourceIp'):
+        return fail(Error("Source IP address cannot be extracted from request context."), raw)
+    sourceip: str = event['requestContext']['identity']['sourceIp']
+
+    # Rate Limit - Throttle hostname and source IP before reading configuration or DNS 
+    error = dynamicdns.ratelimit.factory(dynamicdns.backend.buckets()).check(hostname, sourceip)
+    if isinstance(error, Error):
+        return fail(str(error), raw, 429)
+
+    # Providers - Configuration (e.g. S3 bucket) and DNS (e.g. Route 53) of the selected backend
+    config, dns = dynamicdns.backend.providers()
+    processor = dynamicdns.processor.factory(dns, nonces=dynamicdns.backend.nonces())
+
+    # Reject outdated, replayed and recently rejected requests before reading configuration or DNS 
+    error = processor.checkreplay(hostname, timestamp, nonce)
+    if not isinstance(error, Error):
+        error = rejections.cache.get(hostname, sourceip, validationhash)
+    if isinstance(error, Error):
+        return fail(str(error), raw)
+
+    # Configuration - Read settings
+    with recorder.stage('config'):
+        error = config.load()
+    if isinstance(error, Error):
+        return fail(str(error), raw)
+
+    # Get shared secret from configuration 
+    try:
+        sharedsecret: str = config.shared_secret(hostname)
+    except HostNotFound as ex:
+        error = Error(str(ex))
+        rejections.cache.reject_host(hostname, error)
+        return fail(str(error), raw)
+    except Exception as ex:
+        return fail(str(ex), raw)
+
+    # Check passed hash value, only authenticated requests cause Route 53 calls 
+    with recorder.stage('hashcheck'):
+        error = processor.checkhash(hostname, validationhash, sourceip, sharedsecret, timestamp, nonce, sign, internalip, ipv4, ipv6)
+    if isinstance(error, Error):
+        rejections.cache.reject_hash(hostname, sourceip, validationhash, error)
+        return fail(str(error), raw)
+
+    # Status of the change, polled with backoff 
+    with recorder.stage('status'):
+        status = error = dns.status(hostname, change_id)
+    if isinstance(error, Error):
+        return fail(str(error), raw)
+
+    if status['status'] == 'INSYNC':
+        message = "Change '" + status['change'] + "' of '" + hostname + "' is INSYNC after " + format(status['seconds'], '.1f') + " seconds."
+    else:
+        message = "Change '" + status['change'] + "' of '" + hostname + "' is " + status['status'] + " since " + format(status['seconds'], '.1f') + " seconds."
+    return success(message, raw, change=status['change'])
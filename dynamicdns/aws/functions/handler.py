@@ -1,13 +1,33 @@
+import importlib
+
+from dynamicdns import metrics
 from dynamicdns.util import (success, fail, keyExists)
-from dynamicdns.aws.functions import (dns, myip, script, version)
+
+
+# Route modules are imported on first use, so e.g. /myip does not pay for the /dns dependencies on a cold start
+ROUTES = {  "/dns|POST":        "dynamicdns.aws.functions.dns",
+            "/dns/batch|POST":  "dynamicdns.aws.functions.dnsbatch",
+            "/dns/status|GET":  "dynamicdns.aws.functions.dnsstatus",
+            "/myip|GET":        "dynamicdns.aws.functions.myip",
+            "/script|GET":      "dynamicdns.aws.functions.script",
+            "/version|GET":     "dynamicdns.aws.functions.version"
+        }
+
+
+def route(resource: str, method: str):
+    module = ROUTES.get(resource + "|" + method)
+    if module is None:
+        return executefail
+    return importlib.import_module(module).handle
 
 
 def execute(resource: str, method: str, event: dict, context: dict):
-    return  {   "/dns|POST":        dns.handle,
-                "/myip|GET":        myip.handle,
-                "/script|GET":      script.handle,
-                "/version|GET":     version.handle
-            }.get(resource + "|" + method, executefail)(event, context)
+    recorder = metrics.begin(resource)
+    try:
+        with recorder.stage('total'):
+            return route(resource, method)(event, context)
+    finally:
+        metrics.end(recorder)
 
 
 def executefail(event: dict, context: dict):
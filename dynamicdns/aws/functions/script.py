@@ -1,17 +1,21 @@
+import os
 
+from dynamicdns.util import static, conditional
+
+
+# Built on the first request and served from memory for the lifetime of the container
+cached = None
 
-def handle(event, context):
-    file = open("dynamicdns/scripts/dynamic-dns-client", "r") 
-    content = file.read()
-    file.close()
 
-    headers = {
-        "Content-Type": "text/plain"
-    }
-    body = content
-    response = {
-        "statusCode": 200,
-        "headers": headers,
-        "body": body
-    }
-    return response
+def response():
+    global cached
+    if cached is None:
+        file = open("dynamicdns/scripts/dynamic-dns-client", "r") 
+        content = file.read()
+        file.close()
+        cached = static(content, "text/plain", int(os.environ.get('STATIC_MAX_AGE', '300')))
+    return cached
+
+
+def handle(event, context):
+    return conditional(response(), event)
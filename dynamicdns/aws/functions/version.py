@@ -1,20 +1,26 @@
 import json
+import os
 
 import dynamicdns
 
+from dynamicdns.util import static, conditional
+
+
+# Built on the first request and served from memory for the lifetime of the container
+cached = None
+
+
+def response():
+    global cached
+    if cached is None:
+        body = {
+            "version":      dynamicdns.__version__,
+            "author":       dynamicdns.__author__,
+            "author-email": dynamicdns.__author_email__
+        } 
+        cached = static(json.dumps(body), "application/json", int(os.environ.get('STATIC_MAX_AGE', '300')))
+    return cached
+
 
 def handle(event, context):
-    headers = {
-            "Content-Type": "application/json"
-    }
-    body = {
-        "version":      dynamicdns.__version__,
-        "author":       dynamicdns.__author__,
-        "author-email": dynamicdns.__author_email__
-    } 
-    response = {
-        "statusCode": 200,
-        "headers": headers,
-        "body": json.dumps(body)
-    }
-    return response
+    return conditional(response(), event)
@@ -0,0 +1,180 @@
+import math
+import os
+import random
+import threading
+import time
+
+from dynamicdns import metrics
+
+
+# Error codes of a saturated API, retried with backoff and counted by the circuit breaker
+THROTTLING = frozenset([ 'Throttling', 'ThrottlingException', 'ThrottledException', 'PriorRequestNotComplete', 'RequestLimitExceeded', 'TooManyRequestsException' ])
+
+# Error codes and exception classes of failures that may succeed when repeated
+TRANSIENT = frozenset([ 'ServiceUnavailable', 'InternalError', 'InternalFailure', 'RequestTimeout', 'RequestTimeoutException' ])
+TRANSIENT_EXCEPTIONS = frozenset([ 'EndpointConnectionError', 'ConnectionClosedError', 'ConnectTimeoutError', 'ReadTimeoutError' ])
+
+
+def factory():
+    return Retrier(
+        budget,
+        breaker,
+        int(os.environ.get('ROUTE53_RETRY_MAX_ATTEMPTS', '4')),
+        float(os.environ.get('ROUTE53_RETRY_BASE', '0.1')),
+        float(os.environ.get('ROUTE53_RETRY_CAP', '2'))
+    )
+
+
+def classify(ex: Exception):
+    """Kind of a failed call.  Returns 'throttling', 'transient' or None if repeating it is pointless"""
+    response = getattr(ex, 'response', None)
+    code = response.get('Error', {}).get('Code') if isinstance(response, dict) else None
+    if code in THROTTLING:
+        return 'throttling'
+    if code in TRANSIENT or type(ex).__name__ in TRANSIENT_EXCEPTIONS:
+        return 'transient'
+    return None
+
+
+class Saturated(Exception):
+    """Raised instead of calling an API that keeps throttling, the caller may repeat the request after retry_after seconds"""
+
+    def __init__(self, retry_after: float):
+        super().__init__("Route 53 is throttling requests, retry in " + str(math.ceil(retry_after)) + " seconds.")
+        self.retry_after = retry_after
+
+
+class RetryBudget:
+    """Retries of a container, a token bucket drained by each retry and refilled by each successful call"""
+
+    def __init__(self, capacity: float, cost: float, refund: float):
+        self.capacity = capacity
+        self.cost = cost
+        self.refund = refund
+        self.lock = threading.Lock()
+        self.clear()
+
+    def withdraw(self):
+        """Take the cost of a retry.  Returns False if the budget is exhausted"""
+        with self.lock:
+            if self.tokens < self.cost:
+                return False
+            self.tokens -= self.cost
+            return True
+
+    def deposit(self):
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens + self.refund)
+
+    def clear(self):
+        with self.lock:
+            self.tokens = self.capacity
+
+
+budget = RetryBudget(
+    float(os.environ.get('ROUTE53_RETRY_BUDGET', '100')),
+    5.0,
+    1.0
+)
+
+
+class CircuitBreaker:
+    """Opened by threshold throttled calls in a row, it rejects calls for the cooldown and then lets a single probe through"""
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.clear()
+
+    def allow(self):
+        """Admit a call.  Returns 0 or the seconds until the circuit admits calls again"""
+        with self.lock:
+            if self.opened is None:
+                return 0
+            now = time.monotonic()
+            if now < self.opened + self.cooldown:
+                return self.opened + self.cooldown - now
+            # Half open, the next call is a probe and all others wait for another cooldown
+            self.opened = now
+            return 0
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened = None
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                if self.opened is None:
+                    metrics.current().count('circuit_opened')
+                self.opened = time.monotonic()
+
+    def clear(self):
+        with self.lock:
+            self.failures = 0
+            self.opened = None
+
+
+breaker = CircuitBreaker(
+    int(os.environ.get('ROUTE53_CIRCUIT_THRESHOLD', '5')),
+    float(os.environ.get('ROUTE53_CIRCUIT_COOLDOWN', '10'))
+)
+
+
+class Retrier:
+    """Calls repeated on throttling and transient errors after a full jitter exponential backoff, as long as budget and circuit breaker allow"""
+
+    def __init__(self, budget: RetryBudget, breaker: CircuitBreaker, max_attempts: int, base: float, cap: float, sleep = time.sleep):
+        self.budget = budget
+        self.breaker = breaker
+        self.max_attempts = max_attempts
+        self.base = base
+        self.cap = cap
+        self.sleep = sleep
+
+    def call(self, function, *args, **kwargs):
+        """Result of function.  Raises Saturated while the circuit is open or the exception of the last attempt"""
+        recorder = metrics.current()
+        attempt = 0
+        while True:
+            wait = self.breaker.allow()
+            if wait > 0:
+                recorder.count('circuit_rejected')
+                raise Saturated(wait)
+            try:
+                result = function(*args, **kwargs)
+            except Exception as ex:
+                kind = classify(ex)
+                if kind is None:
+                    raise
+                if kind == 'throttling':
+                    recorder.count('throttled_calls')
+                    self.breaker.failure()
+                attempt += 1
+                if attempt >= self.max_attempts or not self.budget.withdraw():
+                    if kind == 'throttling':
+                        raise Saturated(self.cap) from ex
+                    raise
+                recorder.count('retries')
+                self.sleep(random.uniform(0, min(self.cap, self.base * 2 ** (attempt - 1))))
+                continue
+            self.breaker.success()
+            self.budget.deposit()
+            return result
+
+
+class Retrying:
+    """Boto3Wrapper whose client_* calls go through a Retrier"""
+
+    def __init__(self, boto3_wrapper, retrier: Retrier):
+        self.boto3_wrapper = boto3_wrapper
+        self.retrier = retrier
+
+    def __getattr__(self, name: str):
+        function = getattr(self.boto3_wrapper, name)
+        if not name.startswith('client_'):
+            return function
+        return lambda *args, **kwargs: self.retrier.call(function, *args, **kwargs)
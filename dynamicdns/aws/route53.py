@@ -1,27 +1,212 @@
+import os
+import threading
+import time
 
-from dynamicdns.models import Error, ConfigProvider, DNSProvider
+from collections import OrderedDict
+
+from dynamicdns import metrics
+from dynamicdns.models import Error, Unavailable, ConfigProvider, DNSProvider, HostConfig
+from dynamicdns.aws import retry
 from dynamicdns.aws.s3config import S3ConfigProvider
 from dynamicdns.aws.boto3wrapper import Boto3Wrapper
 
 
+# Route 53 accepts 1000 ResourceRecord elements per ChangeBatch and counts those of an UPSERT twice
+MAX_CHANGES_PER_BATCH = 500
+
+
 def factory(boto3_wrapper: Boto3Wrapper, config: ConfigProvider):
     return Route53Provider(boto3_wrapper, config)
 
 
+class ZoneSnapshots:
+    """Record sets of whole hosted zones indexed by (name, type), reloaded after the TTL"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.clear()
+
+    def lookup(self, boto3_wrapper: Boto3Wrapper, region: str, hosted_zone_id: str, name: str, record_type: str):
+        with self.lock:
+            snapshot = self.snapshots.get((region, hosted_zone_id))
+            if snapshot is None or time.monotonic() - snapshot['loaded'] >= self.ttl:
+                snapshot = self.__load(boto3_wrapper, region, hosted_zone_id)
+            return snapshot['records'].get((normalize(name), record_type))
+
+    def patch(self, region: str, hosted_zone_id: str, name: str, record_type: str, values: list):
+        with self.lock:
+            snapshot = self.snapshots.get((region, hosted_zone_id))
+            if snapshot is not None:
+                snapshot['records'][(normalize(name), record_type)] = values
+
+    def invalidate(self, region: str, hosted_zone_id: str):
+        with self.lock:
+            self.snapshots.pop((region, hosted_zone_id), None)
+
+    def clear(self):
+        self.snapshots = {}
+
+    def __load(self, boto3_wrapper: Boto3Wrapper, region: str, hosted_zone_id: str):
+        metrics.current().count('zone_snapshot_loads')
+        loaded = time.monotonic()
+        records = {}
+        for page in boto3_wrapper.client_list_resource_record_set_pages(region, hosted_zone_id):
+            for record in page['ResourceRecordSets']:
+                values = [ value['Value'] for value in record.get('ResourceRecords', []) ]
+                records[(normalize(record['Name']), record['Type'])] = values
+        snapshot = { 'records': records, 'loaded': loaded }
+        self.snapshots[(region, hosted_zone_id)] = snapshot
+        return snapshot
+
+
+def normalize(name: str):
+    return name.rstrip('.').lower()
+
+
+snapshots = ZoneSnapshots(float(os.environ.get('ROUTE53_SNAPSHOT_TTL', '60')))
+
+
+class ChangeTracker:
+    """Submitted changes and the hostnames they contain, polled for INSYNC with an exponential backoff per change"""
+
+    def __init__(self, min_interval: float, max_interval: float, max_entries: int):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.clear()
+
+    def record(self, region: str, hostnames: list, change_info: dict):
+        """Remember the ChangeInfo of a change_resource_record_sets response"""
+        if not change_info or not 'Id' in change_info:
+            return
+        submitted = change_info.get('SubmittedAt')
+        self.track(region, hostnames, change_info['Id'], change_info.get('Status', 'PENDING'), submitted.timestamp() if submitted is not None else time.time())
+
+    def track(self, region: str, hostnames: list, change_id: str, status: str = 'PENDING', submitted: float = None):
+        """Remember a change, one of unknown submission is polled right away.  Returns the change dict"""
+        with self.lock:
+            change = self.changes.get(change_id)
+            if change is None:
+                change = {
+                    'change': change_id,
+                    'region': region,
+                    'status': status,
+                    'submitted': submitted if submitted is not None else time.time(),
+                    'synced': None,
+                    'interval': self.min_interval,
+                    'due': time.monotonic() + (self.min_interval if submitted is not None else 0)
+                }
+                self.changes[change_id] = change
+                while len(self.changes) > self.max_entries:
+                    self.changes.popitem(last=False)
+            for hostname in hostnames:
+                self.hosts[hostname] = change_id
+            while len(self.hosts) > self.max_entries:
+                self.hosts.pop(next(iter(self.hosts)))
+            return change
+
+    def latest(self, hostname: str):
+        """Last change of hostname.  Returns dict or None"""
+        with self.lock:
+            change_id = self.hosts.get(hostname)
+            return self.changes.get(change_id) if change_id is not None else None
+
+    def get(self, change_id: str):
+        """Tracked change.  Returns dict or None"""
+        with self.lock:
+            return self.changes.get(change_id)
+
+    def poll(self, boto3_wrapper: Boto3Wrapper, change_ids: list = None):
+        """Ask Route 53 for the status of the pending changes (all or the given ones) whose backoff has passed.
+        A failed change backs off like a pending one, an unknown change id is dropped.  Returns a list of the polled changes"""
+        now = time.monotonic()
+        with self.lock:
+            due = [ change for change in self.changes.values() 
+                if change['status'] != 'INSYNC' and change['due'] <= now and (change_ids is None or change['change'] in change_ids) ]
+        polled = []
+        for change in due:
+            try:
+                self.refresh(boto3_wrapper, change)
+            except Exception as ex:
+                with self.lock:
+                    if unknown(ex):
+                        self.changes.pop(change['change'], None)
+                    else:
+                        self.__backoff(change)
+                continue
+            polled.append(change)
+        return polled
+
+    def refresh(self, boto3_wrapper: Boto3Wrapper, change: dict):
+        """Ask Route 53 for the status of a change, tracked or not.  Raises the exception of the call"""
+        response = boto3_wrapper.client_get_change(change['region'], change['change'])
+        status = response['ChangeInfo']['Status']
+        submitted = response['ChangeInfo'].get('SubmittedAt')
+        with self.lock:
+            change['status'] = status
+            if submitted is not None:
+                change['submitted'] = submitted.timestamp()
+            if status == 'INSYNC':
+                change['synced'] = time.time()
+                metrics.current().record('route53_propagation', change['synced'] - change['submitted'])
+            else:
+                self.__backoff(change)
+
+    def clear(self):
+        self.changes = OrderedDict()
+        self.hosts = {}
+
+    def __backoff(self, change: dict):
+        change['interval'] = min(self.max_interval, change['interval'] * 2)
+        change['due'] = time.monotonic() + change['interval']
+
+
+
+def unknown(ex: Exception):
+    """Whether a get_change failed because Route 53 does not know the change id.  Returns bool"""
+    response = getattr(ex, 'response', None)
+    return isinstance(response, dict) and response.get('Error', {}).get('Code') == 'NoSuchChange'
+
+
+def untracked(region: str, change_id: str):
+    """Change of a caller, polled without adding it to the tracker.  Returns the change dict"""
+    return { 'change': change_id, 'region': region, 'status': 'PENDING', 'submitted': time.time(), 'synced': None, 'interval': 0, 'due': 0 }
+
+
+changes = ChangeTracker(
+    float(os.environ.get('ROUTE53_CHANGE_POLL_MIN', '1')),
+    float(os.environ.get('ROUTE53_CHANGE_POLL_MAX', '60')),
+    int(os.environ.get('ROUTE53_CHANGE_MAX_ENTRIES', '10000'))
+)
+
+
+def seconds(change: dict):
+    """Propagation time of a synced change, time since submission of a pending one.  Returns float"""
+    return (change['synced'] if change['synced'] is not None else time.time()) - change['submitted']
+
+
 class Route53Provider(DNSProvider):
 
-    def __init__(self, boto3_wrapper: Boto3Wrapper, config: S3ConfigProvider):
+    def __init__(self, boto3_wrapper: Boto3Wrapper, config: S3ConfigProvider, zone_snapshots: ZoneSnapshots = None, change_tracker: ChangeTracker = None, retrier: retry.Retrier = None):
         self.boto3_wrapper = boto3_wrapper
         self.config = config
+        self.zone_snapshots = zone_snapshots if zone_snapshots is not None else snapshots
+        self.change_tracker = change_tracker if change_tracker is not None else changes
+        self.retrier = retrier if retrier is not None else retry.factory()
 
 
     def read(self, hostname: str):
+        if self.zone_snapshots.ttl > 0:
+            return self.__readSnapshot(hostname)
         try:
-            recordset = self.boto3_wrapper.client_list_resource_record_sets(
-                region = self.config.route_53_region(hostname),
-                hosted_zone_id = self.config.route_53_zone_id(hostname), 
+            host = self.config.host(hostname)
+            recordset = self.__route53().client_list_resource_record_sets(
+                region = host.route_53_region,
+                hosted_zone_id = host.route_53_zone_id, 
                 start_record_name = hostname, 
-                start_record_type = self.config.route_53_record_type(hostname), 
+                start_record_type = host.route_53_record_type.value, 
                 max_items = '2'
             )
             for record in recordset['ResourceRecordSets']:
@@ -31,32 +216,203 @@ class Route53Provider(DNSProvider):
                     return record['ResourceRecords'][0]['Value']
             return ""
         except Exception as ex:
-            return Error("Retrieval of current ip address failed. Excpeption: " + str(ex))
+            return self.__error("Retrieval of current ip address failed. Excpeption: ", ex)
 
 
-    def update(self, hostname: str, updateip: str):
+    def __readSnapshot(self, hostname: str):
         try:
-            self.boto3_wrapper.client_change_resource_record_sets(
-                region = self.config.route_53_region(hostname),
-                hosted_zone_id = self.config.route_53_zone_id(hostname),
-                change_batch = {
-                    'Changes': [
-                        {
-                            'Action': 'UPSERT',
-                            'ResourceRecordSet': {
-                                'Name': hostname,
-                                'Type': self.config.route_53_record_type(hostname),
-                                'TTL': self.config.route_53_record_ttl(hostname),
-                                'ResourceRecords': [
-                                    {
-                                        'Value': updateip
-                                    }
-                                ]
-                            }
-                        }
-                    ]
-                }
+            host = self.config.host(hostname)
+            values = self.zone_snapshots.lookup(
+                self.__route53(),
+                region = host.route_53_region,
+                hosted_zone_id = host.route_53_zone_id,
+                name = hostname,
+                record_type = host.route_53_record_type.value
             )
+            if values is None:
+                return ""
+            if len(values) != 1:
+                return Error('You should only have a single value for your dynamic record. You currently have more than one.')
+            return values[0]
+        except Exception as ex:
+            return self.__error("Retrieval of current ip address failed. Excpeption: ", ex)
+
+
+    def read_records(self, hostname: str, record_types: list):
+        try:
+            host = self.config.host(hostname)
+            if self.zone_snapshots.ttl > 0:
+                values = { record_type: self.zone_snapshots.lookup(
+                    self.__route53(),
+                    region = host.route_53_region,
+                    hosted_zone_id = host.route_53_zone_id,
+                    name = hostname,
+                    record_type = record_type
+                ) for record_type in record_types }
+            else:
+                # Record sets are ordered by name and type, A and AAAA of a name are adjacent in one page
+                recordset = self.__route53().client_list_resource_record_sets(
+                    region = host.route_53_region,
+                    hosted_zone_id = host.route_53_zone_id, 
+                    start_record_name = hostname, 
+                    start_record_type = min(record_types), 
+                    max_items = str(len(record_types))
+                )
+                values = {}
+                for record in recordset['ResourceRecordSets']:
+                    if normalize(record['Name']) == normalize(hostname) and record['Type'] in record_types:
+                        values[record['Type']] = [ value['Value'] for value in record.get('ResourceRecords', []) ]
+            results = {}
+            for record_type in record_types:
+                value = values.get(record_type)
+                if value is None:
+                    results[record_type] = ""
+                elif len(value) != 1:
+                    return Error('You should only have a single value for your dynamic record. You currently have more than one.')
+                else:
+                    results[record_type] = value[0]
+            return results
+        except Exception as ex:
+            return self.__error("Retrieval of current ip address failed. Excpeption: ", ex)
+
+
+    def update_records(self, hostname: str, records: dict):
+        try:
+            host = self.config.host(hostname)
+            try:
+                response = self.__route53().client_change_resource_record_sets(
+                    region = host.route_53_region,
+                    hosted_zone_id = host.route_53_zone_id,
+                    change_batch = {
+                        'Changes': [ self.__change(host, updateip, record_type) for record_type, updateip in records.items() ]
+                    }
+                )
+            except Exception:
+                self.zone_snapshots.invalidate(host.route_53_region, host.route_53_zone_id)
+                raise
+            self.__record(host.route_53_region, [ hostname ], response)
+            for record_type, updateip in records.items():
+                self.zone_snapshots.patch(host.route_53_region, host.route_53_zone_id, hostname, record_type, [ updateip ])
+            return dict(records)
+        except Exception as ex:
+            return self.__error("Update of DNS record failed. Exception: ", ex)
+
+
+    def update(self, hostname: str, updateip: str):
+        try:
+            host = self.config.host(hostname)
+            try:
+                response = self.__route53().client_change_resource_record_sets(
+                    region = host.route_53_region,
+                    hosted_zone_id = host.route_53_zone_id,
+                    change_batch = {
+                        'Changes': [ self.__change(host, updateip) ]
+                    }
+                )
+            except Exception:
+                self.zone_snapshots.invalidate(host.route_53_region, host.route_53_zone_id)
+                raise
+            self.__record(host.route_53_region, [ hostname ], response)
+            self.zone_snapshots.patch(host.route_53_region, host.route_53_zone_id, hostname, host.route_53_record_type.value, [ updateip ])
             return updateip
         except Exception as ex:
-            return Error("Update of DNS record failed. Exception: " + str(ex))
+            return self.__error("Update of DNS record failed. Exception: ", ex)
+
+
+    def update_batch(self, updates: dict):
+        results = {}
+        zones = {}
+        for hostname, updateip in updates.items():
+            try:
+                host = self.config.host(hostname)
+                zone = (host.route_53_region, host.route_53_zone_id)
+                zones.setdefault(zone, []).append((hostname, updateip, self.__change(host, updateip)))
+            except Exception as ex:
+                results[hostname] = self.__error("Update of DNS record failed. Exception: ", ex)
+
+        for (region, zone_id), changes in zones.items():
+            for i in range(0, len(changes), MAX_CHANGES_PER_BATCH):
+                chunk = changes[i:i + MAX_CHANGES_PER_BATCH]
+                try:
+                    response = self.__route53().client_change_resource_record_sets(
+                        region = region,
+                        hosted_zone_id = zone_id,
+                        change_batch = {
+                            'Changes': [ change for _, _, change in chunk ]
+                        }
+                    )
+                    self.__record(region, [ hostname for hostname, _, _ in chunk ], response)
+                    for hostname, updateip, change in chunk:
+                        self.zone_snapshots.patch(region, zone_id, hostname, change['ResourceRecordSet']['Type'], [ updateip ])
+                        results[hostname] = updateip
+                except Exception as ex:
+                    self.zone_snapshots.invalidate(region, zone_id)
+                    for hostname, _, _ in chunk:
+                        results[hostname] = self.__error("Update of DNS record failed. Exception: ", ex)
+        return results
+
+
+    def change(self, hostname: str):
+        change = self.change_tracker.latest(hostname)
+        return change['change'] if change is not None else None
+
+    def live(self):
+        return self.zone_snapshots.ttl <= 0
+
+
+    def status(self, hostname: str, change_id: str = None):
+        try:
+            if change_id is None:
+                change = self.change_tracker.latest(hostname)
+                if change is None:
+                    return Error("No change of '" + hostname + "' is known, pass the change id of the update.")
+            else:
+                change = self.change_tracker.get(change_id)
+            if change is not None:
+                self.change_tracker.poll(self.__route53(), [ change['change'] ])
+            else:
+                # A change id of the caller is polled once per request, it never enters the tracker shared by all requests
+                change = untracked(self.config.host(hostname).route_53_region, change_id)
+                self.change_tracker.refresh(self.__route53(), change)
+            return { 'change': change['change'], 'status': change['status'], 'seconds': seconds(change) }
+        except Exception as ex:
+            return self.__error("Retrieval of change status failed. Exception: ", ex)
+
+
+    def poll(self):
+        try:
+            return [ { 'change': change['change'], 'status': change['status'], 'seconds': seconds(change) } 
+                for change in self.change_tracker.poll(self.__route53()) ]
+        except Exception:
+            return []
+
+
+    def __route53(self):
+        return retry.Retrying(self.boto3_wrapper, self.retrier)
+
+
+    def __error(self, message: str, ex: Exception):
+        if isinstance(ex, retry.Saturated):
+            return Unavailable(message + str(ex), ex.retry_after)
+        return Error(message + str(ex))
+
+
+    def __record(self, region: str, hostnames: list, response: dict):
+        if isinstance(response, dict):
+            self.change_tracker.record(region, hostnames, response.get('ChangeInfo'))
+
+
+    def __change(self, host: HostConfig, updateip: str, record_type: str = None):
+        return {
+            'Action': 'UPSERT',
+            'ResourceRecordSet': {
+                'Name': host.hostname,
+                'Type': record_type if record_type is not None else host.route_53_record_type.value,
+                'TTL': host.route_53_record_ttl,
+                'ResourceRecords': [
+                    {
+                        'Value': updateip
+                    }
+                ]
+            }
+        }
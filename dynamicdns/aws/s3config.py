@@ -1,7 +1,9 @@
 import json
 import os
+import time
 
-from dynamicdns.models import Error, ConfigProvider
+from dynamicdns import metrics, shards
+from dynamicdns.models import Error, HostNotFound, ConfigProvider, compile_config
 from dynamicdns.aws.boto3wrapper import Boto3Wrapper
 
 
@@ -9,10 +11,78 @@ def factory(boto3_wrapper: Boto3Wrapper):
     return S3ConfigProvider(boto3_wrapper)
 
 
+def parse(data: str):
+    """Parse a configuration object.  Returns a Manifest for a sharded or a dict of hostname to HostConfig for a monolithic configuration"""
+    document = json.loads(data)
+    manifest = shards.manifest(document)
+    if manifest is not None:
+        return manifest
+    return compile_config(document, lenient=True)
+
+
+class ConfigCache:
+    """Compiled configurations kept across warm invocations, revalidated by ETag after the TTL"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.clear()
+
+    def get(self, boto3_wrapper: Boto3Wrapper, region: str, bucket: str, key: str):
+        now = time.monotonic()
+        entry = self.entries.get((region, bucket, key))
+        if entry is not None and now - entry['loaded'] < self.ttl:
+            self.hits += 1
+            metrics.current().count('config_cache_hits')
+            return entry['config']
+
+        data, etag = boto3_wrapper.client_get_object_conditional(
+            region=region,
+            bucket=bucket,
+            key=key,
+            etag=entry['etag'] if entry is not None else None
+        )
+        if data is None:
+            self.revalidations += 1
+            metrics.current().count('config_cache_revalidations')
+            entry['loaded'] = now
+            return entry['config']
+
+        self.misses += 1
+        metrics.current().count('config_cache_misses')
+        with metrics.current().stage('config_parse'):
+            config = parse(data)
+        self.entries[(region, bucket, key)] = { 'config': config, 'etag': etag, 'loaded': now }
+        return config
+
+    def peek(self, region: str, bucket: str, key: str):
+        """Configuration of a previous load regardless of its age, without I/O.  Returns Manifest, dict or None"""
+        entry = self.entries.get((region, bucket, key))
+        return entry['config'] if entry is not None else None
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations
+        }
+
+    def clear(self):
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+
+cache = ConfigCache(float(os.environ.get('CONFIG_CACHE_TTL', '60')))
+
+
 class S3ConfigProvider(ConfigProvider):
 
-    def __init__(self, boto3_wrapper: Boto3Wrapper):
+    def __init__(self, boto3_wrapper: Boto3Wrapper, config_cache: ConfigCache = None):
         self.boto3_wrapper = boto3_wrapper 
+        self.config_cache = config_cache if config_cache is not None else cache
+        self.config = None
+        self.shards = {}
 
     def load(self):
         if not ('CONFIG_S3_REGION' in os.environ 
@@ -25,31 +95,61 @@ class S3ConfigProvider(ConfigProvider):
         config_s3_key: str = os.environ['CONFIG_S3_KEY']
 
         try:
-            data = self.boto3_wrapper.client_get_object(
+            config = self.config_cache.get(
+                self.boto3_wrapper,
                 region=config_s3_region, 
                 bucket=config_s3_bucket,
                 key=config_s3_key
             )
-            self.config = json.loads(data)
         except Exception as ex:
             return Error("Could not read configuration. Excpeption: " + str(ex))
+        self.location = (config_s3_region, config_s3_bucket)
+        self.shards = {}
+        self.config = config
         
+    def host(self, hostname: str):
+        config = self.config
+        if config is None:
+            # Not loaded yet, e.g. while a DNS read overlaps the load
+            host = self.cached(hostname)
+            if host is None:
+                raise HostNotFound(hostname)
+            return host
+        if isinstance(config, shards.Manifest):
+            config = self.__shard(config.key(hostname))
+        return config.host(hostname)
+
+    def cached(self, hostname: str):
+        try:
+            region, bucket, key = os.environ['CONFIG_S3_REGION'], os.environ['CONFIG_S3_BUCKET'], os.environ['CONFIG_S3_KEY']
+        except KeyError:
+            return None
+        config = self.config_cache.peek(region, bucket, key)
+        if isinstance(config, shards.Manifest):
+            config = self.config_cache.peek(region, bucket, config.key(hostname))
+        return config.get(hostname) if isinstance(config, dict) else None
+
     def route_53_region(self, hostname: str):
-        return self.__checkAndReturn(hostname, 'route_53_region')
+        return self.host(hostname).route_53_region
 
     def route_53_zone_id(self, hostname: str):
-        return self.__checkAndReturn(hostname, 'route_53_zone_id')
+        return self.host(hostname).route_53_zone_id
 
     def route_53_record_ttl(self, hostname: str):
-        return self.__checkAndReturn(hostname, 'route_53_record_ttl')
+        return self.host(hostname).route_53_record_ttl
 
     def route_53_record_type(self, hostname: str):
-        return self.__checkAndReturn(hostname, 'route_53_record_type')
+        return self.host(hostname).route_53_record_type.value
 
     def shared_secret(self, hostname: str):
-        return self.__checkAndReturn(hostname, 'shared_secret')
+        return self.host(hostname).shared_secret
 
-    def __checkAndReturn(self, hostname: str, attr: str):
-        if not hostname in self.config or not attr in self.config[hostname]:
-            raise Exception("Configuration for hostname '" + hostname + "' and attribute '" +  attr+ "' not found.")
-        return self.config[hostname][attr]
+    def __shard(self, key: str):
+        shard = self.shards.get(key)
+        if shard is None:
+            region, bucket = self.location
+            shard = self.config_cache.get(self.boto3_wrapper, region=region, bucket=bucket, key=key)
+            if not isinstance(shard, dict):
+                raise Exception("Configuration shard '" + key + "' is not a host configuration.")
+            self.shards[key] = shard
+        return shard
@@ -0,0 +1,51 @@
+import json
+
+from dynamicdns.models import UpdateQueue
+from dynamicdns.aws.boto3wrapper import Boto3Wrapper
+
+
+# SQS returns and deletes at most 10 messages per call
+MAX_MESSAGES_PER_CALL = 10
+
+
+def factory(boto3_wrapper: Boto3Wrapper, region: str, queue_url: str):
+    return SQSQueue(boto3_wrapper, region, queue_url)
+
+
+class SQSQueue(UpdateQueue):
+
+    def __init__(self, boto3_wrapper: Boto3Wrapper, region: str, queue_url: str, wait_time_seconds: int = 0):
+        self.boto3_wrapper = boto3_wrapper
+        self.region = region
+        self.queue_url = queue_url
+        self.wait_time_seconds = wait_time_seconds
+
+    def send(self, update: dict):
+        self.boto3_wrapper.client_send_message(
+            region = self.region,
+            queue_url = self.queue_url,
+            message_body = json.dumps(update)
+        )
+
+    def receive(self, max_items: int):
+        messages = []
+        while len(messages) < max_items:
+            response = self.boto3_wrapper.client_receive_message(
+                region = self.region,
+                queue_url = self.queue_url,
+                max_number_of_messages = min(MAX_MESSAGES_PER_CALL, max_items - len(messages)),
+                wait_time_seconds = self.wait_time_seconds
+            )
+            received = response.get('Messages', [])
+            if not received:
+                break
+            messages.extend((message['ReceiptHandle'], json.loads(message['Body'])) for message in received)
+        return messages
+
+    def delete(self, receipts: list):
+        for i in range(0, len(receipts), MAX_MESSAGES_PER_CALL):
+            self.boto3_wrapper.client_delete_message_batch(
+                region = self.region,
+                queue_url = self.queue_url,
+                entries = [ { 'Id': str(n), 'ReceiptHandle': receipt } for n, receipt in enumerate(receipts[i:i + MAX_MESSAGES_PER_CALL]) ]
+            )
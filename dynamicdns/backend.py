@@ -0,0 +1,84 @@
+import os
+
+from dynamicdns import debounce, ratelimit, signing
+from dynamicdns.aws import (s3config, route53, boto3wrapper, sqs, dynamodb)
+
+
+def aws():
+    """S3 (or with CONFIG_PACKED_PATH packed) configuration and Route 53 records, debounced if UPDATE_MIN_INTERVAL is set.  Returns (ConfigProvider, DNSProvider)"""
+    boto3_wrapper = boto3wrapper.factory()
+    if 'CONFIG_PACKED_PATH' in os.environ:
+        from dynamicdns import packed
+        config = packed.factory(os.environ['CONFIG_PACKED_PATH'])
+    else:
+        config = s3config.factory(boto3_wrapper)
+    dns = route53.factory(boto3_wrapper, config)
+    if debounce.state.min_interval > 0:
+        dns = debounce.factory(dns)
+    return config, dns
+
+
+def sqlite():
+    """SQLite configuration and records of the database at SQLITE_PATH, debounced if UPDATE_MIN_INTERVAL is set.  Returns (ConfigProvider, DNSProvider)"""
+    import dynamicdns.sqlite
+    database = dynamicdns.sqlite.database(os.environ['SQLITE_PATH'])
+    config = dynamicdns.sqlite.SQLiteConfigProvider(database)
+    dns = dynamicdns.sqlite.SQLiteDNSProvider(database, config)
+    if debounce.state.min_interval > 0:
+        dns = debounce.factory(dns)
+    return config, dns
+
+
+def aws_queue():
+    """SQS queue of the asynchronous update mode, if UPDATE_QUEUE_URL is configured.  Returns UpdateQueue or None"""
+    if not os.environ.get('UPDATE_QUEUE_URL'):
+        return None
+    region = os.environ.get('UPDATE_QUEUE_REGION', os.environ.get('AWS_REGION'))
+    return sqs.factory(boto3wrapper.factory(), region, os.environ['UPDATE_QUEUE_URL'])
+
+
+def aws_buckets():
+    """DynamoDB token buckets shared by all containers if RATE_LIMIT_TABLE is configured, otherwise the buckets of this container.  Returns BucketStore"""
+    if not 'RATE_LIMIT_TABLE' in os.environ:
+        return ratelimit.buckets
+    region = os.environ.get('RATE_LIMIT_REGION', os.environ.get('AWS_REGION'))
+    return dynamodb.factory(boto3wrapper.factory(), region, os.environ['RATE_LIMIT_TABLE'])
+
+
+def aws_nonces():
+    """DynamoDB nonces shared by all containers if NONCE_TABLE is configured, otherwise the nonces of this container.  Returns NonceStore"""
+    if not 'NONCE_TABLE' in os.environ:
+        return signing.nonces
+    region = os.environ.get('NONCE_REGION', os.environ.get('AWS_REGION'))
+    return dynamodb.nonce_factory(boto3wrapper.factory(), region, os.environ['NONCE_TABLE'])
+
+
+current = sqlite if 'SQLITE_PATH' in os.environ else aws
+current_queue = aws_queue
+current_buckets = aws_buckets
+current_nonces = aws_nonces
+
+
+def use(backend, queue_backend = None, buckets_backend = None, nonces_backend = None):
+    """Select the callables building the providers, the update queue (None for synchronous updates), the rate limit buckets and the nonces (in-process by default) of every following request"""
+    global current, current_queue, current_buckets, current_nonces
+    current = backend
+    current_queue = queue_backend if queue_backend is not None else (lambda: None)
+    current_buckets = buckets_backend if buckets_backend is not None else (lambda: ratelimit.buckets)
+    current_nonces = nonces_backend if nonces_backend is not None else (lambda: signing.nonces)
+
+
+def providers():
+    return current()
+
+
+def queue():
+    return current_queue()
+
+
+def buckets():
+    return current_buckets()
+
+
+def nonces():
+    return current_nonces()
@@ -0,0 +1,100 @@
+import os
+import threading
+import time
+
+from dynamicdns.models import Error, Deferred, DNSProvider
+
+
+def factory(dns: DNSProvider, debouncer = None):
+    return DebouncedDNSProvider(dns, debouncer if debouncer is not None else state)
+
+
+class Debouncer:
+    """Time of the last write and pending value per hostname"""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.written = {}
+        self.pending = {}
+
+
+state = Debouncer(float(os.environ.get('UPDATE_MIN_INTERVAL', '0')))
+
+
+class DebouncedDNSProvider(DNSProvider):
+    """Writes a hostname at most once per min_interval, the last value within the interval wins"""
+
+    def __init__(self, dns: DNSProvider, debouncer: Debouncer):
+        self.dns = dns
+        self.debouncer = debouncer
+
+    def read(self, hostname: str):
+        return self.dns.read(hostname)
+
+    def update(self, hostname: str, updateip: str):
+        return self.update_batch({ hostname: updateip })[hostname]
+
+    def read_records(self, hostname: str, record_types: list):
+        return self.dns.read_records(hostname, record_types)
+
+    def update_records(self, hostname: str, records: dict):
+        """Records of several types are written right away, they are not debounced"""
+        return self.dns.update_records(hostname, records)
+
+    def change(self, hostname: str):
+        return self.dns.change(hostname)
+
+    def live(self):
+        return self.dns.live()
+
+    def status(self, hostname: str, change_id: str = None):
+        return self.dns.status(hostname, change_id)
+
+    def poll(self):
+        return self.dns.poll()
+
+    def update_batch(self, updates: dict):
+        results = {}
+        writes = {}
+        debouncer = self.debouncer
+        with debouncer.lock:
+            now = time.monotonic()
+            for hostname, updateip in updates.items():
+                if hostname in debouncer.written and now - debouncer.written[hostname] < debouncer.min_interval:
+                    debouncer.pending[hostname] = updateip
+                    results[hostname] = Deferred(updateip)
+                else:
+                    # A deferred value is superseded by this one
+                    debouncer.pending.pop(hostname, None)
+                    writes[hostname] = updateip
+        if writes:
+            results.update(self.__write(writes))
+        return results
+
+    def flush(self):
+        """Write the pending values whose interval has passed, e.g. by the tick of the self-hosted server.  Returns a dict of hostname to updated ip or Error"""
+        debouncer = self.debouncer
+        with debouncer.lock:
+            now = time.monotonic()
+            writes = { hostname: updateip for hostname, updateip in debouncer.pending.items() 
+                if now - debouncer.written.get(hostname, 0) >= debouncer.min_interval }
+        if not writes:
+            return {}
+        return self.__write(writes)
+
+    def __write(self, writes: dict):
+        results = self.dns.update_batch(writes)
+        debouncer = self.debouncer
+        with debouncer.lock:
+            now = time.monotonic()
+            for hostname, result in results.items():
+                if isinstance(result, Error):
+                    continue
+                debouncer.written[hostname] = now
+                if debouncer.pending.get(hostname) == result:
+                    debouncer.pending.pop(hostname)
+        return results
@@ -0,0 +1,82 @@
+import hashlib
+import hmac
+import os
+import threading
+import time
+
+from collections import OrderedDict
+
+
+class KnownAddresses:
+    """Last address confirmed or written per hostname, a bounded LRU whose entries expire after the TTL"""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.clear()
+
+    def get(self, hostname: str):
+        with self.lock:
+            entry = self.entries.get(hostname)
+            if entry is None:
+                return None
+            ip, stored = entry
+            if time.monotonic() - stored >= self.ttl:
+                del self.entries[hostname]
+                return None
+            self.entries.move_to_end(hostname)
+            return ip
+
+    def put(self, hostname: str, ip: str):
+        with self.lock:
+            self.entries[hostname] = (ip, time.monotonic())
+            self.entries.move_to_end(hostname)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, hostname: str):
+        with self.lock:
+            self.entries.pop(hostname, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries = OrderedDict()
+
+
+known = KnownAddresses(
+    float(os.environ.get('FASTPATH_TTL', '300')),
+    int(os.environ.get('FASTPATH_MAX_ENTRIES', '10000'))
+)
+
+
+class Tokens:
+    """Short-lived tokens confirming that a hostname has been verified with an address, signed with a server secret"""
+
+    def __init__(self, secret: bytes, ttl: float):
+        self.secret = secret
+        self.ttl = ttl
+
+    def issue(self, hostname: str, ip: str):
+        """Token for hostname and ip.  Returns str or None if tokens are disabled"""
+        if self.ttl <= 0:
+            return None
+        expiry = str(int(time.time() + self.ttl))
+        return expiry + "." + self.__sign(hostname, ip, expiry)
+
+    def verify(self, token: str, hostname: str, ip: str):
+        expiry, _, signature = token.partition(".")
+        if not expiry.isdigit() or int(expiry) <= time.time():
+            return False
+        return hmac.compare_digest(signature, self.__sign(hostname, ip, expiry))
+
+    def __sign(self, hostname: str, ip: str, expiry: str):
+        message = hostname + "\n" + ip + "\n" + expiry
+        return hmac.new(self.secret, message.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+# Without a configured secret the tokens are only accepted by the container issuing them
+tokens = Tokens(
+    os.environ['FASTPATH_TOKEN_SECRET'].encode('utf-8') if 'FASTPATH_TOKEN_SECRET' in os.environ else os.urandom(32),
+    float(os.environ.get('FASTPATH_TOKEN_TTL', '900'))
+)
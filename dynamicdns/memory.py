@@ -0,0 +1,113 @@
+import random
+import threading
+import time
+
+from dynamicdns.models import Error, HostNotFound, ConfigProvider, DNSProvider, compile_config
+
+
+class Simulation:
+    """Simulated latency (seconds), random error rate (0..1) and throttling above max_rate calls per second (0 disables)"""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, max_rate: float = 0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.max_rate = max_rate
+        self.lock = threading.Lock()
+        self.tokens = max_rate
+        self.refilled = time.monotonic()
+        self.calls = 0
+        self.errors = 0
+        self.throttled = 0
+
+    def call(self, operation: str):
+        with self.lock:
+            self.calls += 1
+            if self.max_rate > 0:
+                now = time.monotonic()
+                self.tokens = min(self.max_rate, self.tokens + (now - self.refilled) * self.max_rate)
+                self.refilled = now
+                if self.tokens < 1:
+                    self.throttled += 1
+                    return Error("Throttling: Rate exceeded for " + operation + ".")
+                self.tokens -= 1
+            if self.error_rate > 0 and random.random() < self.error_rate:
+                self.errors += 1
+                return Error("Simulated failure of " + operation + ".")
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+
+class MemoryConfigProvider(ConfigProvider):
+
+    def __init__(self, config: dict, simulation: Simulation = None):
+        self.data = config
+        self.compiled = None
+        self.config = None
+        self.simulation = simulation if simulation is not None else Simulation()
+
+    def load(self):
+        error = self.simulation.call('load')
+        if isinstance(error, Error):
+            return Error("Could not read configuration. Excpeption: " + str(error))
+        if self.compiled is None:
+            try:
+                self.compiled = compile_config(self.data, lenient=True)
+            except ValueError as ex:
+                return Error("Invalid configuration. " + str(ex))
+        self.config = self.compiled
+
+    def host(self, hostname: str):
+        if self.config is not None:
+            return self.config.host(hostname)
+        host = self.cached(hostname)
+        if host is None:
+            raise HostNotFound(hostname)
+        return host
+
+    def shared_secret(self, hostname: str):
+        return self.host(hostname).shared_secret
+
+    def cached(self, hostname: str):
+        return self.compiled.get(hostname) if self.compiled is not None else None
+
+
+class MemoryDNSProvider(DNSProvider):
+
+    def __init__(self, records: dict = None, simulation: Simulation = None):
+        self.records = dict(records) if records is not None else {}
+        self.simulation = simulation if simulation is not None else Simulation()
+
+    def read(self, hostname: str):
+        error = self.simulation.call('read')
+        if isinstance(error, Error):
+            return Error("Retrieval of current ip address failed. Excpeption: " + str(error))
+        return self.records.get(hostname, "")
+
+    def update(self, hostname: str, updateip: str):
+        error = self.simulation.call('update')
+        if isinstance(error, Error):
+            return Error("Update of DNS record failed. Exception: " + str(error))
+        self.records[hostname] = updateip
+        return updateip
+
+    def update_batch(self, updates: dict):
+        error = self.simulation.call('update')
+        if isinstance(error, Error):
+            return { hostname: Error("Update of DNS record failed. Exception: " + str(error)) for hostname in updates }
+        self.records.update(updates)
+        return dict(updates)
+
+    def read_records(self, hostname: str, record_types: list):
+        """Records of several types are kept by (hostname, record type)"""
+        error = self.simulation.call('read')
+        if isinstance(error, Error):
+            return Error("Retrieval of current ip address failed. Excpeption: " + str(error))
+        return { record_type: self.records.get((hostname, record_type), "") for record_type in record_types }
+
+    def update_records(self, hostname: str, records: dict):
+        error = self.simulation.call('update')
+        if isinstance(error, Error):
+            return Error("Update of DNS record failed. Exception: " + str(error))
+        for record_type, updateip in records.items():
+            self.records[(hostname, record_type)] = updateip
+        return dict(records)
@@ -0,0 +1,119 @@
+import contextvars
+import json
+import os
+import time
+
+
+class Stage:
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.name, time.perf_counter() - self.start)
+
+
+class Metrics:
+    """Monotonic durations per stage and counters of a single invocation"""
+
+    def __init__(self, resource: str):
+        self.resource = resource
+        self.durations = {}
+        self.counters = {}
+
+    def stage(self, name: str):
+        return Stage(self, name)
+
+    def record(self, name: str, seconds: float):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def count(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def document(self, namespace: str):
+        """CloudWatch Embedded Metric Format document.  Returns dict"""
+        document = {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": namespace,
+                        "Dimensions": [ [ "Resource" ] ],
+                        "Metrics": 
+                            [ { "Name": name, "Unit": "Milliseconds" } for name in self.durations ] + 
+                            [ { "Name": name, "Unit": "Count" } for name in self.counters ]
+                    }
+                ]
+            },
+            "Resource": self.resource
+        }
+        for name, seconds in self.durations.items():
+            document[name] = round(seconds * 1000, 3)
+        document.update(self.counters)
+        return document
+
+
+class NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class NullMetrics:
+
+    def stage(self, name: str):
+        return NULL_STAGE
+
+    def record(self, name: str, seconds: float):
+        pass
+
+    def count(self, name: str, value: int = 1):
+        pass
+
+
+NULL_STAGE = NullStage()
+NULL = NullMetrics()
+
+
+def emf(metrics: Metrics):
+    print(json.dumps(metrics.document(namespace)))
+
+
+mode = os.environ.get('METRICS_MODE', 'off')
+namespace = os.environ.get('METRICS_NAMESPACE', 'DynamicDNS')
+sink = emf
+
+_current = contextvars.ContextVar('metrics', default=NULL)
+
+
+def configure(metrics_mode: str, metrics_sink = emf):
+    """Every mode but 'off' records metrics and hands them to the sink, by default one EMF log line per invocation"""
+    global mode, sink
+    mode = metrics_mode
+    sink = metrics_sink
+
+
+def current():
+    return _current.get()
+
+
+def begin(resource: str):
+    metrics = Metrics(resource) if mode != 'off' else NULL
+    _current.set(metrics)
+    return metrics
+
+
+def end(metrics):
+    _current.set(NULL)
+    if metrics is not NULL:
+        sink(metrics)
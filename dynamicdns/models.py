@@ -1,3 +1,7 @@
+import enum
+import ipaddress
+import logging
+import sys
 
 
 class Error:
@@ -8,14 +12,145 @@ class Error:
         return str(self.msg)
 
 
+class Unavailable(Error):
+    """Error of a backend that is temporarily unavailable, the request may be repeated after retry_after seconds"""
+
+    def __init__(self, msg: str, retry_after: float):
+        super().__init__(msg)
+        self.retry_after = retry_after
+
+
+class HostNotFound(Exception):
+    """Raised by ConfigProvider.host for a hostname missing in the configuration"""
+
+    def __init__(self, hostname: str):
+        super().__init__("Configuration for hostname '" + hostname + "' not found.")
+        self.hostname = hostname
+
+
+class InvalidHost(ValueError):
+    """Raised by ConfigProvider.host for a hostname whose configuration is invalid, the other hostnames of the configuration stay usable"""
+
+
+class Deferred:
+    """Result of an update that has been held back and will be written later"""
+
+    def __init__(self, value: str):
+        self.value = value
+
+    def __str__(self):
+        return str(self.value)
+
+
+class RecordType(enum.Enum):
+    A = 'A'
+    AAAA = 'AAAA'
+
+    @staticmethod
+    def of(ip: str):
+        """Record type of an IPv4 or IPv6 address.  Returns RecordType, raises ValueError"""
+        return RecordType.A if ipaddress.ip_address(ip).version == 4 else RecordType.AAAA
+
+
+class HostConfig:
+    """Validated configuration of a single hostname"""
+
+    __slots__ = ('hostname', 'route_53_region', 'route_53_zone_id', 'route_53_record_ttl', 'route_53_record_type', 'shared_secret')
+
+    def __init__(self, hostname: str, route_53_region: str, route_53_zone_id: str, route_53_record_ttl: int, route_53_record_type: RecordType, shared_secret: str):
+        self.hostname = hostname
+        self.route_53_region = route_53_region
+        self.route_53_zone_id = route_53_zone_id
+        self.route_53_record_ttl = route_53_record_ttl
+        self.route_53_record_type = route_53_record_type
+        self.shared_secret = shared_secret
+
+    @staticmethod
+    def compile(hostname: str, attrs: dict):
+        """Validate the raw attributes of a hostname.  Returns HostConfig, raises ValueError"""
+        if not isinstance(attrs, dict):
+            raise ValueError("Configuration for hostname '" + hostname + "' is not an object.")
+        for attr in HostConfig.__slots__[1:]:
+            if not attr in attrs:
+                raise ValueError("Configuration for hostname '" + hostname + "' and attribute '" + attr + "' not found.")
+        try:
+            ttl = attrs['route_53_record_ttl']
+            if isinstance(ttl, bool) or (isinstance(ttl, float) and not ttl.is_integer()):
+                raise ValueError()
+            ttl = int(ttl)
+            if ttl < 0:
+                raise ValueError()
+        except (TypeError, ValueError):
+            raise ValueError("Configuration for hostname '" + hostname + "' has an invalid route_53_record_ttl.")
+        try:
+            record_type = RecordType(attrs['route_53_record_type'])
+        except ValueError:
+            raise ValueError("Configuration for hostname '" + hostname + "' has an invalid route_53_record_type.")
+        return HostConfig(
+            hostname = hostname,
+            route_53_region = sys.intern(str(attrs['route_53_region'])),
+            route_53_zone_id = sys.intern(str(attrs['route_53_zone_id'])),
+            route_53_record_ttl = ttl,
+            route_53_record_type = record_type,
+            shared_secret = str(attrs['shared_secret'])
+        )
+
+
+# Invalid hostnames named in the warning of a lenient compile
+MAX_LOGGED_ERRORS = 10
+
+
+class Hosts(dict):
+    """Compiled configuration, a dict of hostname to HostConfig.  The errors of hostnames whose configuration is invalid are kept in errors"""
+
+    def __init__(self, hosts: dict = None, errors: dict = None):
+        super().__init__(hosts if hosts is not None else {})
+        self.errors = errors if errors is not None else {}
+
+    def host(self, hostname: str):
+        """Configuration of a hostname.  Returns HostConfig, raises InvalidHost or HostNotFound"""
+        host = self.get(hostname)
+        if host is None:
+            if hostname in self.errors:
+                raise InvalidHost(self.errors[hostname])
+            raise HostNotFound(hostname)
+        return host
+
+
+def compile_config(data: dict, lenient: bool = False):
+    """Validate a raw configuration.  A lenient compile keeps the invalid hostnames in errors (logged once) instead of failing for all of them.  Returns Hosts, raises ValueError"""
+    if not isinstance(data, dict):
+        raise ValueError("Configuration is not an object.")
+    if not lenient:
+        return Hosts({ hostname: HostConfig.compile(hostname, attrs) for hostname, attrs in data.items() })
+    hosts = Hosts()
+    for hostname, attrs in data.items():
+        try:
+            hosts[hostname] = HostConfig.compile(hostname, attrs)
+        except ValueError as ex:
+            hosts.errors[hostname] = str(ex)
+    if hosts.errors:
+        logging.getLogger(__name__).warning("Configuration of %d hostnames is invalid, they are rejected: %s", len(hosts.errors), 
+            " ".join(list(hosts.errors.values())[:MAX_LOGGED_ERRORS]))
+    return hosts
+
+
 class ConfigProvider:
 
     def load(self):
         raise NotImplementedError("Subclass must implement abstract method")
 
+    def host(self, hostname: str):
+        """Configuration of a hostname.  Returns HostConfig, raises HostNotFound if the hostname is unknown or InvalidHost if its configuration is invalid"""
+        raise NotImplementedError("Subclass must implement abstract method")
+
     def shared_secret(self, hostname: str):
         raise NotImplementedError("Subclass must implement abstract method")
 
+    def cached(self, hostname: str):
+        """Configuration of a hostname known without I/O, e.g. from a previous load of this process.  Returns HostConfig or None"""
+        return None
+
 
 class DNSProvider:
 
@@ -24,3 +159,122 @@ class DNSProvider:
 
     def update(self, hostname: str, updateip: str):
         raise NotImplementedError("Subclass must implement abstract method")
+
+    def update_batch(self, updates: dict):
+        """Update several records.  Returns a dict of hostname to updated ip or Error"""
+        return { hostname: self.update(hostname, updateip) for hostname, updateip in updates.items() }
+
+    def read_records(self, hostname: str, record_types: list):
+        """Read the records of several types of a hostname at once.  Returns a dict of record type to ip ("" if missing) or Error"""
+        return Error("Records of several types are not supported by this DNS provider.")
+
+    def update_records(self, hostname: str, records: dict):
+        """Write the records of several types of a hostname at once.  Returns a dict of record type to updated ip or Error"""
+        return Error("Records of several types are not supported by this DNS provider.")
+
+    def change(self, hostname: str):
+        """Id of the last change of hostname submitted by this process.  Returns str or None"""
+        return None
+
+    def live(self):
+        """Whether read returns the current record rather than a snapshot that may be stale.  Returns bool"""
+        return True
+
+    def status(self, hostname: str, change_id: str = None):
+        """Propagation status of the last or the given change of hostname.  Returns dict with change, status and seconds or Error"""
+        return Error("Change tracking is not supported by this DNS provider.")
+
+    def poll(self):
+        """Poll the pending changes that are due.  Returns a list of status dicts"""
+        return []
+
+
+class AsyncConfigProvider:
+    """ConfigProvider whose methods doing I/O are coroutines"""
+
+    async def load(self):
+        raise NotImplementedError("Subclass must implement abstract method")
+
+    async def host(self, hostname: str):
+        """Configuration of a hostname.  Returns HostConfig, raises HostNotFound if the hostname is unknown or InvalidHost if its configuration is invalid"""
+        raise NotImplementedError("Subclass must implement abstract method")
+
+    async def shared_secret(self, hostname: str):
+        raise NotImplementedError("Subclass must implement abstract method")
+
+    def cached(self, hostname: str):
+        """Configuration of a hostname known without I/O, e.g. from a previous load of this process.  Returns HostConfig or None"""
+        return None
+
+
+class AsyncDNSProvider:
+    """DNSProvider whose methods doing I/O are coroutines"""
+
+    async def read(self, hostname: str):
+        raise NotImplementedError("Subclass must implement abstract method")
+
+    async def update(self, hostname: str, updateip: str):
+        raise NotImplementedError("Subclass must implement abstract method")
+
+    async def update_batch(self, updates: dict):
+        """Update several records.  Returns a dict of hostname to updated ip or Error"""
+        return { hostname: await self.update(hostname, updateip) for hostname, updateip in updates.items() }
+
+    async def read_records(self, hostname: str, record_types: list):
+        """Read the records of several types of a hostname at once.  Returns a dict of record type to ip ("" if missing) or Error"""
+        return Error("Records of several types are not supported by this DNS provider.")
+
+    async def update_records(self, hostname: str, records: dict):
+        """Write the records of several types of a hostname at once.  Returns a dict of record type to updated ip or Error"""
+        return Error("Records of several types are not supported by this DNS provider.")
+
+    def change(self, hostname: str):
+        """Id of the last change of hostname submitted by this process.  Returns str or None"""
+        return None
+
+    def live(self):
+        """Whether read returns the current record rather than a snapshot that may be stale.  Returns bool"""
+        return True
+
+    async def status(self, hostname: str, change_id: str = None):
+        """Propagation status of the last or the given change of hostname.  Returns dict with change, status and seconds or Error"""
+        return Error("Change tracking is not supported by this DNS provider.")
+
+    async def poll(self):
+        """Poll the pending changes that are due.  Returns a list of status dicts"""
+        return []
+
+
+class UpdateQueue:
+
+    def send(self, update: dict):
+        raise NotImplementedError("Subclass must implement abstract method")
+
+    def receive(self, max_items: int):
+        """Receive pending updates.  Returns a list of (receipt, update) tuples"""
+        raise NotImplementedError("Subclass must implement abstract method")
+
+    def delete(self, receipts: list):
+        raise NotImplementedError("Subclass must implement abstract method")
+
+
+class BucketStore:
+
+    def take(self, key: str, rate: float, burst: float):
+        """Take a token from the bucket of key, refilled with rate tokens per second up to burst.  Returns 0 if a token was taken, otherwise the seconds until the next token"""
+        raise NotImplementedError("Subclass must implement abstract method")
+
+
+class NonceStore:
+
+    def seen(self, key: str):
+        """Whether key has been added before.  Returns bool"""
+        raise NotImplementedError("Subclass must implement abstract method")
+
+    def add(self, key: str):
+        """Remember key.  Returns False if it has been added before"""
+        raise NotImplementedError("Subclass must implement abstract method")
+
+    def shared(self):
+        """Whether the nonces are shared by every process answering requests, so a request cannot be replayed to another one.  Returns bool"""
+        return False
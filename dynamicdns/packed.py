@@ -0,0 +1,175 @@
+"""Packed configuration layout.
+
+A packed configuration is a binary file read through mmap, so loading it does
+not depend on the number of hostnames and a lookup touches only the pages of
+the hostname it needs.  All integers are little endian:
+
+    header   magic "DDNS", version, reserved, number of slots, number of hosts
+    index    one slot per power of two, (crc32 of the hostname, offset of
+             its record + 1), 0 marks an empty slot, collisions probe linearly
+    records  ttl and the lengths of hostname, region, zone id, record type and
+             shared secret, followed by these fields in UTF-8
+
+Compile a configuration into the deployment package (or /tmp) and point
+CONFIG_PACKED_PATH at it:
+
+    python -m dynamicdns.packed config/server-dev.config dynamicdns/config.packed
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import zlib
+
+from dynamicdns.models import Error, HostNotFound, HostConfig, RecordType, ConfigProvider, compile_config
+
+
+MAGIC = b'DDNS'
+VERSION = 1
+
+HEADER = struct.Struct('<4sHHII')
+SLOT = struct.Struct('<II')
+RECORD = struct.Struct('<IBBBBH')
+
+
+def factory(path: str):
+    return PackedConfigProvider(path)
+
+
+def pack(config: dict):
+    """Validate a configuration and lay it out as packed configuration.  Returns bytes, raises ValueError"""
+    hosts = compile_config(config)
+    slots = 8
+    while slots < 2 * len(hosts):
+        slots *= 2
+    index = bytearray(slots * SLOT.size)
+    records = bytearray()
+    base = HEADER.size + len(index)
+    for hostname, host in hosts.items():
+        fields = [ value.encode('utf-8') for value in (hostname, host.route_53_region, host.route_53_zone_id, host.route_53_record_type.value) ]
+        secret = host.shared_secret.encode('utf-8')
+        if any(len(field) > 0xff for field in fields) or len(secret) > 0xffff or host.route_53_record_ttl > 0xffffffff:
+            raise ValueError("Configuration for hostname '" + hostname + "' is too large to pack.")
+        digest = zlib.crc32(fields[0])
+        slot = digest & (slots - 1)
+        while SLOT.unpack_from(index, slot * SLOT.size)[1] != 0:
+            slot = (slot + 1) & (slots - 1)
+        SLOT.pack_into(index, slot * SLOT.size, digest, base + len(records) + 1)
+        records += RECORD.pack(host.route_53_record_ttl, *[ len(field) for field in fields ], len(secret))
+        records += b"".join(fields) + secret
+    if base + len(records) >= 0xffffffff:
+        raise ValueError("Configuration is too large to pack.")
+    return HEADER.pack(MAGIC, VERSION, 0, slots, len(hosts)) + bytes(index) + bytes(records)
+
+
+def write(config: dict, path: str):
+    """Pack a configuration into path, replacing the file atomically so mappings of the previous file stay intact.  Returns the number of hosts"""
+    data = pack(config)
+    with open(path + ".tmp", "wb") as file:
+        file.write(data)
+    os.replace(path + ".tmp", path)
+    return HEADER.unpack_from(data, 0)[4]
+
+
+class PackedConfig:
+    """Read-only mapping of a packed configuration file"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            stat = os.fstat(file.fileno())
+            if stat.st_size < HEADER.size:
+                raise ValueError("File '" + path + "' is not a packed configuration.")
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(self.data, 'madvise') and hasattr(mmap, 'MADV_RANDOM'):
+            # Lookups hit single pages, reading ahead would only fill the memory
+            self.data.madvise(mmap.MADV_RANDOM)
+        self.identity = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        magic, version, _, self.slots, self.count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION or self.slots < 1 or self.slots & (self.slots - 1) or len(self.data) < HEADER.size + self.slots * SLOT.size:
+            raise ValueError("File '" + path + "' is not a packed configuration.")
+
+    def get(self, hostname: str):
+        """Configuration of a hostname.  Returns HostConfig or None"""
+        data = self.data
+        name = hostname.encode('utf-8')
+        digest = zlib.crc32(name)
+        mask = self.slots - 1
+        slot = digest & mask
+        while True:
+            stored, offset = SLOT.unpack_from(data, HEADER.size + slot * SLOT.size)
+            if offset == 0:
+                return None
+            if stored == digest:
+                ttl, *lengths = RECORD.unpack_from(data, offset - 1)
+                start = offset - 1 + RECORD.size
+                if data[start:start + lengths[0]] == name:
+                    fields = []
+                    for length in lengths:
+                        fields.append(data[start:start + length].decode('utf-8'))
+                        start += length
+                    return HostConfig(hostname, sys.intern(fields[1]), sys.intern(fields[2]), ttl, RecordType(fields[3]), fields[4])
+            slot = (slot + 1) & mask
+
+    def __len__(self):
+        return self.count
+
+
+files = {}
+lock = threading.Lock()
+
+
+def mapping(path: str):
+    """Mapping of path shared by all requests of a process, mapped again once the file is replaced.  Returns PackedConfig, raises OSError or ValueError"""
+    stat = os.stat(path)
+    with lock:
+        result = files.get(path)
+    if result is None or result.identity != (stat.st_ino, stat.st_size, stat.st_mtime_ns):
+        result = PackedConfig(path)
+        with lock:
+            files[path] = result
+    return result
+
+
+class PackedConfigProvider(ConfigProvider):
+
+    def __init__(self, path: str):
+        self.path = path
+        self.config = None
+
+    def load(self):
+        try:
+            self.config = mapping(self.path)
+        except (OSError, ValueError) as ex:
+            return Error("Could not read configuration. Excpeption: " + str(ex))
+
+    def host(self, hostname: str):
+        config = self.config if self.config is not None else files.get(self.path)
+        host = config.get(hostname) if config is not None else None
+        if host is None:
+            raise HostNotFound(hostname)
+        return host
+
+    def shared_secret(self, hostname: str):
+        return self.host(hostname).shared_secret
+
+    def cached(self, hostname: str):
+        config = files.get(self.path)
+        return config.get(hostname) if config is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile a monolithic configuration into a packed configuration.')
+    parser.add_argument('config', help='monolithic configuration file')
+    parser.add_argument('output', help='packed configuration file, e.g. in the deployment package')
+    args = parser.parse_args()
+
+    with open(args.config) as file:
+        config = json.load(file)
+    print("Packed " + str(write(config, args.output)) + " hosts.")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,56 +1,369 @@
-import re
-import hashlib
+import hmac
+import time
 
-from dynamicdns.models import Error, ConfigProvider, DNSProvider
+from dynamicdns import metrics, fastpath, signing
+from dynamicdns.models import Error, Deferred, RecordType, ConfigProvider, DNSProvider, AsyncConfigProvider, AsyncDNSProvider, UpdateQueue, NonceStore
 
 
-def factory(dns: DNSProvider):
-    return Processor(dns)
+def factory(dns: DNSProvider, queue: UpdateQueue = None, nonces: NonceStore = None):
+    return Processor(dns, queue, nonces=nonces)
+
+
+def wellformed(update):
+    """Whether a queued update has a hostname, an ip and a numeric timestamp.  Returns bool"""
+    return (isinstance(update, dict) and isinstance(update.get('hostname'), str) and isinstance(update.get('ip'), str)
+        and isinstance(update.get('timestamp'), (int, float)) and not isinstance(update.get('timestamp'), bool))
 
 
 class Processor:
 
-    def __init__(self, dns: DNSProvider):
+    def __init__(self, dns: DNSProvider, queue: UpdateQueue = None, known: fastpath.KnownAddresses = None, tokens: fastpath.Tokens = None, nonces: NonceStore = None):
         self.dns = dns
+        self.queue = queue
+        self.known = known if known is not None else fastpath.known
+        self.tokens = tokens if tokens is not None else fastpath.tokens
+        self.nonces = nonces if nonces is not None else signing.nonces
+
+    def checkreplay(self, hostname: str, timestamp: str, nonce: str):
+        """Reject an outdated timestamp or a nonce seen before, without configuration or DNS access.  Returns Error or None"""
+        if timestamp is None:
+            return
+
+        error = self.__checktimestamp(timestamp)
+        if isinstance(error, Error):
+            return error
 
-    def checkhash(self, hostname: str, validationhash: str, sourceip: str, sharedsecret: str):
+        error = self.__checknonce(hostname, nonce)
+        if isinstance(error, Error):
+            return error
+
+    def checkhash(self, hostname: str, validationhash: str, sourceip: str, sharedsecret: str, timestamp: str = None, nonce: str = None, sign: str = 'sourceip', internalip: str = "", ipv4: str = None, ipv6: str = None):
+        """Check the hash of a request, signed with sourceip or, if sign is 'host', bound to the observed sourceip.  Returns Error or None"""
 
         error = self.__checkhashformat(validationhash)
         if isinstance(error, Error):
             return error
 
-        error = self.__comparehash(sourceip, hostname, sharedsecret, validationhash)
+        # Without the source IP in the signature, only nonces shared by all processes keep a request from being replayed elsewhere
+        if sign == 'host' and not self.nonces.shared():
+            return Error("This server does not accept sign=host, sign with the source IP instead.")
+
+        if timestamp is None:
+            if not signing.LEGACY or sign == 'host':
+                return Error("You have to pass 'timestamp' querystring parameters.")
+            error = self.__comparehash(sourceip, hostname, sharedsecret, validationhash)
+            if isinstance(error, Error):
+                return error
+            return
+
+        error = self.__checktimestamp(timestamp)
+        if isinstance(error, Error):
+            return error
+
+        error = self.__checknonce(hostname, nonce)
+        if isinstance(error, Error):
+            return error
+
+        error = self.__comparesignature(sourceip if sign == 'sourceip' else None, hostname, sharedsecret, timestamp, nonce, internalip, ipv4, ipv6, validationhash)
         if isinstance(error, Error):
             return error
 
-    def update(self, hostname: str, sourceip: str, internalip: str):
+        try:
+            added = self.nonces.add(hostname + "\n" + nonce)
+        except Exception as ex:
+            return Error("Nonce could not be recorded. Exception: " + str(ex))
+        if not added:
+            metrics.current().count('replays')
+            return Error("The request has been replayed.")
+
+    def unchanged(self, hostname: str, sourceip: str, internalip: str, knownip: str, token: str):
+        """Answer without configuration and DNS access if the token confirms knownip (the observed address if None) and no other address is known.  Returns message or None"""
+        recorder = metrics.current()
+
+        updateip = sourceip
+        if internalip != "":
+            updateip = internalip
+
+        if knownip is None:
+            knownip = updateip
+
+        if knownip != updateip or not self.tokens.verify(token, hostname, knownip) or self.known.get(hostname) not in (None, knownip):
+            recorder.count('fastpath_misses')
+            return None
 
+        recorder.count('fastpath_hits')
+        return self.__matches(hostname, knownip)
+
+
+    def token(self, hostname: str, sourceip: str, internalip: str):
+        """Token of the fast path if the DNS record of hostname is known to hold the address of the request.  Returns str or None"""
         updateip = sourceip
         if internalip != "":
             updateip = internalip
 
-        currentip = error = self.dns.read(hostname)
+        if self.known.get(hostname) != updateip:
+            return None
+        return self.tokens.issue(hostname, updateip)
+
+
+    def fetch(self, config: ConfigProvider, hostname: str):
+        """Load the configuration and read the current record of hostname at once, see fetch_async.  Returns (Error of the load or None, current ip or Error of the read or None if not read)"""
+        # asyncio is imported on the first overlapped read, not on every cold start
+        from dynamicdns import aio
+        return aio.run(self.fetch_async(aio.config(config), aio.dns(self.dns), hostname))
+
+
+    async def fetch_async(self, config: AsyncConfigProvider, dns: AsyncDNSProvider, hostname: str):
+        """Load the configuration and, overlapped, read the current record of hostname if its zone is known from a previous load.
+        The read is dropped if the loaded configuration moved hostname to another zone.  Returns (Error of the load or None, current ip or Error of the read or None if not read)"""
+        known = config.cached(hostname)
+        if known is None:
+            return await config.load(), None
+
+        import asyncio
+        error, currentip = await asyncio.gather(config.load(), dns.read(hostname))
         if isinstance(error, Error):
-            return error
+            return error, None
+        try:
+            host = await config.host(hostname)
+        except Exception:
+            return None, None
+        if (host.route_53_region, host.route_53_zone_id, host.route_53_record_type) != (known.route_53_region, known.route_53_zone_id, known.route_53_record_type):
+            metrics.current().count('fetch_stale')
+            return None, None
+        metrics.current().count('fetch_overlapped')
+        return None, currentip
+
+
+    def update(self, hostname: str, sourceip: str, internalip: str, currentip: str = None):
+        """Update the record of hostname, currentip is read unless it has been fetched already"""
+        recorder = metrics.current()
+
+        updateip = sourceip
+        if internalip != "":
+            updateip = internalip
+
+        if currentip is None:
+            with recorder.stage('read'):
+                currentip = self.dns.read(hostname)
+        if isinstance(currentip, Error):
+            return currentip
 
         if currentip == updateip:
-            return "Your IP '" + currentip + "' address matches the current DNS record for '" + hostname + "'."
+            # A snapshot may be stale, only a live read confirms the address for the fast path
+            if self.dns.live():
+                self.known.put(hostname, currentip)
+            return self.__matches(hostname, currentip)
+
+        self.known.invalidate(hostname)
+
+        if self.queue is not None:
+            with recorder.stage('enqueue'):
+                error = self.__enqueue(hostname, updateip)
+            if isinstance(error, Error):
+                return error
+            return self.__accepted(hostname, currentip, updateip)
+
+        with recorder.stage('update'):
+            updateip = error = self.dns.update(hostname, updateip)
+        if isinstance(error, Error):
+            return error
+
+        if isinstance(updateip, Deferred):
+            return self.__deferred(hostname, currentip, str(updateip))
+
+        self.known.put(hostname, updateip)
+        return self.__updated(hostname, currentip, updateip)
+
+
+    def dualstack(self, sourceip: str, internalip: str, ipv4: str, ipv6: str):
+        """Addresses of a request passing ipv4 and / or ipv6 besides its own address.  Returns a dict of record type to ip or Error"""
+        updateip = sourceip
+        if internalip != "":
+            updateip = internalip
+
+        addresses = {}
+        try:
+            addresses[RecordType.of(updateip).value] = updateip
+        except ValueError:
+            return Error("You must pass a valid IP address in the internalip= querystring parameter.")
+
+        for param, ip, record_type in (('ipv4', ipv4, RecordType.A), ('ipv6', ipv6, RecordType.AAAA)):
+            if ip is None:
+                continue
+            try:
+                valid = RecordType.of(ip) == record_type
+            except ValueError:
+                valid = False
+            if not valid:
+                return Error("You must pass an IP" + param[2:] + " address in the " + param + "= querystring parameter.")
+            addresses[record_type.value] = ip
+        return addresses
+
+
+    def update_records(self, hostname: str, addresses: dict):
+        """Update the records of several types of hostname, e.g. A and AAAA, with one read and one write"""
+        recorder = metrics.current()
+
+        with recorder.stage('read'):
+            currentips = error = self.dns.read_records(hostname, list(addresses))
+        if isinstance(error, Error):
+            return error
+
+        self.known.invalidate(hostname)
+
+        changes = { record_type: updateip for record_type, updateip in addresses.items() if currentips[record_type] != updateip }
+        if not changes:
+            return self.__matchesRecords(hostname, addresses)
 
-        updateip = error = self.dns.update(hostname, updateip)
+        with recorder.stage('update'):
+            error = self.dns.update_records(hostname, changes)
         if isinstance(error, Error):
             return error
 
+        return self.__updatedRecords(hostname, currentips, changes)
+
+
+    def update_batch(self, entries: list):
+        """Update a list of (hostname, sourceip, internalip) entries.  Returns a dict of hostname to message or Error"""
+        recorder = metrics.current()
+        results = {}
+        currentips = {}
+        updates = {}
+        for hostname, sourceip, internalip in entries:
+            updates.pop(hostname, None)
+
+            updateip = sourceip
+            if internalip != "":
+                updateip = internalip
+
+            with recorder.stage('read'):
+                currentip = error = self.dns.read(hostname)
+            if isinstance(error, Error):
+                results[hostname] = error
+            elif currentip == updateip:
+                if self.dns.live():
+                    self.known.put(hostname, currentip)
+                results[hostname] = self.__matches(hostname, currentip)
+            else:
+                self.known.invalidate(hostname)
+                results[hostname] = None
+                currentips[hostname] = currentip
+                updates[hostname] = updateip
+
+        if self.queue is not None:
+            with recorder.stage('enqueue'):
+                for hostname, updateip in updates.items():
+                    error = self.__enqueue(hostname, updateip)
+                    results[hostname] = error if isinstance(error, Error) else self.__accepted(hostname, currentips[hostname], updateip)
+            return results
+
+        with recorder.stage('update'):
+            updated = self.dns.update_batch(updates)
+        for hostname, updateip in updated.items():
+            if isinstance(updateip, Error):
+                results[hostname] = updateip
+            elif isinstance(updateip, Deferred):
+                results[hostname] = self.__deferred(hostname, currentips[hostname], str(updateip))
+            else:
+                self.known.put(hostname, updateip)
+                results[hostname] = self.__updated(hostname, currentips[hostname], updateip)
+
+        return results
+
+
+    def flush(self, updates: list):
+        """Write queued updates, the latest update per hostname wins.  Returns a dict of hostname to updated ip or Error"""
+        latest = self.__coalesce(updates)
+        return self.dns.update_batch({ hostname: update['ip'] for hostname, update in latest.items() })
+
+
+    def drain(self, max_items: int):
+        """Flush up to max_items updates from the queue, failed updates are queued again.  Returns a dict of hostname to updated ip or Error"""
+        messages = self.queue.receive(max_items)
+        if not messages:
+            return {}
+
+        latest = self.__coalesce([ update for _, update in messages ])
+        results = self.dns.update_batch({ hostname: update['ip'] for hostname, update in latest.items() })
+        for hostname, result in results.items():
+            if isinstance(result, Error):
+                self.queue.send(latest[hostname])
+
+        self.queue.delete([ receipt for receipt, _ in messages ])
+        return results
+
+
+    def __enqueue(self, hostname: str, updateip: str):
+        try:
+            self.queue.send({ 'hostname': hostname, 'ip': updateip, 'timestamp': time.time() })
+        except Exception as ex:
+            return Error("Queueing of DNS update failed. Exception: " + str(ex))
+
+
+    def __coalesce(self, updates: list):
+        latest = {}
+        for update in updates:
+            if not wellformed(update):
+                # Malformed messages would never succeed, they are dropped with the batch
+                continue
+            previous = latest.get(update['hostname'])
+            if previous is None or update['timestamp'] >= previous['timestamp']:
+                latest[update['hostname']] = update
+        return latest
+
+
+    def __accepted(self, hostname: str, currentip: str, updateip: str):
+        return "Your hostname record '" + hostname + "' update from '" + currentip + "' to '" + updateip + "' has been accepted."
+
+
+    def __deferred(self, hostname: str, currentip: str, updateip: str):
+        return "Your hostname record '" + hostname + "' update from '" + currentip + "' to '" + updateip + "' has been deferred, it has been written recently."
+
+
+    def __matches(self, hostname: str, currentip: str):
+        return "Your IP '" + currentip + "' address matches the current DNS record for '" + hostname + "'."
+
+
+    def __matchesRecords(self, hostname: str, addresses: dict):
+        return "Your IP addresses '" + "' and '".join(addresses.values()) + "' match the current DNS records for '" + hostname + "'."
+
+
+    def __updatedRecords(self, hostname: str, currentips: dict, changes: dict):
+        return "Your hostname records '" + hostname + "' have been updated, " + ", ".join(
+            record_type + " from '" + currentips[record_type] + "' to '" + updateip + "'" for record_type, updateip in changes.items()) + "."
+
+
+    def __updated(self, hostname: str, currentip: str, updateip: str):
         return "Your hostname record '" + hostname + "' has been updated from '" + currentip + "' to '" + updateip + "'."
 
 
     def __checkhashformat(self, validationhash: str):
-        if not re.match(r'[0-9a-fA-F]{64}', validationhash):
+        if not signing.HASH_FORMAT.fullmatch(validationhash):
             return Error("You must pass a valid sha256 hash in the hash= querystring parameter.")
 
 
+    def __checktimestamp(self, timestamp: str):
+        if not signing.TIMESTAMP_FORMAT.fullmatch(timestamp) or abs(time.time() - int(timestamp)) > signing.MAX_AGE:
+            return Error("You must pass the current unix time in the timestamp= querystring parameter.")
+
+
+    def __checknonce(self, hostname: str, nonce: str):
+        if nonce is None or not signing.NONCE_FORMAT.fullmatch(nonce):
+            return Error("You must pass 8 to 64 random letters, digits, '-' or '_' in the nonce= querystring parameter.")
+        if self.nonces.seen(hostname + "\n" + nonce):
+            metrics.current().count('replays')
+            return Error("The request has been replayed.")
+
+
     def __comparehash(self, sourceip: str, hostname: str, sharedsecret: str, validationhash: str):
-        hashinput: str = sourceip + hostname + sharedsecret
-        calculatedhash: str = hashlib.sha256(hashinput.encode('utf-8')).hexdigest()
-        if not calculatedhash == validationhash:
+        calculatedhash: str = signing.legacy(sharedsecret, sourceip, hostname)
+        if not hmac.compare_digest(calculatedhash, validationhash.lower()):
+            return Error("Validation of hashes failed.")
+
+
+    def __comparesignature(self, sourceip: str, hostname: str, sharedsecret: str, timestamp: str, nonce: str, internalip: str, ipv4: str, ipv6: str, validationhash: str):
+        calculatedhash: str = signing.sign(sharedsecret, sourceip, hostname, timestamp, nonce, internalip, ipv4, ipv6)
+        if not hmac.compare_digest(calculatedhash, validationhash.lower()):
             return Error("Validation of hashes failed.")
 
@@ -0,0 +1,78 @@
+import collections
+import json
+import os
+import threading
+import time
+import uuid
+
+from dynamicdns.models import UpdateQueue
+
+
+def factory(directory: str = None):
+    if directory is not None:
+        return FileQueue(directory)
+    return LocalQueue()
+
+
+class LocalQueue(UpdateQueue):
+    """In-process queue, received updates stay in flight until they are deleted"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = collections.deque()
+        self.inflight = {}
+
+    def send(self, update: dict):
+        with self.lock:
+            self.pending.append((uuid.uuid4().hex, update))
+
+    def receive(self, max_items: int):
+        with self.lock:
+            messages = []
+            while self.pending and len(messages) < max_items:
+                receipt, update = self.pending.popleft()
+                self.inflight[receipt] = update
+                messages.append((receipt, update))
+            return messages
+
+    def delete(self, receipts: list):
+        with self.lock:
+            for receipt in receipts:
+                self.inflight.pop(receipt, None)
+
+
+class FileQueue(UpdateQueue):
+    """One JSON file per update in a directory, received in the order they were sent"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def send(self, update: dict):
+        name = "%020d-%s.json" % (time.time_ns(), uuid.uuid4().hex)
+        path = os.path.join(self.directory, name)
+        with open(path + ".tmp", "w") as file:
+            json.dump(update, file)
+        os.replace(path + ".tmp", path)
+
+    def receive(self, max_items: int):
+        messages = []
+        for name in sorted(os.listdir(self.directory)):
+            if len(messages) >= max_items:
+                break
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path) as file:
+                    messages.append((path, json.load(file)))
+            except FileNotFoundError:
+                continue
+        return messages
+
+    def delete(self, receipts: list):
+        for path in receipts:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
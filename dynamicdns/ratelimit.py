@@ -0,0 +1,93 @@
+import math
+import os
+import threading
+import time
+
+from collections import OrderedDict
+
+from dynamicdns import metrics
+from dynamicdns.models import Error, BucketStore
+
+
+def factory(store: BucketStore = None):
+    return RateLimiter(store if store is not None else buckets, limits())
+
+
+def limits():
+    """Rate (tokens per second) and burst per key kind from the environment, a rate of 0 disables the kind.  Returns dict"""
+    return {
+        'host': (float(os.environ.get('RATE_LIMIT_HOST_RATE', '0')), float(os.environ.get('RATE_LIMIT_HOST_BURST', '10'))),
+        'source': (float(os.environ.get('RATE_LIMIT_SOURCE_RATE', '0')), float(os.environ.get('RATE_LIMIT_SOURCE_BURST', '30')))
+    }
+
+
+def refill(tokens: float, updated: float, now: float, rate: float, burst: float):
+    """Tokens of a bucket last updated at updated, refilled up to now.  Returns float"""
+    return min(burst, tokens + max(0.0, now - updated) * rate)
+
+
+class MemoryBucketStore(BucketStore):
+    """Token buckets of a single process, refilled lazily on access, the least recently used buckets are dropped beyond max_entries"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.clear()
+
+    def take(self, key: str, rate: float, burst: float):
+        with self.lock:
+            now = time.monotonic()
+            bucket = self.buckets.get(key)
+            tokens = burst if bucket is None else refill(bucket[0], bucket[1], now, rate, burst)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self.buckets[key] = (tokens, now)
+            self.buckets.move_to_end(key)
+            if len(self.buckets) > self.max_entries:
+                self.buckets.popitem(last=False)
+            return wait
+
+    def clear(self):
+        self.buckets = OrderedDict()
+
+
+buckets = MemoryBucketStore(int(os.environ.get('RATE_LIMIT_MAX_ENTRIES', '10000')))
+
+
+class RateLimiter:
+
+    def __init__(self, store: BucketStore, limits: dict):
+        self.store = store
+        self.limits = limits
+
+    def check(self, hostname: str, sourceip: str):
+        """Take a token of the hostname and of the source ip.  Returns Error if one of them is exhausted"""
+        error = self.check_source(sourceip)
+        if isinstance(error, Error):
+            return error
+        return self.check_host(hostname)
+
+    def check_source(self, sourceip: str):
+        """Take a token of the source ip, e.g. once per batch request.  Returns Error if it is exhausted"""
+        return self.__take('source', sourceip, "source IP '" + sourceip + "'")
+
+    def check_host(self, hostname: str):
+        """Take a token of the hostname, e.g. per entry of a batch request.  Returns Error if it is exhausted"""
+        return self.__take('host', hostname, "hostname '" + hostname + "'")
+
+    def __take(self, kind: str, key: str, name: str):
+        rate, burst = self.limits[kind]
+        if rate <= 0:
+            return None
+        try:
+            wait = self.store.take(kind + ":" + key, rate, burst)
+        except Exception:
+            # A failing store lets the request through instead of rejecting all of them
+            metrics.current().count('rate_limit_errors')
+            return None
+        if wait > 0:
+            metrics.current().count('throttled')
+            return Error("Too many requests for " + name + ", retry in " + str(math.ceil(wait)) + " seconds.")
@@ -0,0 +1,77 @@
+import os
+import threading
+import time
+
+from collections import OrderedDict
+
+from dynamicdns import metrics
+from dynamicdns.models import Error
+
+
+class RejectionCache:
+    """Errors of unknown hostnames and failed hash checks, a bounded LRU whose entries expire after the TTL"""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.clear()
+
+    def get(self, hostname: str, sourceip: str, validationhash: str):
+        """Cached rejection of the hostname or of the hash passed from sourceip.  Returns Error or None"""
+        error = self.__get(('host', hostname))
+        if error is None and validationhash is not None:
+            error = self.__get(('hash', hostname, sourceip, validationhash))
+        if error is not None:
+            self.hits += 1
+            metrics.current().count('rejection_cache_hits')
+        return error
+
+    def reject_host(self, hostname: str, error: Error):
+        self.rejected_hosts += 1
+        self.__put(('host', hostname), error)
+
+    def reject_hash(self, hostname: str, sourceip: str, validationhash: str, error: Error):
+        self.rejected_hashes += 1
+        self.__put(('hash', hostname, sourceip, validationhash), error)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "hosts": self.rejected_hosts,
+            "hashes": self.rejected_hashes
+        }
+
+    def clear(self):
+        with self.lock:
+            self.entries = OrderedDict()
+            self.hits = 0
+            self.rejected_hosts = 0
+            self.rejected_hashes = 0
+
+    def __get(self, key: tuple):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            error, stored = entry
+            if time.monotonic() - stored >= self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return error
+
+    def __put(self, key: tuple, error: Error):
+        if self.ttl <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (error, time.monotonic())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+cache = RejectionCache(
+    float(os.environ.get('REJECTION_CACHE_TTL', '30')),
+    int(os.environ.get('REJECTION_CACHE_MAX_ENTRIES', '10000'))
+)
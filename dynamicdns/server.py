@@ -0,0 +1,214 @@
+"""Self-hosted HTTP server serving the routes of the Lambda handler.
+
+    python -m dynamicdns.server --host 0.0.0.0 --port 8080
+
+Plain HTTP/1.1 requests are adapted into API Gateway events and dispatched
+through handler.execute on a pool of worker threads, so the providers, clients
+and caches of the process stay warm across requests.  Connections are kept
+alive and at most --concurrency requests are executed at once.  Paths are
+accepted with and without the base path of the API Gateway deployment.
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import http
+import json
+import os
+import urllib.parse
+
+import dynamicdns.backend
+
+from dynamicdns import debounce, signing
+from dynamicdns.aws.functions import handler
+from dynamicdns.models import Error
+
+
+BASE_PATH = os.environ.get('SERVER_BASE_PATH', '/dynamicdns-v1')
+
+# Take the client address of the first X-Forwarded-For entry, only behind a trusted proxy
+TRUST_FORWARDED = os.environ.get('SERVER_TRUST_FORWARDED', 'false').lower() == 'true'
+
+MAX_HEADER_BYTES = 16384
+MAX_BODY_BYTES = 1048576
+
+
+def event(method: str, target: str, headers: dict, sourceip: str, body: str = None, base_path: str = BASE_PATH):
+    """API Gateway proxy event of a plain HTTP request.  Returns dict"""
+    url = urllib.parse.urlsplit(target)
+    resource = url.path
+    if base_path and (resource == base_path or resource.startswith(base_path + "/")):
+        resource = resource[len(base_path):]
+    resource = "/" + resource.strip("/")
+    query = dict(urllib.parse.parse_qsl(url.query, keep_blank_values=True))
+    if TRUST_FORWARDED and 'x-forwarded-for' in headers:
+        sourceip = headers['x-forwarded-for'].split(",")[0].strip()
+    return {
+        'resource': resource,
+        'path': url.path,
+        'httpMethod': method,
+        'headers': headers,
+        'queryStringParameters': query if query else None,
+        'requestContext': { 'identity': { 'sourceIp': sourceip } },
+        'body': body
+    }
+
+
+def serialize(response: dict, keep_alive: bool):
+    """HTTP/1.1 message of a Lambda proxy response.  Returns bytes"""
+    status = response.get('statusCode', 200)
+    try:
+        reason = http.HTTPStatus(status).phrase
+    except ValueError:
+        reason = ''
+    body = response.get('body') or ''
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    lines = [ 'HTTP/1.1 ' + str(status) + ' ' + reason ]
+    for name, value in (response.get('headers') or {}).items():
+        lines.append(name + ': ' + str(value))
+    lines.append('Content-Length: ' + str(len(body)))
+    lines.append('Connection: ' + ('keep-alive' if keep_alive else 'close'))
+    return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body
+
+
+def flush():
+    """Write the deferred updates of debounced hostnames whose interval has passed.  Returns a dict of hostname to updated ip or Error"""
+    config, dns = dynamicdns.backend.providers()
+    if not isinstance(dns, debounce.DebouncedDNSProvider) or not dns.debouncer.pending:
+        return {}
+    if isinstance(config.load(), Error):
+        return {}
+    return dns.flush()
+
+
+class Server:
+    """asyncio HTTP/1.1 front end of handler.execute, at most concurrency requests run at once on a pool of workers"""
+
+    def __init__(self, workers: int, concurrency: int, keep_alive: float, base_path: str = BASE_PATH):
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dynamicdns')
+        self.concurrency = concurrency
+        self.keep_alive = keep_alive
+        self.base_path = base_path
+        self.requests = 0
+
+    async def start(self, host: str, port: int):
+        """Listen on host and port, port 0 picks a free one.  Returns asyncio.AbstractServer"""
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        return await asyncio.start_server(self.connection, host, port, limit=MAX_HEADER_BYTES)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    async def tick(self, interval: float):
+        """Flush the deferred updates every interval seconds, only this process knows them"""
+        loop = asyncio.get_event_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await loop.run_in_executor(self.executor, flush)
+            except Exception:
+                pass
+
+    async def connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = writer.get_extra_info('peername')
+        sourceip = peer[0] if peer else ''
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.keep_alive)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    writer.write(serialize(self.__error(431, 'Request header fields too large.'), False))
+                    break
+                response, keep_alive = await self.request(head, reader, sourceip)
+                writer.write(serialize(response, keep_alive))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def request(self, head: bytes, reader: asyncio.StreamReader, sourceip: str):
+        """Read the body of a request and execute it.  Returns (response dict, keep the connection alive)"""
+        lines = head.decode('latin-1').split("\r\n")
+        parts = lines[0].split(" ")
+        if len(parts) != 3 or not parts[2].startswith('HTTP/1.'):
+            return self.__error(400, 'Malformed request line.'), False
+        method, target, version = parts
+        headers = {}
+        for line in lines[1:]:
+            name, separator, value = line.partition(":")
+            if separator:
+                headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+        if 'transfer-encoding' in headers:
+            return self.__error(411, 'Chunked request bodies are not supported.'), False
+        length = headers.get('content-length', '0')
+        if not length.isdigit():
+            return self.__error(400, 'Malformed Content-Length header.'), False
+        if int(length) > MAX_BODY_BYTES:
+            return self.__error(413, 'Request body too large.'), False
+        body = None
+        if int(length) > 0:
+            try:
+                body = (await reader.readexactly(int(length))).decode('utf-8')
+            except UnicodeDecodeError:
+                return self.__error(400, 'Request body is not UTF-8.'), False
+
+        try:
+            request = event(method, target, headers, sourceip, body, self.base_path)
+        except ValueError:
+            return self.__error(400, 'Malformed request target.'), False
+        async with self.semaphore:
+            loop = asyncio.get_event_loop()
+            try:
+                response = await loop.run_in_executor(self.executor, handler.execute, request['resource'], method, request, {})
+            except Exception:
+                response = self.__error(500, 'Internal server error.')
+        self.requests += 1
+        return response, keep_alive
+
+    def __error(self, status: int, message: str):
+        return {
+            'statusCode': status,
+            'headers': { 'Content-Type': 'application/json' },
+            'body': json.dumps({ 'status': 'FAIL', 'message': message })
+        }
+
+
+async def serve(args):
+    server = Server(args.workers, args.concurrency, args.keep_alive, args.base_path)
+    listener = await server.start(args.host, args.port)
+    # This process answers every request, its nonces cover all of them and requests may be signed with sign=host
+    signing.nonces.single_process = True
+    if debounce.state.min_interval > 0:
+        asyncio.ensure_future(server.tick(debounce.state.min_interval))
+    print("Serving on " + ", ".join(str(socket.getsockname()) for socket in listener.sockets))
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Self-hosted HTTP server serving the routes of the Lambda handler.')
+    parser.add_argument('--host', default=os.environ.get('SERVER_HOST', '127.0.0.1'), help='address to listen on')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('SERVER_PORT', '8080')), help='port to listen on')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('SERVER_WORKERS', '32')), help='worker threads executing requests and AWS calls')
+    parser.add_argument('--concurrency', type=int, default=int(os.environ.get('SERVER_CONCURRENCY', '256')), help='requests executed or waiting for a worker at once')
+    parser.add_argument('--keep-alive', type=float, default=float(os.environ.get('SERVER_KEEP_ALIVE', '75')), help='seconds an idle connection is kept open')
+    parser.add_argument('--base-path', default=BASE_PATH, help='base path of the API Gateway deployment, stripped from request paths')
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
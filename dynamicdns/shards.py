@@ -0,0 +1,84 @@
+"""Sharded configuration layout.
+
+A sharded configuration replaces the monolithic JSON object with a small
+manifest and one object per shard, every shard holds the hostnames hashing
+to it in the monolithic format:
+
+    {"format": "sharded", "shards": 64, "prefix": "shards/"}
+
+Split an existing configuration into a directory to upload with e.g.
+`aws s3 sync`:
+
+    python -m dynamicdns.shards --shards 64 config/server-dev.config config/server-dev
+"""
+import argparse
+import json
+import os
+import zlib
+
+from dynamicdns.models import compile_config
+
+
+class Manifest:
+
+    __slots__ = ('shards', 'prefix')
+
+    def __init__(self, shards: int, prefix: str):
+        self.shards = shards
+        self.prefix = prefix
+
+    def key(self, hostname: str):
+        """Key of the shard holding the hostname"""
+        return self.prefix + "%05d.json" % shard(hostname, self.shards)
+
+    def document(self):
+        return { "format": "sharded", "shards": self.shards, "prefix": self.prefix }
+
+
+def shard(hostname: str, shards: int):
+    return zlib.crc32(hostname.lower().encode('utf-8')) % shards
+
+
+def manifest(data):
+    """Manifest of a parsed configuration object.  Returns Manifest or None for a monolithic configuration"""
+    if not isinstance(data, dict) or data.get("format") != "sharded":
+        return None
+    shards = data.get("shards")
+    if isinstance(shards, bool) or not isinstance(shards, int) or shards < 1 or not isinstance(data.get("prefix"), str):
+        raise ValueError("Sharded configuration manifest needs a positive number of 'shards' and a 'prefix'.")
+    return Manifest(shards, data["prefix"])
+
+
+def split(config: dict, shards: int, prefix: str):
+    """Split a monolithic configuration.  Returns (Manifest, dict of shard key to shard configuration)"""
+    compile_config(config)
+    result = Manifest(shards, prefix)
+    objects = { result.prefix + "%05d.json" % n: {} for n in range(shards) }
+    for hostname, attrs in config.items():
+        objects[result.key(hostname)][hostname] = attrs
+    return result, objects
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Split a monolithic configuration into a manifest and shards.')
+    parser.add_argument('--shards', type=int, default=64, help='number of shards')
+    parser.add_argument('--prefix', default='shards/', help='S3 key prefix of the shard objects')
+    parser.add_argument('config', help='monolithic configuration file')
+    parser.add_argument('output', help='directory mirroring the bucket, receives the manifest (named like the configuration) and the shards')
+    args = parser.parse_args()
+
+    with open(args.config) as file:
+        config = json.load(file)
+    result, objects = split(config, args.shards, args.prefix)
+
+    for key, data in objects.items():
+        path = os.path.join(args.output, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(data, file)
+    with open(os.path.join(args.output, os.path.basename(args.config)), "w") as file:
+        json.dump(result.document(), file)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+import hashlib
+import hmac
+import math
+import os
+import re
+import threading
+import time
+
+from collections import OrderedDict
+
+from dynamicdns.models import NonceStore
+
+
+HASH_FORMAT = re.compile(r'[0-9a-fA-F]{64}')
+TIMESTAMP_FORMAT = re.compile(r'[0-9]{1,12}')
+NONCE_FORMAT = re.compile(r'[0-9A-Za-z_-]{8,64}')
+
+# Fields covered by a signature besides hostname, timestamp, nonce, internal IP and the addresses of dual-stack requests: the source IP the client sends from, 
+# or none with the request bound to the source IP observed by the server (requires a shared NonceStore)
+SIGN_MODES = ('sourceip', 'host')
+
+# Accept the unsigned sha256(sourceip + hostname + sharedsecret) hash of older clients
+LEGACY = os.environ.get('SIGNATURE_LEGACY', 'true').lower() == 'true'
+
+# Seconds a signed request is accepted before or after its timestamp
+MAX_AGE = float(os.environ.get('SIGNATURE_MAX_AGE', '300'))
+
+
+class KeySchedules:
+    """HMAC-SHA256 states keyed with a shared secret, copied per request instead of keying HMAC again"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.clear()
+
+    def get(self, sharedsecret: str):
+        with self.lock:
+            schedule = self.entries.get(sharedsecret)
+            if schedule is None:
+                schedule = hmac.new(sharedsecret.encode('utf-8'), digestmod=hashlib.sha256)
+                self.entries[sharedsecret] = schedule
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+            else:
+                self.entries.move_to_end(sharedsecret)
+            return schedule.copy()
+
+    def clear(self):
+        with self.lock:
+            self.entries = OrderedDict()
+
+
+schedules = KeySchedules(int(os.environ.get('SIGNATURE_MAX_KEYS', '10000')))
+
+
+class NonceFilter(NonceStore):
+    """Nonces seen within the last one to two windows, a pair of rotating Bloom filters of fixed size.
+    Each filter holding capacity nonces answers a false positive with error_rate, both together with at most twice that rate.
+    The nonces are only shared if a single process answers all requests, e.g. the self-hosted server"""
+
+    def __init__(self, window: float, capacity: int, error_rate: float, single_process: bool = False):
+        self.window = window
+        self.single_process = single_process
+        self.bits = max(64, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hashes = max(1, int(round(self.bits / capacity * math.log(2))))
+        self.lock = threading.Lock()
+        self.clear()
+
+    def seen(self, key: str):
+        positions = self.__positions(key)
+        with self.lock:
+            self.__rotate(time.monotonic())
+            return self.__contains(self.current, positions) or self.__contains(self.previous, positions)
+
+    def add(self, key: str):
+        """Remember key.  Returns False if it has been seen already"""
+        positions = self.__positions(key)
+        with self.lock:
+            self.__rotate(time.monotonic())
+            if self.__contains(self.current, positions) or self.__contains(self.previous, positions):
+                return False
+            for position in positions:
+                self.current[position >> 3] |= 1 << (position & 7)
+            return True
+
+    def shared(self):
+        return self.single_process
+
+    def clear(self):
+        self.current = bytearray((self.bits + 7) // 8)
+        self.previous = bytearray((self.bits + 7) // 8)
+        self.rotated = time.monotonic()
+
+    def __rotate(self, now: float):
+        elapsed = now - self.rotated
+        if elapsed >= 2 * self.window:
+            self.clear()
+            self.rotated = now
+        elif elapsed >= self.window:
+            self.previous = self.current
+            self.current = bytearray((self.bits + 7) // 8)
+            self.rotated += self.window
+
+    def __positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [ (first + i * second) % self.bits for i in range(self.hashes) ]
+
+    def __contains(self, bits: bytearray, positions: list):
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in positions)
+
+
+# A nonce is kept at least one window, covering the 2 * MAX_AGE a timestamp is accepted
+nonces = NonceFilter(
+    2 * MAX_AGE,
+    int(os.environ.get('NONCE_CAPACITY', '100000')),
+    float(os.environ.get('NONCE_ERROR_RATE', '0.001'))
+)
+
+
+def sign(sharedsecret: str, sourceip: str, hostname: str, timestamp: str, nonce: str = None, internalip: str = "", ipv4: str = None, ipv6: str = None, key_schedules: KeySchedules = None):
+    """HMAC-SHA256 of sourceip (unless None), hostname, timestamp, nonce (if present), internalip (unless empty), "ipv4=" + ipv4 and "ipv6=" + ipv6 (if present), separated by newlines.  Returns hex digest"""
+    message = (sourceip + "\n" if sourceip is not None else "") + hostname + "\n" + timestamp
+    if nonce is not None:
+        message += "\n" + nonce
+    if internalip:
+        message += "\n" + internalip
+    if ipv4 is not None:
+        message += "\nipv4=" + ipv4
+    if ipv6 is not None:
+        message += "\nipv6=" + ipv6
+    mac = (key_schedules if key_schedules is not None else schedules).get(sharedsecret)
+    mac.update(message.encode('utf-8'))
+    return mac.hexdigest()
+
+
+def legacy(sharedsecret: str, sourceip: str, hostname: str):
+    """Hash of the legacy scheme.  Returns hex digest"""
+    return hashlib.sha256((sourceip + hostname + sharedsecret).encode('utf-8')).hexdigest()
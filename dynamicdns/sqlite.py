@@ -0,0 +1,233 @@
+"""SQLite configuration and records for self-hosted deployments.
+
+A single database file holds the host configuration and the current records,
+both keyed (and indexed) by hostname.  Connections are opened once per thread
+in WAL mode, so reads do not wait for writers.  The statements are constant
+and reused from the statement cache of the connection, and batches are
+written in one transaction.
+
+Import a configuration file and render the records of a zone:
+
+    python -m dynamicdns.sqlite --database dynamicdns.db import config/server-dev.config
+    python -m dynamicdns.sqlite --database dynamicdns.db export --zone ZONEID --origin example.com
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+from dynamicdns.models import Error, HostNotFound, HostConfig, ConfigProvider, DNSProvider, compile_config
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hosts (
+    hostname TEXT PRIMARY KEY,
+    route_53_region TEXT NOT NULL,
+    route_53_zone_id TEXT NOT NULL,
+    route_53_record_ttl INTEGER NOT NULL,
+    route_53_record_type TEXT NOT NULL,
+    shared_secret TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS hosts_zone ON hosts (route_53_zone_id, hostname);
+CREATE TABLE IF NOT EXISTS records (
+    hostname TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (hostname, type)
+) WITHOUT ROWID;
+"""
+
+SELECT_HOST = "SELECT route_53_region, route_53_zone_id, route_53_record_ttl, route_53_record_type, shared_secret FROM hosts WHERE hostname = ?"
+SELECT_RECORD = "SELECT value FROM records WHERE hostname = ? AND type = ?"
+UPSERT_HOST = "INSERT OR REPLACE INTO hosts VALUES (?, ?, ?, ?, ?, ?)"
+UPSERT_RECORD = "INSERT OR REPLACE INTO records VALUES (?, ?, ?, strftime('%s', 'now'))"
+SELECT_ZONE = """SELECT records.hostname, hosts.route_53_record_ttl, records.type, records.value FROM hosts
+    JOIN records ON records.hostname = hosts.hostname WHERE hosts.route_53_zone_id = ? ORDER BY records.hostname, records.type"""
+
+# Milliseconds a connection waits for the write lock of another process
+BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', '5000'))
+
+
+class Database:
+    """A SQLite file with one connection per thread, opened on first use in WAL mode"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.local = threading.local()
+
+    def connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT / 1000.0, isolation_level=None, cached_statements=32)
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            connection.executescript(SCHEMA)
+            self.local.connection = connection
+        return connection
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Connection of this thread within a write transaction, committed unless an exception is raised"""
+        connection = self.connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+
+databases = {}
+lock = threading.Lock()
+
+
+def database(path: str):
+    """Database of path shared by all requests of a process.  Returns Database"""
+    with lock:
+        result = databases.get(path)
+        if result is None:
+            result = Database(path)
+            databases[path] = result
+        return result
+
+
+def import_config(database: Database, config: dict):
+    """Validate a configuration and write its hosts, replacing hosts of the same name.  Returns the number of hosts"""
+    hosts = compile_config(config)
+    with database.transaction() as connection:
+        connection.executemany(UPSERT_HOST, [ (host.hostname, host.route_53_region, host.route_53_zone_id, host.route_53_record_ttl,
+            host.route_53_record_type.value, host.shared_secret) for host in hosts.values() ])
+    return len(hosts)
+
+
+def export(database: Database, zone_id: str, origin: str = None):
+    """Zone file of the current records of the hosts in zone_id, with absolute names.  Returns str"""
+    lines = [ "; Records of zone " + zone_id + " exported " + datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ') ]
+    if origin is not None:
+        lines.append("$ORIGIN " + origin.rstrip(".") + ".")
+    for hostname, ttl, record_type, value in database.connection().execute(SELECT_ZONE, (zone_id,)):
+        lines.append(hostname.rstrip(".") + ".\t" + str(ttl) + "\tIN\t" + record_type + "\t" + value)
+    return "\n".join(lines) + "\n"
+
+
+class SQLiteConfigProvider(ConfigProvider):
+
+    def __init__(self, database: Database):
+        self.database = database
+        self.hosts = {}
+
+    def load(self):
+        try:
+            self.database.connection()
+        except Exception as ex:
+            return Error("Could not read configuration. Excpeption: " + str(ex))
+        self.hosts = {}
+
+    def host(self, hostname: str):
+        host = self.hosts.get(hostname)
+        if host is None:
+            row = self.database.connection().execute(SELECT_HOST, (hostname,)).fetchone()
+            if row is None:
+                raise HostNotFound(hostname)
+            host = HostConfig.compile(hostname, dict(zip(HostConfig.__slots__[1:], row)))
+            self.hosts[hostname] = host
+        return host
+
+    def shared_secret(self, hostname: str):
+        return self.host(hostname).shared_secret
+
+    def cached(self, hostname: str):
+        return self.hosts.get(hostname)
+
+
+class SQLiteDNSProvider(DNSProvider):
+
+    def __init__(self, database: Database, config: ConfigProvider):
+        self.database = database
+        self.config = config
+
+    def read(self, hostname: str):
+        try:
+            row = self.database.connection().execute(SELECT_RECORD, (hostname, self.config.host(hostname).route_53_record_type.value)).fetchone()
+            return row[0] if row is not None else ""
+        except Exception as ex:
+            return Error("Retrieval of current ip address failed. Excpeption: " + str(ex))
+
+    def update(self, hostname: str, updateip: str):
+        try:
+            record_type = self.config.host(hostname).route_53_record_type.value
+            with self.database.transaction() as connection:
+                connection.execute(UPSERT_RECORD, (hostname, record_type, updateip))
+            return updateip
+        except Exception as ex:
+            return Error("Update of DNS record failed. Exception: " + str(ex))
+
+    def update_batch(self, updates: dict):
+        results = {}
+        rows = []
+        for hostname, updateip in updates.items():
+            try:
+                rows.append((hostname, self.config.host(hostname).route_53_record_type.value, updateip))
+            except Exception as ex:
+                results[hostname] = Error("Update of DNS record failed. Exception: " + str(ex))
+        try:
+            with self.database.transaction() as connection:
+                connection.executemany(UPSERT_RECORD, rows)
+            for hostname, _, updateip in rows:
+                results[hostname] = updateip
+        except Exception as ex:
+            for hostname, _, _ in rows:
+                results[hostname] = Error("Update of DNS record failed. Exception: " + str(ex))
+        return results
+
+    def read_records(self, hostname: str, record_types: list):
+        try:
+            self.config.host(hostname)
+            connection = self.database.connection()
+            results = {}
+            for record_type in record_types:
+                row = connection.execute(SELECT_RECORD, (hostname, record_type)).fetchone()
+                results[record_type] = row[0] if row is not None else ""
+            return results
+        except Exception as ex:
+            return Error("Retrieval of current ip address failed. Excpeption: " + str(ex))
+
+    def update_records(self, hostname: str, records: dict):
+        try:
+            self.config.host(hostname)
+            with self.database.transaction() as connection:
+                connection.executemany(UPSERT_RECORD, [ (hostname, record_type, updateip) for record_type, updateip in records.items() ])
+            return dict(records)
+        except Exception as ex:
+            return Error("Update of DNS record failed. Exception: " + str(ex))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import a configuration into or export a zone file from a SQLite database.')
+    parser.add_argument('--database', default=os.environ.get('SQLITE_PATH', 'dynamicdns.db'), help='SQLite database file')
+    commands = parser.add_subparsers(dest='command')
+    command = commands.add_parser('import', help='write the hosts of a configuration file')
+    command.add_argument('config', help='configuration file in the format of the S3 configuration')
+    command = commands.add_parser('export', help='print the current records of a zone as zone file')
+    command.add_argument('--zone', required=True, help='route_53_zone_id of the hosts to export')
+    command.add_argument('--origin', help='domain name of the zone, written as $ORIGIN')
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        with open(args.config) as file:
+            config = json.load(file)
+        print("Imported " + str(import_config(database(args.database), config)) + " hosts.")
+    elif args.command == 'export':
+        sys.stdout.write(export(database(args.database), args.zone, args.origin))
+    else:
+        parser.print_usage()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,17 @@
+import hashlib
 import json
 
+from dynamicdns.models import Error
 
-def success(message: str, raw: bool):
+
+def success(message: str, raw: bool, token: str = None, change: str = None):
     if raw:
         headers = {
             "Content-Type": "text/plain"
         }
         body = "SUCCESS\n" + message
+        if token is not None:
+            body += "\n" + token
         response = {
             "statusCode": 200,
             "headers": headers,
@@ -20,6 +25,10 @@ def success(message: str, raw: bool):
             "status": "SUCCESS",
             "message": message
         }
+        if token is not None:
+            body["token"] = token
+        if change is not None:
+            body["change"] = change
         response = {
             "statusCode": 200,
             "headers": headers,
@@ -28,14 +37,14 @@ def success(message: str, raw: bool):
     return response
 
 
-def fail(error: str, raw: bool):
+def fail(error: str, raw: bool, statusCode: int = 200):
     if raw:
         headers = {
             "Content-Type": "text/plain"
         }
         body = "FAIL\n" + str(error)
         response = {
-            "statusCode": 200,
+            "statusCode": statusCode,
             "headers": headers,
             "body": body
         }
@@ -47,6 +56,45 @@ def fail(error: str, raw: bool):
             "status": "FAIL",
             "message": str(error)
         }
+        response = {
+            "statusCode": statusCode,
+            "headers": headers,
+            "body": json.dumps(body)
+        }
+    return response
+
+
+def results(results: dict, raw: bool):
+    status = "SUCCESS"
+    if any(isinstance(result, Error) for result in results.values()):
+        status = "FAIL"
+    if raw:
+        headers = {
+            "Content-Type": "text/plain"
+        }
+        lines = [ status ]
+        for hostname, result in results.items():
+            lines.append(hostname + " " + ("FAIL " if isinstance(result, Error) else "SUCCESS ") + str(result))
+        response = {
+            "statusCode": 200,
+            "headers": headers,
+            "body": "\n".join(lines)
+        }
+    else:
+        headers = {
+                "Content-Type": "application/json"
+        }
+        body = {
+            "status": status,
+            "results": [
+                {
+                    "hostname": hostname,
+                    "status": "FAIL" if isinstance(result, Error) else "SUCCESS",
+                    "message": str(result)
+                }
+                for hostname, result in results.items()
+            ]
+        }
         response = {
             "statusCode": 200,
             "headers": headers,
@@ -55,6 +103,52 @@ def fail(error: str, raw: bool):
     return response
 
 
+def static(body: str, content_type: str, max_age: int):
+    """Response of a static resource, carrying an ETag of the body"""
+    headers = {
+        "Content-Type": content_type,
+        "ETag": '"' + hashlib.sha256(body.encode('utf-8')).hexdigest()[:32] + '"',
+        "Cache-Control": "public, max-age=" + str(max_age)
+    }
+    response = {
+        "statusCode": 200,
+        "headers": headers,
+        "body": body
+    }
+    return response
+
+
+def conditional(response: dict, event: dict):
+    """Answer 304 without a body if the If-None-Match header of the request matches the ETag of the response"""
+    ifnonematch = header(event, 'If-None-Match')
+    if ifnonematch is None:
+        return response
+    etag = response['headers']['ETag']
+    tags = [ tag.strip() for tag in ifnonematch.split(',') ]
+    if not ('*' in tags or etag in tags or 'W/' + etag in tags):
+        return response
+    headers = {
+        "ETag": etag,
+        "Cache-Control": response['headers']['Cache-Control']
+    }
+    return {
+        "statusCode": 304,
+        "headers": headers,
+        "body": ""
+    }
+
+
+def header(event: dict, name: str):
+    """Value of a request header, names are case insensitive"""
+    if not keyExists(event, 'headers'):
+        return None
+    name = name.lower()
+    for key, value in event['headers'].items():
+        if key.lower() == name:
+            return value
+    return None
+
+
 def keyExists(element, *keys):
     _element = element
     for key in keys:
@@ -0,0 +1,117 @@
+import unittest
+
+from unittest.mock import MagicMock, patch
+
+from botocore.exceptions import ClientError
+
+from dynamicdns.aws import boto3wrapper
+
+from dynamicdns.aws.boto3wrapper import Boto3Wrapper, ClientPool
+
+
+class LegacyConfig:
+    """botocore.config.Config of botocore 1.12, without tcp_keepalive and retry modes"""
+
+    OPTION_DEFAULTS = { 'max_pool_connections': None, 'retries': None }
+
+    def __init__(self, **kwargs):
+        for key in kwargs:
+            if not key in self.OPTION_DEFAULTS:
+                raise TypeError("Got unexpected keyword argument '" + key + "'")
+        if set(kwargs.get('retries') or {}) - { 'max_attempts' }:
+            raise ValueError("Invalid retries configuration")
+        self.__dict__.update(kwargs)
+
+
+class TestBoto3Wrapper(unittest.TestCase):
+
+
+    def setUp(self):
+        boto3wrapper.pool.reset()
+
+
+    @patch('boto3.session.Session')
+    def testClientReused(self, mock_session: MagicMock):
+        boto3_wrapper: Boto3Wrapper = boto3wrapper.factory()
+
+        boto3_wrapper.client_list_resource_record_sets('region', 'zone', 'name', 'A', '2')
+        boto3_wrapper.client_change_resource_record_sets('region', 'zone', {})
+        boto3wrapper.factory().client_list_resource_record_sets('region', 'zone', 'name', 'A', '2')
+
+        mock_session.assert_called_once_with()
+        mock_session.return_value.client.assert_called_once_with(service_name='route53', region_name='region', config=boto3wrapper.pool.client_config('route53'))
+        self.assertEqual(mock_session.return_value.client.return_value.list_resource_record_sets.call_count, 2)
+
+
+    @patch('boto3.session.Session')
+    def testClientPerServiceAndRegion(self, mock_session: MagicMock):
+        pool = ClientPool()
+
+        pool.client('route53', 'region-1')
+        pool.client('route53', 'region-2')
+        pool.client('s3', 'region-1')
+        pool.client('s3', 'region-1')
+
+        self.assertEqual(mock_session.return_value.client.call_count, 3)
+
+
+    @patch('boto3.session.Session')
+    def testConfigure(self, mock_session: MagicMock):
+        pool = ClientPool()
+        pool.client('s3', 'region')
+
+        pool.configure(max_pool_connections=50, tcp_keepalive=False, max_attempts=5, retry_mode='adaptive')
+        pool.client('s3', 'region')
+
+        self.assertEqual(pool.client_config().max_pool_connections, 50)
+        self.assertFalse(pool.client_config().tcp_keepalive)
+        self.assertEqual(pool.client_config().retries, { 'max_attempts': 5, 'mode': 'adaptive' })
+        self.assertEqual(mock_session.return_value.client.call_count, 2)
+
+
+    def testRoute53WithoutRetries(self):
+        pool = ClientPool()
+
+        self.assertEqual(pool.client_config('route53').retries, { 'total_max_attempts': 1, 'mode': 'standard' })
+        self.assertEqual(pool.client_config('s3').retries, { 'max_attempts': 3, 'mode': 'standard' })
+
+
+    @patch('botocore.config.Config', LegacyConfig)
+    def testLegacyBotocore(self):
+        pool = ClientPool()
+
+        config = pool.client_config('s3')
+
+        self.assertEqual(config.max_pool_connections, 10)
+        self.assertFalse(hasattr(config, 'tcp_keepalive'))
+        self.assertEqual(config.retries, { 'max_attempts': 3 })
+        self.assertEqual(pool.client_config('route53').retries, { 'max_attempts': 0 })
+
+
+    def testGetObjectNotModified(self):
+        client = MagicMock()
+        client.get_object = MagicMock(side_effect=ClientError({ 'Error': { 'Code': '304' } }, 'GetObject'))
+        pool = ClientPool()
+        pool.client = MagicMock(return_value=client)
+
+        result = Boto3Wrapper(pool).client_get_object_conditional('region', 'bucket', 'key', '"etag"')
+
+        self.assertEqual(result, (None, '"etag"'))
+        client.get_object.assert_called_once_with(Bucket='bucket', Key='key', IfNoneMatch='"etag"')
+
+
+    def testPutItemConditionFailed(self):
+        client = MagicMock()
+        client.put_item = MagicMock(side_effect=[ None, ClientError({ 'Error': { 'Code': 'ConditionalCheckFailedException' } }, 'PutItem') ])
+        pool = ClientPool()
+        pool.client = MagicMock(return_value=client)
+        boto3_wrapper = Boto3Wrapper(pool)
+
+        self.assertTrue(boto3_wrapper.client_put_item_conditional('region', 'table', { 'key': { 'S': 'a' } }, None))
+        self.assertFalse(boto3_wrapper.client_put_item_conditional('region', 'table', { 'key': { 'S': 'a' } }, '1.5'))
+
+        client.put_item.assert_called_with(TableName='table', Item={ 'key': { 'S': 'a' } }, ConditionExpression='#u = :previous', ExpressionAttributeNames={ '#u': 'updated' }, ExpressionAttributeValues={ ':previous': { 'N': '1.5' } })
+
+
+if __name__ == '__main__':
+    unittest.main()
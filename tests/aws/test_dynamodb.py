@@ -0,0 +1,91 @@
+import unittest
+
+from unittest.mock import patch
+
+from dynamicdns.aws import dynamodb
+
+from dynamicdns.aws.boto3wrapper import Boto3Wrapper
+from dynamicdns.signing import NonceFilter
+
+
+class FakeTable(Boto3Wrapper):
+    """Items of a single DynamoDB table kept in memory, with the conditional write semantics of the wrapper"""
+
+    def __init__(self):
+        self.items = {}
+        self.conflicts = 0
+
+    def client_get_item(self, region, table, key):
+        return self.items.get(key['key']['S'])
+
+    def client_put_item_conditional(self, region, table, item, previous):
+        if self.conflicts > 0:
+            self.conflicts -= 1
+            return False
+        current = self.items.get(item['key']['S'])
+        if (current['updated']['N'] if current is not None else None) != previous:
+            return False
+        self.items[item['key']['S']] = item
+        return True
+
+
+class TestDynamoDBBucketStore(unittest.TestCase):
+
+
+    def testTakeAndRefill(self):
+        table = FakeTable()
+        store = dynamodb.factory(table, 'region', 'table')
+
+        with patch('time.time', return_value=1000):
+            self.assertEqual(store.take('a', 0.5, 2), 0)
+            self.assertEqual(store.take('a', 0.5, 2), 0)
+            self.assertEqual(store.take('a', 0.5, 2), 2)
+        with patch('time.time', return_value=1002):
+            self.assertEqual(store.take('a', 0.5, 2), 0)
+
+        self.assertEqual(table.items['a']['expires'], { 'N': '1007' })
+
+
+    def testConflictRetried(self):
+        table = FakeTable()
+        table.conflicts = 2
+        store = dynamodb.factory(table, 'region', 'table')
+
+        self.assertEqual(store.take('a', 1, 1), 0)
+        self.assertIn('a', table.items)
+
+        table.conflicts = dynamodb.MAX_ATTEMPTS
+        self.assertEqual(store.take('a', 1, 1), 0)
+
+
+class TestDynamoDBNonceStore(unittest.TestCase):
+
+
+    def testAdd(self):
+        table = FakeTable()
+        store = dynamodb.DynamoDBNonceStore(table, 'region', 'table', NonceFilter(600, 1000, 0.001))
+
+        with patch('time.time', return_value=1000), patch('dynamicdns.signing.MAX_AGE', 300):
+            self.assertFalse(store.seen('host\nnonce-0001'))
+            self.assertTrue(store.add('host\nnonce-0001'))
+            self.assertTrue(store.seen('host\nnonce-0001'))
+            self.assertFalse(store.add('host\nnonce-0001'))
+            self.assertTrue(store.add('host\nnonce-0002'))
+
+        self.assertEqual(table.items['nonce:host\nnonce-0001']['expires'], { 'N': '1601' })
+        self.assertTrue(store.shared())
+
+
+    def testAddRecordedByOtherContainer(self):
+        table = FakeTable()
+        first = dynamodb.DynamoDBNonceStore(table, 'region', 'table', NonceFilter(600, 1000, 0.001))
+        second = dynamodb.DynamoDBNonceStore(table, 'region', 'table', NonceFilter(600, 1000, 0.001))
+
+        self.assertTrue(first.add('host\nnonce-0001'))
+        self.assertFalse(second.seen('host\nnonce-0001'))
+        self.assertFalse(second.add('host\nnonce-0001'))
+        self.assertTrue(second.seen('host\nnonce-0001'))
+
+
+if __name__ == '__main__':
+    unittest.main()
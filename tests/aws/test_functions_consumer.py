@@ -0,0 +1,50 @@
+import json
+import unittest
+
+from unittest.mock import MagicMock, patch
+
+from dynamicdns.aws.functions.consumer import handle
+
+from dynamicdns.models import Error
+from dynamicdns.memory import MemoryConfigProvider, MemoryDNSProvider
+
+
+class TestConsumer(unittest.TestCase):
+
+
+    @patch('dynamicdns.backend.providers')
+    def testConsumer(self, mock_providers):
+        dns = MemoryDNSProvider()
+        dns.update_batch = MagicMock(return_value={ 'a': '3.3.3.3', 'b': Error("Update failed") })
+        mock_providers.return_value = (MemoryConfigProvider({}), dns)
+
+        result = handle({ 'Records': [
+            self.__record('1', { 'hostname': 'a', 'ip': '1.1.1.1', 'timestamp': 1 }),
+            self.__record('2', { 'hostname': 'b', 'ip': '2.2.2.2', 'timestamp': 2 }),
+            self.__record('3', { 'hostname': 'a', 'ip': '3.3.3.3', 'timestamp': 3 }),
+            { 'messageId': '4', 'body': 'no json' },
+            self.__record('5', { 'hostname': 'c', 'ip': '5.5.5.5' }),
+            self.__record('6', { 'hostname': 'c', 'timestamp': 6 })
+        ]}, {})
+
+        dns.update_batch.assert_called_once_with({ 'a': '3.3.3.3', 'b': '2.2.2.2' })
+        self.assertEqual(result, { 'batchItemFailures': [ { 'itemIdentifier': '4' }, { 'itemIdentifier': '5' }, { 'itemIdentifier': '6' }, { 'itemIdentifier': '2' } ] })
+
+
+    @patch('dynamicdns.backend.providers')
+    def testConsumerFailConfig(self, mock_providers):
+        config = MemoryConfigProvider({})
+        config.load = MagicMock(return_value=Error("Config Load failed"))
+        mock_providers.return_value = (config, MemoryDNSProvider())
+
+        result = handle({ 'Records': [ self.__record('1', { 'hostname': 'a', 'ip': '1.1.1.1', 'timestamp': 1 }) ] }, {})
+
+        self.assertEqual(result, { 'batchItemFailures': [ { 'itemIdentifier': '1' } ] })
+
+
+    def __record(self, messageid, update):
+        return { 'messageId': messageid, 'body': json.dumps(update) }
+
+
+if __name__ == '__main__':
+    unittest.main()
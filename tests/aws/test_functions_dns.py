@@ -5,9 +5,13 @@ from unittest.mock import MagicMock, Mock, patch, mock_open
 
 import dynamicdns
 
+import time
+
+from dynamicdns import fastpath, signing, ratelimit, rejections
+
 from dynamicdns.aws.functions.dns import handle 
 
-from dynamicdns.models import Error
+from dynamicdns.models import Error, Unavailable, HostNotFound
 
 from dynamicdns.aws.route53 import Route53Provider
 from dynamicdns.aws.s3config import S3ConfigProvider
@@ -19,6 +23,13 @@ from dynamicdns.processor import Processor
 class TestDNS(unittest.TestCase):
 
 
+    def setUp(self):
+        fastpath.known.clear()
+        signing.nonces.clear()
+        ratelimit.buckets.clear()
+        rejections.cache.clear()
+
+
     @patch('dynamicdns.processor.factory')
     @patch('dynamicdns.aws.s3config.factory')
     def testDNSSuccess(self, mock_config, mock_processor):
@@ -115,6 +126,22 @@ class TestDNS(unittest.TestCase):
         self.__checkRaw(result, "FAIL", "Update failed")
 
 
+    @patch('dynamicdns.processor.factory')
+    @patch('dynamicdns.aws.s3config.factory')
+    def testDNSFailUpdateUnavailable(self, mock_config, mock_processor):
+        self.__setUpMocks(configFailed=False, hashFailed=False, updateFailed=False, mock_config=mock_config, mock_processor=mock_processor)
+        mock_processor.return_value.update = MagicMock(return_value = Unavailable("Route 53 is throttling requests, retry in 2 seconds.", 2))
+
+        event = {
+            'queryStringParameters': { 'raw': '', 'hostname': 'abc', 'hash': 'xyz' },
+            'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } }
+        }
+        result = handle(event, {})
+
+        self.assertEqual(result['statusCode'], 503)
+        self.assertEqual(result['body'], "FAIL\nRoute 53 is throttling requests, retry in 2 seconds.")
+
+
     @patch('dynamicdns.processor.factory')
     @patch('dynamicdns.aws.s3config.factory')
     def testDNSMissingParamInternalIp(self, mock_config, mock_processor):
@@ -261,6 +288,210 @@ class TestDNS(unittest.TestCase):
         self.__checkRaw(result, "FAIL", "Source IP address cannot be extracted from request context.")
 
 
+    @patch('dynamicdns.processor.factory')
+    @patch('dynamicdns.aws.s3config.factory')
+    def testDNSFastPath(self, mock_config, mock_processor):
+        self.__setUpMocks(configFailed=False, hashFailed=False, updateFailed=False, mock_config=mock_config, mock_processor=mock_processor)
+        fastpath.known.put('abc', '1.1.1.1')
+
+        event = {
+            'queryStringParameters': { 'hostname': 'abc', 'hash': 'xyz' },
+            'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } }
+        }
+        result = handle(event, {})
+        token = json.loads(result['body'])['token']
+
+        event = {
+            'queryStringParameters': { 'raw': '', 'hostname': 'abc', 'knownip': '1.1.1.1', 'token': token },
+            'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } }
+        }
+        mock_config.return_value.load.reset_mock()
+        result = handle(event, {})
+
+        self.assertEqual(result['body'], "SUCCESS\nYour IP '1.1.1.1' address matches the current DNS record for 'abc'.\n" + token)
+
+        del event['queryStringParameters']['knownip']
+        self.assertEqual(handle(event, {})['body'], result['body'])
+        mock_config.return_value.load.assert_not_called()
+        mock_processor.return_value.update.assert_called_once()
+
+        # Dual-stack requests skip the fast path, the token does not confirm the other record
+        event['queryStringParameters']['ipv6'] = '2001:db8::1'
+        self.assertEqual(handle(event, {})['body'], "FAIL\nYou have to pass 'hash' querystring parameters.")
+
+
+    @patch('dynamicdns.processor.factory')
+    @patch('dynamicdns.aws.s3config.factory')
+    def testDNSSignHost(self, mock_config, mock_processor):
+        self.__setUpMocks(configFailed=False, hashFailed=False, updateFailed=False, mock_config=mock_config, mock_processor=mock_processor)
+
+        event = {
+            'queryStringParameters': { 'raw': '', 'hostname': 'abc', 'hash': 'xyz', 'timestamp': '1', 'nonce': 'nonce-0001', 'sign': 'host' },
+            'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } }
+        }
+        mock_processor.return_value.checkreplay = MagicMock(return_value = None)
+        result = handle(event, {})
+
+        self.assertEqual(result['body'], "SUCCESS\nOK")
+        mock_processor.return_value.checkhash.assert_called_once_with('abc', 'xyz', '1.1.1.1', 'shared_secret', '1', 'nonce-0001', 'host', "", None, None)
+
+        event['queryStringParameters']['sign'] = 'ip'
+        result = handle(event, {})
+
+        self.assertEqual(result['body'], "FAIL\nYou must pass 'sourceip' or 'host' in the sign= querystring parameter.")
+
+
+    @patch('dynamicdns.processor.factory')
+    @patch('dynamicdns.aws.s3config.factory')
+    def testDNSFastPathMiss(self, mock_config, mock_processor):
+        self.__setUpMocks(configFailed=False, hashFailed=False, updateFailed=False, mock_config=mock_config, mock_processor=mock_processor)
+
+        event = {
+            'queryStringParameters': { 'hostname': 'abc', 'knownip': '1.1.1.1', 'token': '1.abc' },
+            'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } }
+        }
+        result = handle(event, {})
+        self.__checkJson(result, "FAIL", "You have to pass 'hash' querystring parameters.")
+
+        event['queryStringParameters']['hash'] = 'xyz'
+        result = handle(event, {})
+        self.__checkJson(result, "SUCCESS", "OK")
+
+
+    @patch('dynamicdns.processor.factory')
+    @patch('dynamicdns.aws.s3config.factory')
+    def testDNSReplayed(self, mock_config, mock_processor):
+        self.__setUpMocks(configFailed=False, hashFailed=False, updateFailed=False, mock_config=mock_config, mock_processor=mock_processor)
+        signing.nonces.add('abc\nnonce-0001')
+
+        event = {
+            'queryStringParameters': { 'hostname': 'abc', 'hash': 'xyz', 'timestamp': str(int(time.time())), 'nonce': 'nonce-0001' },
+            'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } }
+        }
+        result = handle(event, {})
+
+        self.__checkJson(result, "FAIL", "The request has been replayed.")
+        mock_config.return_value.load.assert_not_called()
+        mock_processor.return_value.checkhash.assert_not_called()
+
+
+    @patch('dynamicdns.processor.factory')
+    @patch('dynamicdns.aws.s3config.factory')
+    def testDNSThrottled(self, mock_config, mock_processor):
+        self.__setUpMocks(configFailed=False, hashFailed=False, updateFailed=False, mock_config=mock_config, mock_processor=mock_processor)
+
+        event = {
+            'queryStringParameters': { 'hostname': 'abc', 'hash': 'xyz' },
+            'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } }
+        }
+        with patch.dict('os.environ', { 'RATE_LIMIT_HOST_RATE': '0.1', 'RATE_LIMIT_HOST_BURST': '1' }):
+            handle(event, {})
+            mock_config.return_value.load.reset_mock()
+            result = handle(event, {})
+
+        self.assertEqual(result['statusCode'], 429)
+        self.assertEqual(json.loads(result['body']), { 'status': 'FAIL', 'message': "Too many requests for hostname 'abc', retry in 10 seconds." })
+        mock_config.return_value.load.assert_not_called()
+
+
+    @patch('dynamicdns.processor.factory')
+    @patch('dynamicdns.aws.s3config.factory')
+    def testDNSReadAfterHashcheck(self, mock_config, mock_processor):
+        self.__setUpMocks(configFailed=False, hashFailed=True, updateFailed=False, mock_config=mock_config, mock_processor=mock_processor)
+        processor = mock_processor.return_value
+        processor.fetch = MagicMock(return_value = (None, '1.1.1.1'))
+
+        event = {
+            'queryStringParameters': { 'hostname': 'abc', 'hash': 'xyz' },
+            'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } }
+        }
+        with patch.dict('os.environ', { 'RATE_LIMIT_SOURCE_RATE': '1' }):
+            handle(event, {})
+
+        processor.fetch.assert_not_called()
+        processor.update.assert_not_called()
+
+
+    @patch('dynamicdns.processor.factory')
+    @patch('dynamicdns.aws.s3config.factory')
+    def testDNSUnknownHostCached(self, mock_config, mock_processor):
+        self.__setUpMocks(configFailed=False, hashFailed=False, updateFailed=False, mock_config=mock_config, mock_processor=mock_processor)
+        mock_config.return_value.shared_secret = MagicMock(side_effect=HostNotFound('abc'))
+
+        event = {
+            'queryStringParameters': { 'hostname': 'abc', 'hash': 'xyz' },
+            'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } }
+        }
+        first = handle(event, {})
+        second = handle(event, {})
+
+        self.__checkJson(first, "FAIL", "Configuration for hostname 'abc' not found.")
+        self.__checkJson(second, "FAIL", "Configuration for hostname 'abc' not found.")
+        mock_config.return_value.load.assert_called_once()
+        self.assertEqual(rejections.cache.stats(), { 'hits': 1, 'hosts': 1, 'hashes': 0 })
+
+
+    @patch('dynamicdns.processor.factory')
+    @patch('dynamicdns.aws.s3config.factory')
+    def testDNSSharedSecretFailedNotCached(self, mock_config, mock_processor):
+        self.__setUpMocks(configFailed=False, hashFailed=False, updateFailed=False, mock_config=mock_config, mock_processor=mock_processor)
+        mock_config.return_value.shared_secret = MagicMock(side_effect=Exception("ShardException"))
+
+        event = {
+            'queryStringParameters': { 'hostname': 'abc', 'hash': 'xyz' },
+            'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } }
+        }
+        handle(event, {})
+        result = handle(event, {})
+
+        self.__checkJson(result, "FAIL", "ShardException")
+        self.assertEqual(mock_config.return_value.load.call_count, 2)
+
+
+    @patch('dynamicdns.processor.factory')
+    @patch('dynamicdns.aws.s3config.factory')
+    def testDNSFailedHashCached(self, mock_config, mock_processor):
+        self.__setUpMocks(configFailed=False, hashFailed=True, updateFailed=False, mock_config=mock_config, mock_processor=mock_processor)
+
+        event = {
+            'queryStringParameters': { 'hostname': 'abc', 'hash': 'xyz' },
+            'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } }
+        }
+        handle(event, {})
+        result = handle(event, {})
+
+        self.__checkJson(result, "FAIL", "Hashcheck failed")
+        mock_config.return_value.load.assert_called_once()
+        mock_processor.return_value.checkhash.assert_called_once()
+
+        event['queryStringParameters']['hash'] = 'other'
+        handle(event, {})
+        self.assertEqual(mock_processor.return_value.checkhash.call_count, 2)
+
+
+    @patch('dynamicdns.processor.factory')
+    @patch('dynamicdns.aws.s3config.factory')
+    def testDNSDualstack(self, mock_config, mock_processor):
+        self.__setUpMocks(configFailed=False, hashFailed=False, updateFailed=False, mock_config=mock_config, mock_processor=mock_processor)
+        mock_processor.return_value.update_records = MagicMock(return_value="OK")
+
+        event = {
+            'queryStringParameters': { 'hostname': 'abc', 'hash': 'xyz', 'ipv6': '::1' },
+            'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } }
+        }
+        result = handle(event, {})
+
+        self.__checkJson(result, "SUCCESS", "OK")
+        mock_processor.return_value.update_records.assert_called_once_with('abc', { 'A': '1.1.1.1', 'AAAA': '::1' })
+        mock_processor.return_value.update.assert_not_called()
+        mock_processor.return_value.checkhash.assert_called_once_with('abc', 'xyz', '1.1.1.1', 'shared_secret', None, None, 'sourceip', "", None, '::1')
+
+        event['queryStringParameters']['ipv6'] = '1.1.1.1'
+        result = handle(event, {})
+
+        self.__checkJson(result, "FAIL", "You must pass an IPv6 address in the ipv6= querystring parameter.")
+
+
 # -----------------------------------------------------------------------------
 # TESTING HELPER METHODS
 # -----------------------------------------------------------------------------
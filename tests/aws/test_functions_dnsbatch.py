@@ -0,0 +1,206 @@
+import json
+import unittest
+
+from unittest.mock import MagicMock, patch
+
+import dynamicdns
+
+from dynamicdns import ratelimit, rejections
+
+from dynamicdns.aws.functions.dnsbatch import handle 
+
+from dynamicdns.models import Error
+
+from dynamicdns.aws.s3config import S3ConfigProvider
+
+from dynamicdns.processor import Processor
+
+
+class TestDNSBatch(unittest.TestCase):
+
+
+    def setUp(self):
+        rejections.cache.clear()
+        ratelimit.buckets.clear()
+
+
+    @patch('dynamicdns.processor.factory')
+    @patch('dynamicdns.aws.s3config.factory')
+    def testDNSBatchSuccess(self, mock_config, mock_processor):
+        processor = self.__setUpMocks(mock_config, mock_processor)
+
+        event = {
+            'queryStringParameters': {},
+            'body': json.dumps([
+                { 'hostname': 'abc', 'hash': 'xyz' },
+                { 'hostname': 'def', 'hash': 'xyz', 'internalip': '2.2.2.2' }
+            ]),
+            'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } }
+        }
+
+        result = handle(event, {})
+
+        processor.update_batch.assert_called_once_with([('abc', '1.1.1.1', ''), ('def', '1.1.1.1', '2.2.2.2')])
+        self.assertEqual(json.loads(result['body']), {
+            'status': 'SUCCESS',
+            'results': [
+                { 'hostname': 'abc', 'status': 'SUCCESS', 'message': 'OK' },
+                { 'hostname': 'def', 'status': 'SUCCESS', 'message': 'OK' }
+            ]
+        })
+
+
+    @patch('dynamicdns.processor.factory')
+    @patch('dynamicdns.aws.s3config.factory')
+    def testDNSBatchRejected(self, mock_config, mock_processor):
+        processor = self.__setUpMocks(mock_config, mock_processor)
+
+        event = {
+            'queryStringParameters': { 'raw': '' },
+            'body': json.dumps([
+                { 'hostname': 'abc', 'hash': 'xyz' },
+                { 'hostname': 'bad', 'hash': 'xyz' },
+                { 'hostname': 'unknown', 'hash': 'xyz' }
+            ]),
+            'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } }
+        }
+
+        result = handle(event, {})
+
+        processor.update_batch.assert_called_once_with([('abc', '1.1.1.1', '')])
+        self.assertEqual(result['headers']['Content-Type'], 'text/plain')
+        self.assertEqual(result['body'], 'FAIL\n' + 
+            'bad FAIL Hashcheck failed\n' + 
+            'unknown FAIL Unknown hostname\n' + 
+            'abc SUCCESS OK')
+
+
+    @patch('dynamicdns.processor.factory')
+    @patch('dynamicdns.aws.s3config.factory')
+    def testDNSBatchFailConfig(self, mock_config, mock_processor):
+        self.__setUpMocks(mock_config, mock_processor)
+        mock_config.return_value.load = MagicMock(return_value = Error("Config Load failed"))
+
+        event = {
+            'queryStringParameters': { 'raw': '' },
+            'body': json.dumps([ { 'hostname': 'abc', 'hash': 'xyz' } ]),
+            'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } }
+        }
+
+        result = handle(event, {})
+        self.assertEqual(result['body'], 'FAIL\nConfig Load failed')
+
+
+    @patch('dynamicdns.processor.factory')
+    @patch('dynamicdns.aws.s3config.factory')
+    def testDNSBatchThrottledHost(self, mock_config, mock_processor):
+        processor = self.__setUpMocks(mock_config, mock_processor)
+
+        event = {
+            'queryStringParameters': { 'raw': '' },
+            'body': json.dumps([
+                { 'hostname': 'abc', 'hash': 'xyz' },
+                { 'hostname': 'abc', 'hash': 'xyz' },
+                { 'hostname': 'def', 'hash': 'xyz' }
+            ]),
+            'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } }
+        }
+        with patch.dict('os.environ', { 'RATE_LIMIT_HOST_RATE': '0.1', 'RATE_LIMIT_HOST_BURST': '1' }):
+            handle(event, {})
+            processor.update_batch.reset_mock()
+            result = handle(event, {})
+
+        processor.update_batch.assert_called_once_with([])
+        self.assertEqual(result['body'], 'FAIL\n' + 
+            "abc FAIL Too many requests for hostname 'abc', retry in 10 seconds.\n" + 
+            "def FAIL Too many requests for hostname 'def', retry in 10 seconds.")
+
+
+    @patch('dynamicdns.processor.factory')
+    @patch('dynamicdns.aws.s3config.factory')
+    def testDNSBatchThrottledSource(self, mock_config, mock_processor):
+        self.__setUpMocks(mock_config, mock_processor)
+
+        event = {
+            'queryStringParameters': { 'raw': '' },
+            'body': json.dumps([ { 'hostname': 'abc', 'hash': 'xyz' }, { 'hostname': 'def', 'hash': 'xyz' } ]),
+            'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } }
+        }
+        with patch.dict('os.environ', { 'RATE_LIMIT_SOURCE_RATE': '0.1', 'RATE_LIMIT_SOURCE_BURST': '1' }):
+            handle(event, {})
+            mock_config.return_value.load.reset_mock()
+            result = handle(event, {})
+
+        self.assertEqual(result['statusCode'], 429)
+        self.assertEqual(result['body'], "FAIL\nToo many requests for source IP '1.1.1.1', retry in 10 seconds.")
+        mock_config.return_value.load.assert_not_called()
+
+
+    def testDNSBatchInvalidBody(self):
+        for body in [ None, 'no json', '{}', '[]', '["abc"]', '[{"hostname": "abc"}]', '[{"hostname": "abc", "hash": 123}]',
+            '[{"hostname": ["abc"], "hash": "xyz"}]', '[{"hostname": "abc", "hash": "xyz", "internalip": 1}]',
+            '[{"hostname": "abc", "hash": "xyz", "timestamp": 1, "nonce": "n"}]', '[{"hostname": "abc", "hash": "xyz", "timestamp": "1", "nonce": {}}]' ]:
+            event = {
+                'queryStringParameters': { 'raw': '' },
+                'body': body,
+                'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } }
+            }
+            result = handle(event, {})
+            self.assertTrue(result['body'].startswith('FAIL\n'))
+
+
+    @patch('dynamicdns.processor.factory')
+    @patch('dynamicdns.aws.s3config.factory')
+    def testDNSBatchTooManyEntries(self, mock_config, mock_processor):
+        processor = self.__setUpMocks(mock_config, mock_processor)
+
+        event = {
+            'queryStringParameters': { 'raw': '' },
+            'body': json.dumps([ { 'hostname': 'abc', 'hash': 'xyz' } ] * 3),
+            'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } }
+        }
+        with patch.dict('os.environ', { 'BATCH_MAX_ENTRIES': '2' }):
+            result = handle(event, {})
+
+        self.assertEqual(result['body'], 'FAIL\nYou can pass at most 2 entries in the request body.')
+        mock_config.return_value.load.assert_not_called()
+        processor.update_batch.assert_not_called()
+
+        event['body'] = json.dumps([ { 'hostname': 'abc', 'hash': 'xyz' } ] * 100)
+        self.assertEqual(handle(event, {})['body'], 'SUCCESS\nabc SUCCESS OK')
+
+
+    def testDNSBatchMissingParamSourceIp(self):
+        event = {
+            'queryStringParameters': { 'raw': '' },
+            'body': json.dumps([ { 'hostname': 'abc', 'hash': 'xyz' } ])
+        }
+        result = handle(event, {})
+        self.assertEqual(result['body'], 'FAIL\nSource IP address cannot be extracted from request context.')
+
+
+# -----------------------------------------------------------------------------
+# TESTING HELPER METHODS
+# -----------------------------------------------------------------------------
+
+    def __setUpMocks(self, mock_config, mock_processor):
+
+        def shared_secret(hostname):
+            if hostname == 'unknown':
+                raise Exception("Unknown hostname")
+            return 'shared_secret'
+
+        config = S3ConfigProvider(None)
+        config.load = MagicMock(return_value = None)
+        config.shared_secret = MagicMock(side_effect = shared_secret)
+        mock_config.return_value = config
+
+        processor = Processor(None)
+        processor.checkhash = MagicMock(side_effect = lambda hostname, *args: Error("Hashcheck failed") if hostname == 'bad' else None)
+        processor.update_batch = MagicMock(side_effect = lambda entries: { entry[0]: "OK" for entry in entries })
+        mock_processor.return_value = processor
+        return processor
+
+
+if __name__ == '__main__':
+    unittest.main()
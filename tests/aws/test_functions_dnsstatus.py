@@ -0,0 +1,102 @@
+import json
+import unittest
+
+from unittest.mock import MagicMock, patch
+
+from dynamicdns import ratelimit, rejections, signing
+
+from dynamicdns.aws.functions.dnsstatus import handle 
+
+from dynamicdns.models import Error
+from dynamicdns.memory import MemoryConfigProvider, MemoryDNSProvider
+
+
+CONFIG = { 'abc': {
+    'route_53_region': 'region',
+    'route_53_zone_id': 'zone-id',
+    'route_53_record_ttl': 300,
+    'route_53_record_type': 'A',
+    'shared_secret': 'secret'
+}}
+
+HASH = signing.legacy('secret', '1.1.1.1', 'abc')
+
+
+class TestDNSStatus(unittest.TestCase):
+
+
+    def setUp(self):
+        ratelimit.buckets.clear()
+        rejections.cache.clear()
+
+
+    @patch('dynamicdns.backend.providers')
+    def testStatus(self, mock_providers):
+        dns = MemoryDNSProvider()
+        dns.status = MagicMock(return_value={ 'change': '/change/C1', 'status': 'INSYNC', 'seconds': 42.04 })
+        mock_providers.return_value = (MemoryConfigProvider(CONFIG), dns)
+
+        event = {
+            'queryStringParameters': { 'hostname': 'abc', 'hash': HASH, 'change': '/change/C1' },
+            'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } }
+        }
+        result = handle(event, {})
+
+        self.assertEqual(json.loads(result['body']), { 'status': 'SUCCESS', 'message': "Change '/change/C1' of 'abc' is INSYNC after 42.0 seconds.", 'change': '/change/C1' })
+        dns.status.assert_called_once_with('abc', '/change/C1')
+
+        dns.status = MagicMock(return_value={ 'change': '/change/C1', 'status': 'PENDING', 'seconds': 3 })
+        event['queryStringParameters'] = { 'raw': '', 'hostname': 'abc', 'hash': HASH }
+        result = handle(event, {})
+
+        self.assertEqual(result['body'], "SUCCESS\nChange '/change/C1' of 'abc' is PENDING since 3.0 seconds.")
+        dns.status.assert_called_once_with('abc', None)
+
+
+    @patch('dynamicdns.backend.providers')
+    def testStatusWrongHash(self, mock_providers):
+        dns = MemoryDNSProvider()
+        dns.status = MagicMock()
+        mock_providers.return_value = (MemoryConfigProvider(CONFIG), dns)
+
+        for hostname, validationhash, message in [
+            ('abc', None, "You have to pass 'hash' querystring parameters."),
+            ('abc', '0' * 64, "Validation of hashes failed."),
+            ('unknown', HASH, "Configuration for hostname 'unknown' not found.") ]:
+            event = {
+                'queryStringParameters': { 'raw': '', 'hostname': hostname, 'change': '/change/C1' },
+                'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } }
+            }
+            if validationhash is not None:
+                event['queryStringParameters']['hash'] = validationhash
+            result = handle(event, {})
+
+            self.assertEqual(result['body'], "FAIL\n" + message)
+        dns.status.assert_not_called()
+
+
+    @patch('dynamicdns.backend.providers')
+    def testStatusUnsupported(self, mock_providers):
+        mock_providers.return_value = (MemoryConfigProvider(CONFIG), MemoryDNSProvider())
+
+        event = {
+            'queryStringParameters': { 'raw': '', 'hostname': 'abc', 'hash': HASH },
+            'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } }
+        }
+        result = handle(event, {})
+
+        self.assertEqual(result['body'], "FAIL\nChange tracking is not supported by this DNS provider.")
+
+
+    def testStatusMissingParamHostname(self):
+        event = {
+            'queryStringParameters': { 'raw': '' },
+            'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } }
+        }
+        result = handle(event, {})
+
+        self.assertEqual(result['body'], "FAIL\nYou have to pass 'hostname' querystring parameters.")
+
+
+if __name__ == '__main__':
+    unittest.main()
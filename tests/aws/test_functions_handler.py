@@ -1,4 +1,6 @@
 import json
+import subprocess
+import sys
 import unittest
 
 from unittest.mock import (patch, MagicMock)
@@ -22,6 +24,24 @@ class testHandler(unittest.TestCase):
         mock_script.assert_not_called()
         mock_version.assert_not_called()
 
+    @patch('dynamicdns.aws.functions.dnsbatch.handle') 
+    @patch('dynamicdns.aws.functions.dns.handle') 
+    def testHandlerDNSBatch(self, mock_dns: MagicMock, mock_dnsbatch: MagicMock):
+        event = { 'resource':  '/dns/batch', 'httpMethod': 'POST'}
+        context = {}
+        handle(event, context)
+        mock_dns.assert_not_called()
+        mock_dnsbatch.assert_called_once_with(event, context)
+
+    @patch('dynamicdns.aws.functions.dnsstatus.handle') 
+    @patch('dynamicdns.aws.functions.dns.handle') 
+    def testHandlerDNSStatus(self, mock_dns: MagicMock, mock_dnsstatus: MagicMock):
+        event = { 'resource':  '/dns/status', 'httpMethod': 'GET'}
+        context = {}
+        handle(event, context)
+        mock_dns.assert_not_called()
+        mock_dnsstatus.assert_called_once_with(event, context)
+
     @patch('dynamicdns.aws.functions.version.handle') 
     @patch('dynamicdns.aws.functions.script.handle') 
     @patch('dynamicdns.aws.functions.myip.handle') 
@@ -75,5 +95,19 @@ class testHandler(unittest.TestCase):
         mock_version.assert_not_called()
 
 
+    def testHandlerImportsRoutesLazily(self):
+        probe = ("import sys; from dynamicdns.aws.functions.handler import handle; " + 
+            "handle({ 'resource': '/myip', 'httpMethod': 'GET', 'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } } }, {}); " +
+            "print('dynamicdns.aws.functions.dns' in sys.modules, 'boto3' in sys.modules)")
+        output = subprocess.run([sys.executable, '-c', probe], check=True, stdout=subprocess.PIPE).stdout
+        self.assertEqual(output.decode('utf-8').strip(), 'False False')
+
+
+    def testDNSImportsAsyncioLazily(self):
+        probe = "import sys; from dynamicdns.aws.functions import dns, dnsbatch, dnsstatus; print('asyncio' in sys.modules)"
+        output = subprocess.run([sys.executable, '-c', probe], check=True, stdout=subprocess.PIPE).stdout
+        self.assertEqual(output.decode('utf-8').strip(), 'False')
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -2,11 +2,17 @@ import unittest
 
 from unittest.mock import patch, mock_open
 
+from dynamicdns.aws.functions import script
+
 from dynamicdns.aws.functions.script import handle 
 
 
 class TestScript(unittest.TestCase):
 
+
+    def setUp(self):
+        script.cached = None
+
     
     def testScript(self):
         event = {
@@ -23,5 +29,31 @@ class TestScript(unittest.TestCase):
         self.assertEqual(result['body'], 'SCRIPT')
 
 
+    def testScriptReadOnce(self):
+        with patch('builtins.open', mock_open(read_data='SCRIPT')) as mock_file:
+            first = handle({}, {})
+            second = handle({}, {})
+
+        mock_file.assert_called_once()
+        self.assertEqual(first['body'], second['body'])
+        self.assertEqual(first['headers']['ETag'], second['headers']['ETag'])
+        self.assertEqual(first['headers']['Cache-Control'], 'public, max-age=300')
+
+
+    def testScriptNotModified(self):
+        with patch('builtins.open', mock_open(read_data='SCRIPT')):
+            etag = handle({}, {})['headers']['ETag']
+
+        for value in [ etag, 'W/' + etag, '"other", ' + etag, '*' ]:
+            result = handle({ 'headers': { 'if-none-match': value } }, {})
+            self.assertEqual(result['statusCode'], 304)
+            self.assertEqual(result['body'], '')
+            self.assertEqual(result['headers']['ETag'], etag)
+
+        result = handle({ 'headers': { 'If-None-Match': '"other"' } }, {})
+        self.assertEqual(result['statusCode'], 200)
+        self.assertEqual(result['body'], 'SCRIPT')
+
+
 if __name__ == '__main__':
     unittest.main()
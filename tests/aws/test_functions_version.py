@@ -30,5 +30,15 @@ class TestVersion(unittest.TestCase):
         self.assertEqual(a, b)
 
 
+    def testVersionNotModified(self):
+        etag = handle({}, {})['headers']['ETag']
+
+        result = handle({ 'headers': { 'If-None-Match': etag } }, {})
+
+        self.assertEqual(result['statusCode'], 304)
+        self.assertEqual(result['body'], '')
+        self.assertEqual(result['headers']['Cache-Control'], 'public, max-age=300')
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,158 @@
+import unittest
+
+from unittest.mock import MagicMock, patch
+
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+from dynamicdns.models import Error, Unavailable, HostConfig, RecordType
+
+from dynamicdns.aws import retry, route53
+
+from dynamicdns.aws.boto3wrapper import Boto3Wrapper
+
+
+class ThrottlingRoute53(Boto3Wrapper):
+    """Route 53 answering the first calls with an error code before it accepts changes"""
+
+    def __init__(self, failures: int, code: str = 'Throttling'):
+        self.failures = failures
+        self.code = code
+        self.calls = 0
+
+    def client_change_resource_record_sets(self, region, hosted_zone_id, change_batch):
+        self.calls += 1
+        if self.failures > 0:
+            self.failures -= 1
+            raise ClientError({ 'Error': { 'Code': self.code, 'Message': 'Rate exceeded' } }, 'ChangeResourceRecordSets')
+        return { 'ChangeInfo': { 'Id': '/change/C' + str(self.calls), 'Status': 'PENDING' } }
+
+
+class TestRetry(unittest.TestCase):
+
+
+    def testClassify(self):
+        self.assertEqual(retry.classify(ClientError({ 'Error': { 'Code': 'Throttling' } }, 'op')), 'throttling')
+        self.assertEqual(retry.classify(ClientError({ 'Error': { 'Code': 'PriorRequestNotComplete' } }, 'op')), 'throttling')
+        self.assertEqual(retry.classify(ClientError({ 'Error': { 'Code': 'ServiceUnavailable' } }, 'op')), 'transient')
+        self.assertEqual(retry.classify(EndpointConnectionError(endpoint_url='https://route53.amazonaws.com')), 'transient')
+        self.assertIsNone(retry.classify(ClientError({ 'Error': { 'Code': 'InvalidChangeBatch' } }, 'op')))
+        self.assertIsNone(retry.classify(Exception('Exception')))
+
+
+    def testRetriedWithBackoff(self):
+        wrapper = ThrottlingRoute53(2)
+        retrier = self.__createRetrier()
+
+        with patch('random.uniform', side_effect=lambda low, high: high):
+            result = retrier.call(wrapper.client_change_resource_record_sets, 'region', 'zone', {})
+
+        self.assertEqual(result['ChangeInfo']['Id'], '/change/C3')
+        self.assertEqual([ call[0][0] for call in retrier.sleep.call_args_list ], [ 0.1, 0.2 ])
+        self.assertEqual(retrier.budget.tokens, 91)
+
+
+    def testBackoffCapped(self):
+        retrier = self.__createRetrier(max_attempts=6, threshold=10)
+
+        with patch('random.uniform', side_effect=lambda low, high: high):
+            retrier.call(ThrottlingRoute53(5).client_change_resource_record_sets, 'region', 'zone', {})
+
+        self.assertEqual([ call[0][0] for call in retrier.sleep.call_args_list ], [ 0.1, 0.2, 0.4, 0.5, 0.5 ])
+
+
+    def testFatalNotRetried(self):
+        wrapper = ThrottlingRoute53(1, 'InvalidChangeBatch')
+        retrier = self.__createRetrier()
+
+        with self.assertRaises(ClientError):
+            retrier.call(wrapper.client_change_resource_record_sets, 'region', 'zone', {})
+
+        self.assertEqual(wrapper.calls, 1)
+        retrier.sleep.assert_not_called()
+
+
+    def testTransientRaisedAfterAttempts(self):
+        wrapper = ThrottlingRoute53(10, 'ServiceUnavailable')
+        retrier = self.__createRetrier()
+
+        with self.assertRaises(ClientError):
+            retrier.call(wrapper.client_change_resource_record_sets, 'region', 'zone', {})
+
+        self.assertEqual(wrapper.calls, 3)
+        self.assertIsNone(retrier.breaker.opened)
+
+
+    def testBudgetExhausted(self):
+        retrier = self.__createRetrier(capacity=10, threshold=100)
+
+        with self.assertRaises(retry.Saturated):
+            retrier.call(ThrottlingRoute53(10).client_change_resource_record_sets, 'region', 'zone', {})
+        wrapper = ThrottlingRoute53(10)
+        with self.assertRaises(retry.Saturated):
+            retrier.call(wrapper.client_change_resource_record_sets, 'region', 'zone', {})
+
+        self.assertEqual(wrapper.calls, 1)
+        self.assertEqual(retrier.sleep.call_count, 2)
+
+
+    def testCircuitBreaker(self):
+        retrier = self.__createRetrier(threshold=3)
+
+        with patch('time.monotonic', return_value=100):
+            with self.assertRaises(retry.Saturated):
+                retrier.call(ThrottlingRoute53(10).client_change_resource_record_sets, 'region', 'zone', {})
+            wrapper = ThrottlingRoute53(0)
+            with self.assertRaises(retry.Saturated) as context:
+                retrier.call(wrapper.client_change_resource_record_sets, 'region', 'zone', {})
+
+        self.assertEqual(str(context.exception), 'Route 53 is throttling requests, retry in 10 seconds.')
+        self.assertEqual(wrapper.calls, 0)
+
+        with patch('time.monotonic', return_value=110):
+            self.assertEqual(retrier.call(wrapper.client_change_resource_record_sets, 'region', 'zone', {})['ChangeInfo']['Id'], '/change/C1')
+        self.assertIsNone(retrier.breaker.opened)
+
+
+    def testCircuitBreakerProbeFails(self):
+        retrier = self.__createRetrier(max_attempts=1, threshold=1)
+
+        with patch('time.monotonic', return_value=100):
+            with self.assertRaises(retry.Saturated):
+                retrier.call(ThrottlingRoute53(10).client_change_resource_record_sets, 'region', 'zone', {})
+        with patch('time.monotonic', return_value=110):
+            with self.assertRaises(retry.Saturated):
+                retrier.call(ThrottlingRoute53(10).client_change_resource_record_sets, 'region', 'zone', {})
+        with patch('time.monotonic', return_value=115):
+            self.assertEqual(retrier.breaker.allow(), 5)
+
+
+    def testRoute53Provider(self):
+        config = MagicMock()
+        config.host = MagicMock(side_effect=lambda hostname: HostConfig(hostname, 'region', 'zone', 300, RecordType.A, 'shared_secret'))
+        wrapper = ThrottlingRoute53(1)
+        dns = route53.Route53Provider(wrapper, config, route53.ZoneSnapshots(0), route53.ChangeTracker(1, 60, 100), self.__createRetrier(threshold=2))
+
+        self.assertEqual(dns.update('test', '1.1.1.1'), '1.1.1.1')
+        self.assertEqual(dns.change('test'), '/change/C2')
+
+        wrapper.failures = 10
+        result = dns.update('test', '2.2.2.2')
+        self.assertTrue(isinstance(result, Unavailable))
+        self.assertEqual(str(result), 'Update of DNS record failed. Exception: Route 53 is throttling requests, retry in 10 seconds.')
+
+        result = dns.update_batch({ 'a': '1.1.1.1' })
+        self.assertTrue(isinstance(result['a'], Unavailable))
+        self.assertEqual(wrapper.calls, 4)
+
+        wrapper.code = 'InvalidChangeBatch'
+        dns.retrier.breaker.clear()
+        result = dns.update('test', '3.3.3.3')
+        self.assertTrue(isinstance(result, Error) and not isinstance(result, Unavailable))
+
+
+    def __createRetrier(self, max_attempts = 3, capacity = 100, threshold = 5):
+        return retry.Retrier(retry.RetryBudget(capacity, 5, 1), retry.CircuitBreaker(threshold, 10), max_attempts, 0.1, 0.5, MagicMock())
+
+
+if __name__ == '__main__':
+    unittest.main()
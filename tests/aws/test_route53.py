@@ -1,9 +1,12 @@
+import datetime
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import ANY, MagicMock, patch
 
-from dynamicdns.models import DNSProvider, Error
+from botocore.exceptions import ClientError
 
-from dynamicdns.aws import (boto3wrapper, s3config, route53)
+from dynamicdns.models import DNSProvider, Error, HostConfig, RecordType
+
+from dynamicdns.aws import (boto3wrapper, s3config, retry, route53)
 
 from dynamicdns.aws.boto3wrapper import Boto3Wrapper
 from dynamicdns.aws.s3config import S3ConfigProvider
@@ -13,11 +16,18 @@ from dynamicdns.aws.route53 import Route53Provider
 class TestRoute53Provider(unittest.TestCase):
 
 
+    def setUp(self):
+        route53.snapshots.clear()
+        route53.changes.clear()
+        retry.budget.clear()
+        retry.breaker.clear()
+
+
     def testReadHostnameWithoutDot(self):
         dns = self.__createDNSProvider(
         { 'ResourceRecordSets':
         [
-            { 'Name': 'test', 'ResourceRecords':
+            { 'Name': 'test', 'Type': 'A', 'ResourceRecords':
                 [ 
                     { 'Value': 'test-value' }
                 ]
@@ -34,7 +44,7 @@ class TestRoute53Provider(unittest.TestCase):
         dns = self.__createDNSProvider(
         { 'ResourceRecordSets':
         [
-            { 'Name': 'test.', 'ResourceRecords':
+            { 'Name': 'test.', 'Type': 'A', 'ResourceRecords':
                 [ 
                     { 'Value': 'test-value' }
                 ]
@@ -51,7 +61,7 @@ class TestRoute53Provider(unittest.TestCase):
         dns = self.__createDNSProvider(
         { 'ResourceRecordSets':
         [
-            { 'Name': 'test', 'ResourceRecords':
+            { 'Name': 'test', 'Type': 'A', 'ResourceRecords':
                 [ 
                     { 'Value': 'test-value-1' },
                     { 'Value': 'test-value-2' }
@@ -69,7 +79,7 @@ class TestRoute53Provider(unittest.TestCase):
         dns = self.__createDNSProvider(
         { 'ResourceRecordSets':
         [
-            { 'Name': 'test-new', 'ResourceRecords':
+            { 'Name': 'test-new', 'Type': 'A', 'ResourceRecords':
                 [ 
                     { 'Value': 'test-value' }
                 ]
@@ -109,6 +119,98 @@ class TestRoute53Provider(unittest.TestCase):
         self.assertEqual(str(result), 'Retrieval of current ip address failed. Excpeption: ReadException')
 
 
+    def testReadSnapshotReused(self):
+        dns = self.__createDNSProvider(
+        { 'ResourceRecordSets':
+        [
+            { 'Name': 'test.', 'Type': 'A', 'ResourceRecords': [ { 'Value': 'test-value' } ] },
+            { 'Name': 'other.', 'Type': 'A', 'ResourceRecords': [ { 'Value': 'other-value' } ] }
+        ]})
+
+        self.assertEqual(dns.read('test'), 'test-value')
+        self.assertEqual(dns.read('other'), 'other-value')
+        self.assertEqual(dns.read('OTHER.'), 'other-value')
+
+        dns.boto3_wrapper.client_list_resource_record_set_pages.assert_called_once_with('route_53_region', 'route_53_zone_id')
+        dns.boto3_wrapper.client_list_resource_record_sets.assert_not_called()
+
+
+    def testReadSnapshotPages(self):
+        dns = self.__createDNSProvider({})
+        dns.boto3_wrapper.client_list_resource_record_set_pages = MagicMock(return_value=[
+            { 'ResourceRecordSets': [ { 'Name': 'first.', 'Type': 'A', 'ResourceRecords': [ { 'Value': 'first-value' } ] } ] },
+            { 'ResourceRecordSets': [ { 'Name': 'test.', 'Type': 'A', 'ResourceRecords': [ { 'Value': 'test-value' } ] } ] }
+        ])
+
+        self.assertEqual(dns.read('test'), 'test-value')
+
+
+    def testReadSnapshotWrongType(self):
+        dns = self.__createDNSProvider(
+        { 'ResourceRecordSets':
+        [
+            { 'Name': 'test.', 'Type': 'TXT', 'ResourceRecords': [ { 'Value': 'test-value' } ] }
+        ]})
+
+        self.assertEqual(dns.read('test'), '')
+
+
+    def testReadSnapshotExpired(self):
+        dns = self.__createDNSProvider({ 'ResourceRecordSets': [] })
+
+        with patch('time.monotonic', return_value=1000.0):
+            dns.read('test')
+        with patch('time.monotonic', return_value=1000.0 + route53.snapshots.ttl):
+            dns.read('test')
+
+        self.assertEqual(dns.boto3_wrapper.client_list_resource_record_set_pages.call_count, 2)
+
+
+    def testReadWithoutSnapshot(self):
+        dns = self.__createDNSProvider(
+        { 'ResourceRecordSets':
+        [
+            { 'Name': 'test.', 'Type': 'A', 'ResourceRecords': [ { 'Value': 'test-value' } ] }
+        ]})
+
+        with patch.object(route53.snapshots, 'ttl', 0):
+            result = dns.read('test')
+
+        self.assertEqual(result, 'test-value')
+        self.assertFalse(dns.live())
+        with patch.object(route53.snapshots, 'ttl', 0):
+            self.assertTrue(dns.live())
+        dns.boto3_wrapper.client_list_resource_record_set_pages.assert_not_called()
+        dns.boto3_wrapper.client_list_resource_record_sets.assert_called_once_with(
+            region='route_53_region', hosted_zone_id='route_53_zone_id', start_record_name='test', start_record_type='A', max_items='2')
+
+
+    def testUpdatePatchesSnapshot(self):
+        dns = self.__createDNSProvider(
+        { 'ResourceRecordSets':
+        [
+            { 'Name': 'test.', 'Type': 'A', 'ResourceRecords': [ { 'Value': '1.1.1.1' } ] }
+        ]})
+
+        dns.read('test')
+        dns.update('test', '2.2.2.2')
+        dns.update_batch({ 'other': '3.3.3.3' })
+
+        self.assertEqual(dns.read('test'), '2.2.2.2')
+        self.assertEqual(dns.read('other'), '3.3.3.3')
+        dns.boto3_wrapper.client_list_resource_record_set_pages.assert_called_once()
+
+
+    def testUpdateFailureInvalidatesSnapshot(self):
+        dns = self.__createDNSProvider({ 'ResourceRecordSets': [] }, updateException = True)
+
+        dns.read('test')
+        dns.update('test', '2.2.2.2')
+        dns.read('test')
+
+        self.assertEqual(dns.boto3_wrapper.client_list_resource_record_set_pages.call_count, 2)
+
+
     def testUpdate(self):
         dns = self.__createDNSProvider({})
         
@@ -116,6 +218,11 @@ class TestRoute53Provider(unittest.TestCase):
 
         self.assertFalse(isinstance(error, Error))
         self.assertEqual(result, '1.1.1.1')
+        dns.boto3_wrapper.client_change_resource_record_sets.assert_called_once_with(
+            region = 'route_53_region',
+            hosted_zone_id = 'route_53_zone_id',
+            change_batch = { 'Changes': [ { 'Action': 'UPSERT', 'ResourceRecordSet': { 'Name': 'test', 'Type': 'A', 'TTL': 300, 'ResourceRecords': [ { 'Value': '1.1.1.1' } ] } } ] }
+        )
 
     def testUpdateException(self):
         dns = self.__createDNSProvider(data = {}, updateException = True)
@@ -126,14 +233,206 @@ class TestRoute53Provider(unittest.TestCase):
         self.assertEqual(str(result), 'Update of DNS record failed. Exception: UpdateException')
 
 
+    def testUpdateBatch(self):
+        dns = self.__createDNSProvider({})
+        dns.config.host = MagicMock(side_effect=lambda hostname: self.__host(hostname, 'zone-' + hostname[0]))
+
+        result = dns.update_batch({ 'a1': '1.1.1.1', 'b1': '2.2.2.2', 'a2': '3.3.3.3' })
+
+        self.assertEqual(result, { 'a1': '1.1.1.1', 'a2': '3.3.3.3', 'b1': '2.2.2.2' })
+        calls = dns.boto3_wrapper.client_change_resource_record_sets.call_args_list
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(calls[0][1]['hosted_zone_id'], 'zone-a')
+        self.assertEqual([c['ResourceRecordSet']['Name'] for c in calls[0][1]['change_batch']['Changes']], ['a1', 'a2'])
+        self.assertEqual(calls[1][1]['hosted_zone_id'], 'zone-b')
+
+
+    def testUpdateBatchChunked(self):
+        dns = self.__createDNSProvider({})
+
+        updates = { 'host' + str(i): '1.1.1.1' for i in range(route53.MAX_CHANGES_PER_BATCH + 1) }
+        result = dns.update_batch(updates)
+
+        self.assertEqual(result, updates)
+        calls = dns.boto3_wrapper.client_change_resource_record_sets.call_args_list
+        self.assertEqual(len(calls[0][1]['change_batch']['Changes']), route53.MAX_CHANGES_PER_BATCH)
+        self.assertEqual(len(calls[1][1]['change_batch']['Changes']), 1)
+
+
+    def testUpdateBatchException(self):
+        dns = self.__createDNSProvider(data = {}, updateException = True)
+
+        result = dns.update_batch({ 'a': '1.1.1.1', 'b': '2.2.2.2' })
+
+        self.assertEqual(str(result['a']), 'Update of DNS record failed. Exception: UpdateException')
+        self.assertEqual(str(result['b']), 'Update of DNS record failed. Exception: UpdateException')
+
+
+    def testReadRecords(self):
+        dns = self.__createDNSProvider(
+        { 'ResourceRecordSets':
+        [
+            { 'Name': 'test.', 'Type': 'A', 'ResourceRecords': [ { 'Value': '1.1.1.1' } ] },
+            { 'Name': 'test.', 'Type': 'AAAA', 'ResourceRecords': [ { 'Value': '::1' } ] }
+        ]})
+
+        self.assertEqual(dns.read_records('test', [ 'A', 'AAAA' ]), { 'A': '1.1.1.1', 'AAAA': '::1' })
+        self.assertEqual(dns.read_records('other', [ 'A', 'AAAA' ]), { 'A': '', 'AAAA': '' })
+        dns.boto3_wrapper.client_list_resource_record_set_pages.assert_called_once()
+
+
+    def testReadRecordsWithoutSnapshot(self):
+        dns = self.__createDNSProvider(
+        { 'ResourceRecordSets':
+        [
+            { 'Name': 'test.', 'Type': 'AAAA', 'ResourceRecords': [ { 'Value': '::1' } ] },
+            { 'Name': 'test.', 'Type': 'CAA', 'ResourceRecords': [ { 'Value': 'caa' } ] }
+        ]})
+
+        with patch.object(route53.snapshots, 'ttl', 0):
+            result = dns.read_records('test', [ 'A', 'AAAA' ])
+
+        self.assertEqual(result, { 'A': '', 'AAAA': '::1' })
+        dns.boto3_wrapper.client_list_resource_record_sets.assert_called_once_with(
+            region='route_53_region', hosted_zone_id='route_53_zone_id', start_record_name='test', start_record_type='A', max_items='2')
+
+
+    def testReadRecordsMultipleValues(self):
+        dns = self.__createDNSProvider(
+        { 'ResourceRecordSets':
+        [
+            { 'Name': 'test.', 'Type': 'AAAA', 'ResourceRecords': [ { 'Value': '::1' }, { 'Value': '::2' } ] }
+        ]})
+
+        result = dns.read_records('test', [ 'A', 'AAAA' ])
+
+        self.assertEqual(str(result), 'You should only have a single value for your dynamic record. You currently have more than one.')
+
+
+    def testUpdateRecords(self):
+        dns = self.__createDNSProvider({ 'ResourceRecordSets': [] })
+        dns.read_records('test', [ 'A', 'AAAA' ])
+
+        result = dns.update_records('test', { 'A': '1.1.1.1', 'AAAA': '::1' })
+
+        self.assertEqual(result, { 'A': '1.1.1.1', 'AAAA': '::1' })
+        dns.boto3_wrapper.client_change_resource_record_sets.assert_called_once_with(
+            region = 'route_53_region',
+            hosted_zone_id = 'route_53_zone_id',
+            change_batch = { 'Changes': [ 
+                { 'Action': 'UPSERT', 'ResourceRecordSet': { 'Name': 'test', 'Type': 'A', 'TTL': 300, 'ResourceRecords': [ { 'Value': '1.1.1.1' } ] } },
+                { 'Action': 'UPSERT', 'ResourceRecordSet': { 'Name': 'test', 'Type': 'AAAA', 'TTL': 300, 'ResourceRecords': [ { 'Value': '::1' } ] } } 
+            ] }
+        )
+        self.assertEqual(dns.read_records('test', [ 'A', 'AAAA' ]), { 'A': '1.1.1.1', 'AAAA': '::1' })
+
+
+    def testUpdateRecordsException(self):
+        dns = self.__createDNSProvider(data = {}, updateException = True)
+
+        result = dns.update_records('test', { 'A': '1.1.1.1', 'AAAA': '::1' })
+
+        self.assertEqual(str(result), 'Update of DNS record failed. Exception: UpdateException')
+
+
+    def testUpdateRecordsChange(self):
+        dns = self.__createDNSProvider({})
+        dns.boto3_wrapper.client_change_resource_record_sets = MagicMock(return_value={ 'ChangeInfo': { 'Id': '/change/C1', 'Status': 'PENDING' } })
+
+        self.assertIsNone(dns.change('test'))
+        dns.update('test', '1.1.1.1')
+        self.assertEqual(dns.change('test'), '/change/C1')
+
+        dns.boto3_wrapper.client_change_resource_record_sets = MagicMock(return_value={ 'ChangeInfo': { 'Id': '/change/C2', 'Status': 'PENDING' } })
+        dns.update_batch({ 'a': '1.1.1.1', 'b': '2.2.2.2' })
+        dns.update_records('c', { 'A': '1.1.1.1' })
+
+        self.assertEqual([ dns.change(hostname) for hostname in [ 'test', 'a', 'b', 'c' ] ], [ '/change/C1', '/change/C2', '/change/C2', '/change/C2' ])
+
+
+    def testStatus(self):
+        dns = self.__createDNSProvider({})
+        dns.boto3_wrapper.client_get_change = MagicMock(return_value={ 'ChangeInfo': { 'Id': '/change/C1', 'Status': 'INSYNC', 
+            'SubmittedAt': datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc) } })
+
+        self.assertEqual(str(dns.status('test')), "No change of 'test' is known, pass the change id of the update.")
+
+        with patch('time.time', return_value=datetime.datetime(2020, 1, 1, 0, 0, 30, tzinfo=datetime.timezone.utc).timestamp()):
+            result = dns.status('test', '/change/C1')
+            again = dns.status('test', '/change/C1')
+
+        self.assertEqual(result, { 'change': '/change/C1', 'status': 'INSYNC', 'seconds': 30 })
+        self.assertEqual(again, result)
+        self.assertIsNone(dns.change('test'))
+        self.assertIsNone(dns.change_tracker.get('/change/C1'))
+        self.assertEqual(dns.boto3_wrapper.client_get_change.call_count, 2)
+
+
+    def testStatusException(self):
+        dns = self.__createDNSProvider({})
+        dns.boto3_wrapper.client_get_change = MagicMock(side_effect=Exception('NoSuchChange'))
+
+        self.assertEqual(str(dns.status('test', '/change/C1')), 'Retrieval of change status failed. Exception: NoSuchChange')
+
+
+    def testPollBackoff(self):
+        tracker = route53.ChangeTracker(1, 4, 100)
+        dns = self.__createDNSProvider({})
+        dns.change_tracker = tracker
+        dns.boto3_wrapper.client_get_change = MagicMock(return_value={ 'ChangeInfo': { 'Id': '/change/C1', 'Status': 'PENDING' } })
+
+        with patch('time.monotonic', return_value=100):
+            tracker.record('region', [ 'test' ], { 'Id': '/change/C1', 'Status': 'PENDING' })
+            self.assertEqual(dns.poll(), [])
+        for now, polls in [ (101, 1), (102, 1), (103, 2), (107, 3), (110, 3), (111, 4), (115, 5) ]:
+            with patch('time.monotonic', return_value=now):
+                dns.poll()
+            self.assertEqual(dns.boto3_wrapper.client_get_change.call_count, polls)
+
+        dns.boto3_wrapper.client_get_change = MagicMock(return_value={ 'ChangeInfo': { 'Id': '/change/C1', 'Status': 'INSYNC' } })
+        with patch('time.monotonic', return_value=200):
+            self.assertEqual(dns.poll()[0]['status'], 'INSYNC')
+            self.assertEqual(dns.poll(), [])
+        dns.boto3_wrapper.client_get_change.assert_called_once_with('region', '/change/C1')
+
+
+    def testPollFailedChanges(self):
+        tracker = route53.ChangeTracker(1, 4, 100)
+        dns = self.__createDNSProvider({})
+        dns.change_tracker = tracker
+        responses = {
+            '/change/C1': { 'ChangeInfo': { 'Id': '/change/C1', 'Status': 'INSYNC' } },
+            '/change/C2': ClientError({ 'Error': { 'Code': 'NoSuchChange' } }, 'GetChange'),
+            '/change/C3': Exception('Timeout')
+        }
+        def get_change(region, change_id):
+            if isinstance(responses[change_id], Exception):
+                raise responses[change_id]
+            return responses[change_id]
+        dns.boto3_wrapper.client_get_change = MagicMock(side_effect=get_change)
+
+        with patch('time.monotonic', return_value=100):
+            for change_id in [ '/change/C2', '/change/C3', '/change/C1' ]:
+                tracker.track('region', [], change_id)
+            self.assertEqual(dns.poll(), [ { 'change': '/change/C1', 'status': 'INSYNC', 'seconds': ANY } ])
+
+        self.assertIsNone(tracker.get('/change/C2'))
+        self.assertEqual(tracker.get('/change/C3')['due'], 102)
+        with patch('time.monotonic', return_value=101):
+            self.assertEqual(dns.poll(), [])
+        self.assertEqual(dns.boto3_wrapper.client_get_change.call_count, 3)
+
+
     def __createDNSProvider(self, data, readException = False, updateException = False):
         boto3_wrapper: Boto3Wrapper = boto3wrapper.factory()
         boto3_wrapper.client_get_object = MagicMock(return_value=None)
         
         if readException:
             boto3_wrapper.client_list_resource_record_sets = MagicMock(side_effect=Exception('ReadException'))
+            boto3_wrapper.client_list_resource_record_set_pages = MagicMock(side_effect=Exception('ReadException'))
         else:
             boto3_wrapper.client_list_resource_record_sets = MagicMock(return_value=data)
+            boto3_wrapper.client_list_resource_record_set_pages = MagicMock(return_value=[data])
         
         if updateException:
             boto3_wrapper.client_change_resource_record_sets = MagicMock(side_effect=Exception('UpdateException'))
@@ -141,14 +440,14 @@ class TestRoute53Provider(unittest.TestCase):
             boto3_wrapper.client_change_resource_record_sets = MagicMock(return_value=None)
 
         config: S3ConfigProvider = s3config.factory(None)
-        config.route_53_region = MagicMock(return_value='route_53_region')
-        config.route_53_record_ttl = MagicMock(return_value='route_53_record_ttl')
-        config.route_53_record_type = MagicMock(return_value='route_53_record_type')
-        config.route_53_zone_id = MagicMock(return_value='route_53_zone_id')
-        config.shared_secret = MagicMock(return_value='shared_secret')
+        config.host = MagicMock(side_effect=lambda hostname: self.__host(hostname, 'route_53_zone_id'))
 
         return route53.factory(boto3_wrapper, config)
 
 
+    def __host(self, hostname, zone_id):
+        return HostConfig(hostname, 'route_53_region', zone_id, 300, RecordType.A, 'shared_secret')
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -3,7 +3,8 @@ import json
 
 from unittest.mock import MagicMock, patch
 
-from dynamicdns.models import ConfigProvider, Error
+from dynamicdns import shards
+from dynamicdns.models import ConfigProvider, Error, HostNotFound, InvalidHost, RecordType
 
 from dynamicdns.aws import (boto3wrapper, s3config)
 
@@ -13,6 +14,18 @@ from dynamicdns.aws.s3config import S3ConfigProvider
 
 class TestS3ConfigProvider(unittest.TestCase):
 
+    HOST = {
+        "route_53_region": "region",
+        "route_53_zone_id": "zone-id",
+        "route_53_record_ttl": 42,
+        "route_53_record_type": "A",
+        "shared_secret": "shared-secret"
+    }
+
+
+    def setUp(self):
+        s3config.cache.clear()
+
 
     def testReadProps(self):
         config: S3ConfigProvider = self.__createConfigProvider(
@@ -20,7 +33,7 @@ class TestS3ConfigProvider(unittest.TestCase):
                 "route_53_region": "region",
                 "route_53_zone_id": "zone-id",
                 "route_53_record_ttl": 42,
-                "route_53_record_type": "record-type",
+                "route_53_record_type": "A",
                 "shared_secret": "shared-secret"
             }
         })
@@ -37,7 +50,8 @@ class TestS3ConfigProvider(unittest.TestCase):
             self.assertEqual(config.route_53_region('hostname'), 'region')
             self.assertEqual(config.route_53_zone_id('hostname'), 'zone-id')
             self.assertEqual(config.route_53_record_ttl('hostname'), 42)
-            self.assertEqual(config.route_53_record_type('hostname'), 'record-type')
+            self.assertEqual(config.route_53_record_type('hostname'), 'A')
+            self.assertEqual(config.host('hostname').route_53_record_type, RecordType.A)
             self.assertEqual(config.shared_secret('hostname'), 'shared-secret')
 
 
@@ -47,7 +61,7 @@ class TestS3ConfigProvider(unittest.TestCase):
                 "route_53_region": "region",
                 "route_53_zone_id": "zone-id",
                 "route_53_record_ttl": 42,
-                "route_53_record_type": "record-type",
+                "route_53_record_type": "A",
                 "shared_secret": "shared-secret"
             }
         })
@@ -60,7 +74,7 @@ class TestS3ConfigProvider(unittest.TestCase):
             result = config.load()
 
             self.assertFalse(isinstance(result, Error))
-            with self.assertRaises(Exception):
+            with self.assertRaises(HostNotFound):
                 config.route_53_region('hostname-not-in-config')
 
 
@@ -69,7 +83,7 @@ class TestS3ConfigProvider(unittest.TestCase):
         {   "hostname": {
                 "route_53_zone_id": "zone-id",
                 "route_53_record_ttl": 42,
-                "route_53_record_type": "record-type",
+                "route_53_record_type": "A",
                 "shared_secret": "shared-secret"
             }
         })
@@ -79,11 +93,56 @@ class TestS3ConfigProvider(unittest.TestCase):
             'CONFIG_S3_BUCKET': 'bucket',
             'CONFIG_S3_KEY': 'key',
         }):
-            result = config.load()
+            self.assertIsNone(config.load())
+            with self.assertRaises(InvalidHost) as raised:
+                config.shared_secret('hostname')
+            self.assertEqual(str(raised.exception), "Configuration for hostname 'hostname' and attribute 'route_53_region' not found.")
 
-            self.assertFalse(isinstance(result, Error))
-            with self.assertRaises(Exception):
-                config.route_53_region('hostname')
+
+    def testInvalidAttributes(self):
+        for attr, value in [ ('route_53_record_ttl', 'ttl'), ('route_53_record_ttl', 1.5), ('route_53_record_ttl', -1), ('route_53_record_ttl', True), ('route_53_record_type', 'TXT') ]:
+            data = { "hostname": dict(self.HOST) }
+            data["hostname"][attr] = value
+            s3config.cache.clear()
+            config: S3ConfigProvider = self.__createConfigProvider(data)
+
+            with patch.dict('os.environ', {
+                'CONFIG_S3_REGION': 'region',
+                'CONFIG_S3_BUCKET': 'bucket',
+                'CONFIG_S3_KEY': 'key',
+            }):
+                self.assertIsNone(config.load())
+                with self.assertRaises(InvalidHost) as raised:
+                    config.host('hostname')
+            self.assertEqual(str(raised.exception), "Configuration for hostname 'hostname' has an invalid " + attr + ".")
+
+
+    def testInvalidHostIsolated(self):
+        config: S3ConfigProvider = self.__createConfigProvider({ "hostname": self.HOST, "invalid": dict(self.HOST, route_53_record_ttl="300s") })
+
+        with patch.dict('os.environ', {
+            'CONFIG_S3_REGION': 'region',
+            'CONFIG_S3_BUCKET': 'bucket',
+            'CONFIG_S3_KEY': 'key',
+        }), self.assertLogs('dynamicdns.models', level='WARNING') as logs:
+            self.assertIsNone(config.load())
+            self.assertIsNone(config.load())
+            self.assertEqual(config.shared_secret('hostname'), self.HOST['shared_secret'])
+            self.assertRaises(InvalidHost, config.shared_secret, 'invalid')
+            self.assertRaises(HostNotFound, config.shared_secret, 'unknown')
+        self.assertEqual(len(logs.output), 1)
+
+
+    def testNumericStringTTL(self):
+        config: S3ConfigProvider = self.__createConfigProvider({ "hostname": dict(self.HOST, route_53_record_ttl="300") })
+
+        with patch.dict('os.environ', {
+            'CONFIG_S3_REGION': 'region',
+            'CONFIG_S3_BUCKET': 'bucket',
+            'CONFIG_S3_KEY': 'key',
+        }):
+            self.assertIsNone(config.load())
+            self.assertEqual(config.route_53_record_ttl('hostname'), 300)
 
 
     def testReadException(self):
@@ -117,6 +176,104 @@ class TestS3ConfigProvider(unittest.TestCase):
         })
 
 
+    def testCacheHit(self):
+        config: S3ConfigProvider = self.__createConfigProvider({ "hostname": self.HOST })
+
+        with patch.dict('os.environ', {
+            'CONFIG_S3_REGION': 'region',
+            'CONFIG_S3_BUCKET': 'bucket',
+            'CONFIG_S3_KEY': 'key',
+        }):
+            self.assertIsNone(config.load())
+            self.assertIsNone(s3config.factory(config.boto3_wrapper).load())
+
+        config.boto3_wrapper.client_get_object_conditional.assert_called_once_with(region='region', bucket='bucket', key='key', etag=None)
+        self.assertEqual(s3config.cache.stats(), { 'hits': 1, 'misses': 1, 'revalidations': 0 })
+
+
+    def testCacheRevalidation(self):
+        config: S3ConfigProvider = self.__createConfigProvider({ "hostname": self.HOST })
+
+        with patch.dict('os.environ', {
+            'CONFIG_S3_REGION': 'region',
+            'CONFIG_S3_BUCKET': 'bucket',
+            'CONFIG_S3_KEY': 'key',
+        }), patch.object(s3config.cache, 'ttl', 0):
+            config.load()
+            config.boto3_wrapper.client_get_object_conditional = MagicMock(return_value=(None, '"etag"'))
+            result = config.load()
+
+            self.assertFalse(isinstance(result, Error))
+            self.assertEqual(config.shared_secret('hostname'), 'shared-secret')
+
+        config.boto3_wrapper.client_get_object_conditional.assert_called_once_with(region='region', bucket='bucket', key='key', etag='"etag"')
+        self.assertEqual(s3config.cache.stats(), { 'hits': 0, 'misses': 1, 'revalidations': 1 })
+
+
+    def testCacheModified(self):
+        config: S3ConfigProvider = self.__createConfigProvider({ "hostname": self.HOST })
+
+        with patch.dict('os.environ', {
+            'CONFIG_S3_REGION': 'region',
+            'CONFIG_S3_BUCKET': 'bucket',
+            'CONFIG_S3_KEY': 'key',
+        }), patch.object(s3config.cache, 'ttl', 0):
+            config.load()
+            config.boto3_wrapper.client_get_object_conditional = MagicMock(return_value=(json.dumps({ "hostname": dict(self.HOST, shared_secret="changed") }), '"etag2"'))
+            config.load()
+
+            self.assertEqual(config.shared_secret('hostname'), 'changed')
+
+        self.assertEqual(s3config.cache.stats(), { 'hits': 0, 'misses': 2, 'revalidations': 0 })
+
+
+    def testSharded(self):
+        objects = {
+            'key': json.dumps({ 'format': 'sharded', 'shards': 4, 'prefix': 'shards/' }),
+            shards.Manifest(4, 'shards/').key('hostname'): json.dumps({ 'hostname': self.HOST })
+        }
+        config: S3ConfigProvider = self.__createConfigProvider(None)
+        config.boto3_wrapper.client_get_object_conditional = MagicMock(side_effect=lambda region, bucket, key, etag: (objects[key], '"etag"'))
+
+        with patch.dict('os.environ', {
+            'CONFIG_S3_REGION': 'region',
+            'CONFIG_S3_BUCKET': 'bucket',
+            'CONFIG_S3_KEY': 'key',
+        }):
+            result = config.load()
+
+            self.assertFalse(isinstance(result, Error))
+            self.assertEqual(config.shared_secret('hostname'), 'shared-secret')
+            self.assertEqual(config.route_53_zone_id('hostname'), 'zone-id')
+            with self.assertRaises(Exception):
+                config.shared_secret('hostname-not-in-config')
+
+        keys = [ call[1]['key'] for call in config.boto3_wrapper.client_get_object_conditional.call_args_list ]
+        self.assertEqual(keys[:2], ['key', shards.Manifest(4, 'shards/').key('hostname')])
+        self.assertEqual(keys.count(keys[1]), 1)
+
+
+    def testCachedBeforeLoad(self):
+        config: S3ConfigProvider = self.__createConfigProvider({ "hostname": self.HOST })
+
+        with patch.dict('os.environ', {
+            'CONFIG_S3_REGION': 'region',
+            'CONFIG_S3_BUCKET': 'bucket',
+            'CONFIG_S3_KEY': 'key',
+        }):
+            self.assertIsNone(config.cached('hostname'))
+            with self.assertRaises(HostNotFound):
+                config.host('hostname')
+            config.load()
+
+            other = s3config.factory(config.boto3_wrapper)
+            self.assertEqual(other.cached('hostname').route_53_zone_id, 'zone-id')
+            self.assertEqual(other.host('hostname').shared_secret, 'shared-secret')
+            self.assertIsNone(other.cached('hostname-not-in-config'))
+
+        self.assertIsNone(other.cached('hostname'))
+
+
     def __testWithMissingConfig(self, config, env_vars):
         with patch.dict('os.environ', env_vars):
             result = config.load()
@@ -128,9 +285,9 @@ class TestS3ConfigProvider(unittest.TestCase):
         boto3_wrapper: Boto3Wrapper = boto3wrapper.factory()
         
         if readException:
-            boto3_wrapper.client_get_object = MagicMock(side_effect=Exception('ReadException'))
+            boto3_wrapper.client_get_object_conditional = MagicMock(side_effect=Exception('ReadException'))
         else:
-            boto3_wrapper.client_get_object = MagicMock(return_value=json.dumps(data))
+            boto3_wrapper.client_get_object_conditional = MagicMock(return_value=(json.dumps(data), '"etag"'))
         
         boto3_wrapper.client_list_resource_record_sets = MagicMock(return_value=None)
         boto3_wrapper.client_change_resource_record_sets = MagicMock(return_value=None)
@@ -0,0 +1,56 @@
+import json
+import unittest
+
+from unittest.mock import MagicMock
+
+from dynamicdns.aws import (boto3wrapper, sqs)
+
+from dynamicdns.aws.boto3wrapper import Boto3Wrapper
+from dynamicdns.aws.sqs import SQSQueue
+
+
+class TestSQSQueue(unittest.TestCase):
+
+
+    def testSend(self):
+        queue = self.__createQueue([])
+
+        queue.send({ 'hostname': 'a', 'ip': '1.1.1.1', 'timestamp': 1 })
+
+        queue.boto3_wrapper.client_send_message.assert_called_once_with(region='region', queue_url='url', message_body=json.dumps({ 'hostname': 'a', 'ip': '1.1.1.1', 'timestamp': 1 }))
+
+
+    def testReceive(self):
+        queue = self.__createQueue([
+            { 'Messages': [ { 'ReceiptHandle': 'r' + str(i), 'Body': json.dumps({ 'n': i }) } for i in range(10) ] },
+            { 'Messages': [ { 'ReceiptHandle': 'r10', 'Body': json.dumps({ 'n': 10 }) } ] },
+            {}
+        ])
+
+        messages = queue.receive(15)
+
+        self.assertEqual(messages[10], ('r10', { 'n': 10 }))
+        self.assertEqual(len(messages), 11)
+        self.assertEqual([ call[1]['max_number_of_messages'] for call in queue.boto3_wrapper.client_receive_message.call_args_list ], [10, 5, 4])
+
+
+    def testDelete(self):
+        queue = self.__createQueue([])
+
+        queue.delete([ 'r' + str(i) for i in range(11) ])
+
+        calls = queue.boto3_wrapper.client_delete_message_batch.call_args_list
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(calls[1][1]['entries'], [ { 'Id': '0', 'ReceiptHandle': 'r10' } ])
+
+
+    def __createQueue(self, responses):
+        boto3_wrapper: Boto3Wrapper = boto3wrapper.factory()
+        boto3_wrapper.client_send_message = MagicMock(return_value=None)
+        boto3_wrapper.client_receive_message = MagicMock(side_effect=responses)
+        boto3_wrapper.client_delete_message_batch = MagicMock(return_value=None)
+        return sqs.factory(boto3_wrapper, 'region', 'url')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import asyncio
+import unittest
+
+from dynamicdns import aio, metrics
+from dynamicdns.models import Error, AsyncDNSProvider
+from dynamicdns.memory import MemoryConfigProvider, MemoryDNSProvider
+
+
+class NativeDNSProvider(AsyncDNSProvider):
+
+    def __init__(self):
+        self.records = {}
+
+    async def read(self, hostname: str):
+        await asyncio.sleep(0)
+        return self.records.get(hostname, "")
+
+    async def update(self, hostname: str, updateip: str):
+        self.records[hostname] = updateip
+        return updateip
+
+
+class TestAio(unittest.TestCase):
+
+
+    def testAsyncAdapters(self):
+        config = aio.config(MemoryConfigProvider({ 'hostname': {
+            'route_53_region': 'region',
+            'route_53_zone_id': 'zone-id',
+            'route_53_record_ttl': 42,
+            'route_53_record_type': 'A',
+            'shared_secret': 'shared-secret'
+        }}))
+        dns = aio.dns(MemoryDNSProvider({ 'hostname': '1.1.1.1' }))
+
+        async def scenario():
+            return await asyncio.gather(config.load(), dns.read('hostname'), dns.update('hostname', '2.2.2.2'))
+
+        self.assertEqual(aio.run(scenario()), [ None, '1.1.1.1', '2.2.2.2' ])
+        self.assertEqual(aio.run(config.shared_secret('hostname')), 'shared-secret')
+        self.assertEqual(aio.run(dns.update_batch({ 'a': '3.3.3.3' })), { 'a': '3.3.3.3' })
+        self.assertIsNone(dns.change('hostname'))
+        self.assertTrue(isinstance(aio.run(dns.status('hostname')), Error))
+
+
+    def testSyncAdapter(self):
+        native = NativeDNSProvider()
+        dns = aio.SyncDNSAdapter(native)
+
+        self.assertEqual(dns.read('hostname'), "")
+        self.assertEqual(dns.update_batch({ 'hostname': '1.1.1.1', 'other': '2.2.2.2' }), { 'hostname': '1.1.1.1', 'other': '2.2.2.2' })
+        self.assertEqual(dns.read('hostname'), '1.1.1.1')
+        self.assertTrue(isinstance(dns.read_records('hostname', [ 'A' ]), Error))
+        self.assertEqual(dns.poll(), [])
+        self.assertIs(aio.dns(dns), native)
+        self.assertIs(aio.dns(native), native)
+
+
+    def testRunReusesLoop(self):
+        async def current():
+            return asyncio.get_event_loop()
+
+        loop = aio.run(current())
+        self.assertIs(aio.run(current()), loop)
+        self.assertFalse(loop.is_running())
+
+
+    def testMetricsContext(self):
+        previous = (metrics.mode, metrics.sink)
+        metrics.configure('collect', lambda recorder: None)
+        try:
+            recorder = metrics.begin('/dns')
+            dns = MemoryDNSProvider()
+            dns.read = lambda hostname: metrics.current().count('reads')
+            aio.run(aio.dns(dns).read('hostname'))
+            metrics.end(recorder)
+        finally:
+            metrics.configure(previous[0], previous[1])
+
+        self.assertEqual(recorder.counters, { 'reads': 1 })
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from unittest.mock import MagicMock, patch
+
+import dynamicdns.backend
+
+from dynamicdns import ratelimit, signing
+
+from dynamicdns.aws.dynamodb import DynamoDBBucketStore, DynamoDBNonceStore
+from dynamicdns.aws.route53 import Route53Provider
+from dynamicdns.aws.s3config import S3ConfigProvider
+from dynamicdns.aws.sqs import SQSQueue
+from dynamicdns.debounce import DebouncedDNSProvider
+from dynamicdns.memory import MemoryConfigProvider, MemoryDNSProvider
+from dynamicdns.packed import PackedConfigProvider
+from dynamicdns.queues import LocalQueue
+from dynamicdns.sqlite import SQLiteConfigProvider, SQLiteDNSProvider
+
+
+class TestBackend(unittest.TestCase):
+
+
+    def testAWS(self):
+        config, dns = dynamicdns.backend.providers()
+
+        self.assertTrue(isinstance(config, S3ConfigProvider))
+        self.assertTrue(isinstance(dns, Route53Provider))
+        self.assertIs(dns.config, config)
+
+
+    def testAWSDebounced(self):
+        with patch.object(dynamicdns.backend.debounce.state, 'min_interval', 60):
+            config, dns = dynamicdns.backend.providers()
+
+        self.assertTrue(isinstance(dns, DebouncedDNSProvider))
+        self.assertTrue(isinstance(dns.dns, Route53Provider))
+
+
+    def testAWSPacked(self):
+        with patch.dict('os.environ', { 'CONFIG_PACKED_PATH': '/var/task/config.packed' }):
+            config, dns = dynamicdns.backend.providers()
+
+        self.assertTrue(isinstance(config, PackedConfigProvider))
+        self.assertEqual(config.path, '/var/task/config.packed')
+        self.assertTrue(isinstance(dns, Route53Provider))
+        self.assertIs(dns.config, config)
+
+
+    def testSQLite(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'dynamicdns.db')
+            with patch.dict('os.environ', { 'SQLITE_PATH': path }):
+                config, dns = dynamicdns.backend.sqlite()
+            dynamicdns.sqlite.databases.pop(path)
+
+        self.assertTrue(isinstance(config, SQLiteConfigProvider))
+        self.assertTrue(isinstance(dns, SQLiteDNSProvider))
+        self.assertIs(dns.config, config)
+
+
+    def testUse(self):
+        providers = (MemoryConfigProvider({}), MemoryDNSProvider())
+        queue = LocalQueue()
+
+        with patch.object(dynamicdns.backend, 'current', dynamicdns.backend.current), \
+            patch.object(dynamicdns.backend, 'current_queue', dynamicdns.backend.current_queue), \
+            patch.object(dynamicdns.backend, 'current_buckets', dynamicdns.backend.current_buckets):
+            dynamicdns.backend.use(lambda: providers)
+            self.assertIs(dynamicdns.backend.providers(), providers)
+            self.assertIsNone(dynamicdns.backend.queue())
+            self.assertIs(dynamicdns.backend.buckets(), ratelimit.buckets)
+
+            dynamicdns.backend.use(lambda: providers, lambda: queue)
+            self.assertIs(dynamicdns.backend.queue(), queue)
+
+
+    def testAWSQueue(self):
+        with patch.dict('os.environ', {}, clear=True):
+            self.assertIsNone(dynamicdns.backend.queue())
+
+        with patch.dict('os.environ', { 'UPDATE_QUEUE_URL': '' }):
+            self.assertIsNone(dynamicdns.backend.queue())
+
+        with patch.dict('os.environ', { 'UPDATE_QUEUE_URL': 'https://queue', 'UPDATE_QUEUE_REGION': 'region' }):
+            queue = dynamicdns.backend.queue()
+
+        self.assertTrue(isinstance(queue, SQSQueue))
+        self.assertEqual(queue.region, 'region')
+        self.assertEqual(queue.queue_url, 'https://queue')
+
+
+    def testAWSBuckets(self):
+        with patch.dict('os.environ', {}, clear=True):
+            self.assertIs(dynamicdns.backend.buckets(), ratelimit.buckets)
+
+        with patch.dict('os.environ', { 'RATE_LIMIT_TABLE': 'table', 'RATE_LIMIT_REGION': 'region' }):
+            buckets = dynamicdns.backend.buckets()
+
+        self.assertTrue(isinstance(buckets, DynamoDBBucketStore))
+        self.assertEqual(buckets.table, 'table')
+        self.assertEqual(buckets.region, 'region')
+
+
+    def testAWSNonces(self):
+        with patch.dict('os.environ', {}, clear=True):
+            self.assertIs(dynamicdns.backend.nonces(), signing.nonces)
+
+        with patch.dict('os.environ', { 'NONCE_TABLE': 'table', 'NONCE_REGION': 'region' }):
+            nonces = dynamicdns.backend.nonces()
+
+        self.assertTrue(isinstance(nonces, DynamoDBNonceStore))
+        self.assertEqual(nonces.table, 'table')
+        self.assertEqual(nonces.region, 'region')
+
+
+    def testImportsBackendsLazily(self):
+        probe = "import sys; import dynamicdns.backend; print('dynamicdns.sqlite' in sys.modules, 'dynamicdns.packed' in sys.modules)"
+        output = subprocess.run([sys.executable, '-c', probe], check=True, stdout=subprocess.PIPE).stdout
+        self.assertEqual(output.decode('utf-8').strip(), 'False False')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+
+from unittest.mock import MagicMock, patch
+
+from dynamicdns import debounce
+
+from dynamicdns.models import Error, Deferred
+from dynamicdns.debounce import Debouncer, DebouncedDNSProvider
+from dynamicdns.memory import MemoryDNSProvider
+
+
+class TestDebounce(unittest.TestCase):
+
+
+    def setUp(self):
+        self.memory = MemoryDNSProvider({ 'a': '1.1.1.1' })
+        self.memory.update_batch = MagicMock(side_effect=lambda updates: dict(updates))
+        self.dns = debounce.factory(self.memory, Debouncer(60))
+
+
+    def testFirstWrite(self):
+        with patch('time.monotonic', return_value=1000.0):
+            self.assertEqual(self.dns.update('a', '2.2.2.2'), '2.2.2.2')
+        self.memory.update_batch.assert_called_once_with({ 'a': '2.2.2.2' })
+        self.assertEqual(self.dns.read('a'), '1.1.1.1')
+
+
+    def testDeferredWithinInterval(self):
+        with patch('time.monotonic', return_value=1000.0):
+            self.dns.update('a', '2.2.2.2')
+        with patch('time.monotonic', return_value=1010.0):
+            result = self.dns.update('a', '3.3.3.3')
+            result = self.dns.update('a', '4.4.4.4')
+            self.assertEqual(self.dns.flush(), {})
+
+        self.assertTrue(isinstance(result, Deferred))
+        self.assertEqual(str(result), '4.4.4.4')
+        self.assertEqual(self.memory.update_batch.call_count, 1)
+
+        with patch('time.monotonic', return_value=1060.0):
+            self.assertEqual(self.dns.flush(), { 'a': '4.4.4.4' })
+            self.assertEqual(self.dns.flush(), {})
+        self.assertEqual(self.memory.update_batch.call_count, 2)
+
+
+    def testCommittedValueWritten(self):
+        # The record may have changed since, e.g. by another container, the processor only writes values differing from DNS
+        with patch('time.monotonic', return_value=1000.0):
+            self.dns.update('a', '2.2.2.2')
+        with patch('time.monotonic', return_value=2000.0):
+            self.assertEqual(self.dns.update('a', '2.2.2.2'), '2.2.2.2')
+        self.assertEqual(self.memory.update_batch.call_count, 2)
+
+
+    def testWriteAfterInterval(self):
+        with patch('time.monotonic', return_value=1000.0):
+            self.dns.update('a', '2.2.2.2')
+        with patch('time.monotonic', return_value=1060.0):
+            self.assertEqual(self.dns.update_batch({ 'a': '3.3.3.3', 'b': '4.4.4.4' }), { 'a': '3.3.3.3', 'b': '4.4.4.4' })
+
+
+    def testPendingSuperseded(self):
+        with patch('time.monotonic', return_value=1000.0):
+            self.dns.update('a', '2.2.2.2')
+            self.dns.update('a', '3.3.3.3')
+        with patch('time.monotonic', return_value=1060.0):
+            self.assertEqual(self.dns.update('a', '4.4.4.4'), '4.4.4.4')
+        with patch('time.monotonic', return_value=1200.0):
+            self.assertEqual(self.dns.flush(), {})
+
+
+    def testFailedWriteNotCommitted(self):
+        self.memory.update_batch = MagicMock(return_value={ 'a': Error("Update failed") })
+        with patch('time.monotonic', return_value=1000.0):
+            self.assertTrue(isinstance(self.dns.update('a', '2.2.2.2'), Error))
+            self.dns.update('a', '2.2.2.2')
+        self.assertEqual(self.memory.update_batch.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+
+from unittest.mock import patch
+
+from dynamicdns.fastpath import KnownAddresses, Tokens
+
+
+class TestKnownAddresses(unittest.TestCase):
+
+
+    def testGetPut(self):
+        known = KnownAddresses(60, 10)
+
+        known.put('a', '1.1.1.1')
+
+        self.assertEqual(known.get('a'), '1.1.1.1')
+        self.assertIsNone(known.get('b'))
+
+        known.invalidate('a')
+
+        self.assertIsNone(known.get('a'))
+
+
+    def testExpiry(self):
+        known = KnownAddresses(60, 10)
+
+        with patch('time.monotonic', return_value=100):
+            known.put('a', '1.1.1.1')
+        with patch('time.monotonic', return_value=159):
+            self.assertEqual(known.get('a'), '1.1.1.1')
+        with patch('time.monotonic', return_value=160):
+            self.assertIsNone(known.get('a'))
+
+
+    def testLeastRecentlyUsedEvicted(self):
+        known = KnownAddresses(60, 2)
+
+        known.put('a', '1.1.1.1')
+        known.put('b', '2.2.2.2')
+        known.get('a')
+        known.put('c', '3.3.3.3')
+
+        self.assertEqual(known.get('a'), '1.1.1.1')
+        self.assertIsNone(known.get('b'))
+        self.assertEqual(known.get('c'), '3.3.3.3')
+
+
+class TestTokens(unittest.TestCase):
+
+
+    def testVerify(self):
+        tokens = Tokens(b'secret', 60)
+
+        token = tokens.issue('a', '1.1.1.1')
+
+        self.assertTrue(tokens.verify(token, 'a', '1.1.1.1'))
+        self.assertFalse(tokens.verify(token, 'a', '2.2.2.2'))
+        self.assertFalse(tokens.verify(token, 'b', '1.1.1.1'))
+        self.assertFalse(Tokens(b'other', 60).verify(token, 'a', '1.1.1.1'))
+        self.assertFalse(tokens.verify(token[:-1] + ('0' if token[-1] != '0' else '1'), 'a', '1.1.1.1'))
+        self.assertFalse(tokens.verify('garbage', 'a', '1.1.1.1'))
+
+
+    def testExpiry(self):
+        tokens = Tokens(b'secret', 60)
+
+        with patch('time.time', return_value=1000):
+            token = tokens.issue('a', '1.1.1.1')
+        with patch('time.time', return_value=1059):
+            self.assertTrue(tokens.verify(token, 'a', '1.1.1.1'))
+        with patch('time.time', return_value=1060):
+            self.assertFalse(tokens.verify(token, 'a', '1.1.1.1'))
+
+
+    def testDisabled(self):
+        self.assertIsNone(Tokens(b'secret', 0).issue('a', '1.1.1.1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
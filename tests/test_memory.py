@@ -0,0 +1,91 @@
+import unittest
+
+from unittest.mock import patch
+
+from dynamicdns.models import Error, InvalidHost
+
+from dynamicdns.memory import Simulation, MemoryConfigProvider, MemoryDNSProvider
+
+
+class TestMemory(unittest.TestCase):
+
+
+    def testConfigProvider(self):
+        config = MemoryConfigProvider({ 'hostname': {
+            'route_53_region': 'region',
+            'route_53_zone_id': 'zone-id',
+            'route_53_record_ttl': 42,
+            'route_53_record_type': 'A',
+            'shared_secret': 'shared-secret'
+        }})
+
+        self.assertIsNone(config.load())
+        self.assertEqual(config.shared_secret('hostname'), 'shared-secret')
+        self.assertEqual(config.host('hostname').route_53_record_ttl, 42)
+        with self.assertRaises(Exception):
+            config.shared_secret('hostname-not-in-config')
+
+
+    def testConfigProviderInvalid(self):
+        config = MemoryConfigProvider({ 'hostname': { 'shared_secret': 'shared-secret' } })
+
+        self.assertIsNone(config.load())
+        with self.assertRaises(InvalidHost) as raised:
+            config.shared_secret('hostname')
+        self.assertEqual(str(raised.exception), "Configuration for hostname 'hostname' and attribute 'route_53_region' not found.")
+
+
+    def testDNSProvider(self):
+        dns = MemoryDNSProvider({ 'a': '1.1.1.1' })
+
+        self.assertEqual(dns.read('a'), '1.1.1.1')
+        self.assertEqual(dns.read('b'), '')
+        self.assertEqual(dns.update('b', '2.2.2.2'), '2.2.2.2')
+        self.assertEqual(dns.update_batch({ 'a': '3.3.3.3' }), { 'a': '3.3.3.3' })
+        self.assertEqual(dns.records, { 'a': '3.3.3.3', 'b': '2.2.2.2' })
+
+
+    def testDNSProviderRecords(self):
+        dns = MemoryDNSProvider()
+
+        self.assertEqual(dns.read_records('a', [ 'A', 'AAAA' ]), { 'A': '', 'AAAA': '' })
+        self.assertEqual(dns.update_records('a', { 'A': '1.1.1.1', 'AAAA': '::1' }), { 'A': '1.1.1.1', 'AAAA': '::1' })
+        self.assertEqual(dns.read_records('a', [ 'A', 'AAAA' ]), { 'A': '1.1.1.1', 'AAAA': '::1' })
+
+
+    def testErrorRate(self):
+        simulation = Simulation(error_rate=1.0)
+        config = MemoryConfigProvider({}, simulation)
+        dns = MemoryDNSProvider({}, simulation)
+
+        self.assertTrue(isinstance(config.load(), Error))
+        self.assertEqual(str(dns.read('a')), 'Retrieval of current ip address failed. Excpeption: Simulated failure of read.')
+        self.assertTrue(isinstance(dns.update('a', '1.1.1.1'), Error))
+        self.assertTrue(isinstance(dns.update_batch({ 'a': '1.1.1.1' })['a'], Error))
+        self.assertEqual(simulation.errors, 4)
+        self.assertEqual(dns.records, {})
+
+
+    def testThrottling(self):
+        simulation = Simulation(max_rate=2)
+        dns = MemoryDNSProvider({}, simulation)
+
+        with patch('time.monotonic', return_value=simulation.refilled):
+            results = [ dns.read('a') for _ in range(3) ]
+        self.assertEqual(results[:2], ['', ''])
+        self.assertEqual(str(results[2]), 'Retrieval of current ip address failed. Excpeption: Throttling: Rate exceeded for read.')
+
+        with patch('time.monotonic', return_value=simulation.refilled + 0.5):
+            self.assertEqual(dns.read('a'), '')
+        self.assertEqual(simulation.throttled, 1)
+
+
+    @patch('time.sleep')
+    def testLatency(self, mock_sleep):
+        dns = MemoryDNSProvider({}, Simulation(latency=0.25))
+        dns.read('a')
+        mock_sleep.assert_called_once_with(0.25)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import json
+import unittest
+
+from unittest.mock import MagicMock, patch
+
+from dynamicdns import metrics
+
+from dynamicdns.aws.functions.handler import handle
+
+
+class TestMetrics(unittest.TestCase):
+
+
+    def setUp(self):
+        metrics.configure('off')
+
+
+    def tearDown(self):
+        metrics.configure('off')
+
+
+    def testStages(self):
+        recorder = metrics.Metrics('/dns')
+
+        with patch('time.perf_counter', side_effect=[1.0, 1.5, 2.0, 2.25]):
+            with recorder.stage('read'):
+                pass
+            with recorder.stage('read'):
+                pass
+        recorder.count('config_cache_hits')
+
+        self.assertEqual(recorder.durations, { 'read': 0.75 })
+        self.assertEqual(recorder.counters, { 'config_cache_hits': 1 })
+
+
+    def testDocument(self):
+        recorder = metrics.Metrics('/dns')
+        recorder.record('config', 0.0012345)
+        recorder.count('config_cache_hits', 2)
+
+        document = recorder.document('Namespace')
+
+        self.assertEqual(document['Resource'], '/dns')
+        self.assertEqual(document['config'], 1.234)
+        self.assertEqual(document['config_cache_hits'], 2)
+        self.assertEqual(document['_aws']['CloudWatchMetrics'][0], {
+            'Namespace': 'Namespace',
+            'Dimensions': [ [ 'Resource' ] ],
+            'Metrics': [ { 'Name': 'config', 'Unit': 'Milliseconds' }, { 'Name': 'config_cache_hits', 'Unit': 'Count' } ]
+        })
+
+
+    def testOff(self):
+        recorder = metrics.begin('/dns')
+
+        self.assertIs(recorder, metrics.NULL)
+        self.assertIs(metrics.current(), metrics.NULL)
+        with recorder.stage('read'):
+            recorder.count('config_cache_hits')
+        metrics.end(recorder)
+
+
+    def testHandlerEmitsOneLine(self):
+        with patch('builtins.print') as mock_print:
+            metrics.configure('emf')
+            handle({ 'resource': '/myip', 'httpMethod': 'GET', 'requestContext': { 'identity': { 'sourceIp': '1.1.1.1' } } }, {})
+
+        mock_print.assert_called_once()
+        document = json.loads(mock_print.call_args[0][0])
+        self.assertEqual(document['Resource'], '/myip')
+        self.assertIn('total', document)
+        self.assertIs(metrics.current(), metrics.NULL)
+
+
+    def testSink(self):
+        sink = MagicMock()
+        metrics.configure('collect', sink)
+
+        recorder = metrics.begin('/dns')
+        self.assertIs(metrics.current(), recorder)
+        metrics.current().record('update', 0.5)
+        metrics.end(recorder)
+
+        sink.assert_called_once_with(recorder)
+        self.assertEqual(recorder.durations, { 'update': 0.5 })
+
+
+if __name__ == '__main__':
+    unittest.main()
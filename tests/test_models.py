@@ -1,6 +1,6 @@
 import unittest
 
-from dynamicdns.models import ConfigProvider, DNSProvider
+from dynamicdns.models import ConfigProvider, DNSProvider, HostConfig, HostNotFound, InvalidHost, RecordType, compile_config
 
 class TestModels(unittest.TestCase):
     
@@ -27,6 +27,42 @@ class TestModels(unittest.TestCase):
         self.assertRaises(NotImplementedError, dns.update, 'abc', 'def')
 
 
+    def testCompileConfig(self):
+        config = compile_config({ 'abc': {
+            'route_53_region': 'region',
+            'route_53_zone_id': 'zone-id',
+            'route_53_record_ttl': 300.0,
+            'route_53_record_type': 'AAAA',
+            'shared_secret': 'shared-secret'
+        }})
+
+        host: HostConfig = config['abc']
+        self.assertEqual(host.hostname, 'abc')
+        self.assertEqual(host.route_53_record_ttl, 300)
+        self.assertEqual(host.route_53_record_type, RecordType.AAAA)
+        with self.assertRaises(AttributeError):
+            host.unknown = 'value'
+
+        self.assertRaises(ValueError, compile_config, [])
+        self.assertRaises(ValueError, compile_config, { 'abc': 'def' })
+
+
+    def testCompileConfigLenient(self):
+        valid = { 'route_53_region': 'region', 'route_53_zone_id': 'zone-id', 'route_53_record_ttl': 300, 'route_53_record_type': 'A', 'shared_secret': 'shared-secret' }
+
+        with self.assertLogs('dynamicdns.models', level='WARNING') as logs:
+            config = compile_config({ 'abc': valid, 'def': dict(valid, route_53_record_ttl='300s') }, lenient=True)
+
+        self.assertEqual(list(config), [ 'abc' ])
+        self.assertEqual(config.host('abc').shared_secret, 'shared-secret')
+        self.assertEqual(config.errors, { 'def': "Configuration for hostname 'def' has an invalid route_53_record_ttl." })
+        self.assertRaises(InvalidHost, config.host, 'def')
+        self.assertRaises(HostNotFound, config.host, 'ghi')
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("has an invalid route_53_record_ttl", logs.output[0])
+        self.assertRaises(ValueError, compile_config, { 'abc': valid, 'def': 'ghi' })
+
+
 if __name__ == '__main__':
     unittest.main()
 
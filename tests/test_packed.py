@@ -0,0 +1,111 @@
+import os
+import tempfile
+import unittest
+
+from unittest.mock import patch
+
+from dynamicdns import packed
+from dynamicdns.models import Error, HostNotFound, RecordType
+
+
+CONFIG = { 'host' + str(i) + '.example.com': {
+    'route_53_region': 'region',
+    'route_53_zone_id': 'zone-id',
+    'route_53_record_ttl': i,
+    'route_53_record_type': 'AAAA' if i % 2 else 'A',
+    'shared_secret': 'secret-' + str(i)
+} for i in range(100) }
+
+
+class TestPacked(unittest.TestCase):
+
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'config.packed')
+        packed.write(CONFIG, self.path)
+
+
+    def tearDown(self):
+        packed.files.pop(self.path, None)
+        self.directory.cleanup()
+
+
+    def testLookup(self):
+        config = packed.PackedConfig(self.path)
+
+        self.assertEqual(len(config), 100)
+        self.assertEqual(config.slots, 256)
+        for hostname, attrs in CONFIG.items():
+            host = config.get(hostname)
+            self.assertEqual(host.hostname, hostname)
+            self.assertEqual(host.route_53_region, 'region')
+            self.assertEqual(host.route_53_zone_id, 'zone-id')
+            self.assertEqual(host.route_53_record_ttl, attrs['route_53_record_ttl'])
+            self.assertEqual(host.route_53_record_type, RecordType(attrs['route_53_record_type']))
+            self.assertEqual(host.shared_secret, attrs['shared_secret'])
+        self.assertIsNone(config.get('unknown.example.com'))
+
+
+    def testCollisions(self):
+        # Every hostname lands in slot 0 and is found by probing
+        with patch('zlib.crc32', return_value=0):
+            packed.write(CONFIG, self.path)
+            config = packed.PackedConfig(self.path)
+
+            self.assertEqual(config.get('host42.example.com').shared_secret, 'secret-42')
+            self.assertIsNone(config.get('unknown.example.com'))
+
+
+    def testEmpty(self):
+        packed.write({}, self.path)
+
+        config = packed.PackedConfig(self.path)
+        self.assertEqual(len(config), 0)
+        self.assertIsNone(config.get('host1.example.com'))
+
+
+    def testInvalid(self):
+        with self.assertRaises(ValueError):
+            packed.pack({ 'host.example.com': { 'shared_secret': 'secret' } })
+        with self.assertRaises(ValueError):
+            packed.pack({ 'host.example.com': dict(CONFIG['host1.example.com'], route_53_region='r' * 256) })
+
+        with open(self.path, 'wb') as file:
+            file.write(b'{"host.example.com": {}}')
+        with self.assertRaises(ValueError):
+            packed.PackedConfig(self.path)
+
+
+    def testProvider(self):
+        config = packed.factory(self.path)
+
+        self.assertIsNone(config.cached('host1.example.com'))
+        self.assertIsNone(config.load())
+        self.assertEqual(config.shared_secret('host1.example.com'), 'secret-1')
+        self.assertEqual(config.host('host2.example.com').route_53_record_type, RecordType.A)
+        self.assertEqual(config.cached('host3.example.com').shared_secret, 'secret-3')
+        with self.assertRaises(HostNotFound):
+            config.host('unknown.example.com')
+
+
+    def testProviderMissing(self):
+        config = packed.factory(os.path.join(self.directory.name, 'missing.packed'))
+
+        self.assertTrue(isinstance(config.load(), Error))
+        with self.assertRaises(HostNotFound):
+            config.host('host1.example.com')
+
+
+    def testMapping(self):
+        config = packed.mapping(self.path)
+        self.assertIs(packed.mapping(self.path), config)
+
+        packed.write({ 'host1.example.com': dict(CONFIG['host1.example.com'], shared_secret='rotated') }, self.path)
+
+        self.assertEqual(config.get('host1.example.com').shared_secret, 'secret-1')
+        self.assertEqual(packed.mapping(self.path).get('host1.example.com').shared_secret, 'rotated')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,7 @@
 import unittest
 
+from unittest.mock import MagicMock
+
 import dynamicdns
 
 from dynamicdns.aws import (s3config, route53)
@@ -7,13 +9,33 @@ from dynamicdns.aws import (s3config, route53)
 from dynamicdns.aws.s3config import S3ConfigProvider
 from dynamicdns.aws.route53 import Route53Provider
 
-from dynamicdns.models import Error
+from dynamicdns.models import Error, Deferred, InvalidHost
 
+from dynamicdns import signing
+from dynamicdns.fastpath import KnownAddresses, Tokens
+from dynamicdns.signing import NonceFilter
 from dynamicdns.processor import Processor
+from dynamicdns.queues import LocalQueue
+from dynamicdns.memory import MemoryConfigProvider, MemoryDNSProvider
 
 from unittest.mock import MagicMock
 
 import hashlib
+import hmac
+import threading
+import time
+
+from unittest.mock import patch
+
+
+CONFIG = { 'host.domain.com': {
+    'route_53_region': 'region',
+    'route_53_zone_id': 'zone-id',
+    'route_53_record_ttl': 300,
+    'route_53_record_type': 'A',
+    'shared_secret': 'shared-secret'
+}}
+
 
 class TestProcessor(unittest.TestCase):
     
@@ -45,6 +67,23 @@ class TestProcessor(unittest.TestCase):
         self.assertEqual(str(result), "You must pass a valid sha256 hash in the hash= querystring parameter.")
 
 
+    def testCheckhashTrailingCharacters(self):
+        self.__setUpMocks(None, None)
+        timestamp = str(int(time.time()))
+
+        for validationhash in [ "a" * 64 + "\u00e9", "a" * 64 + "\n", "a" * 65 ]:
+            self.assertEqual(str(self.processor.checkhash("host.domain.com", validationhash, "1.1.1.1", "1234567890")), "You must pass a valid sha256 hash in the hash= querystring parameter.")
+            self.assertEqual(str(self.processor.checkhash("host.domain.com", validationhash, "1.1.1.1", "1234567890", timestamp, "nonce-0001")), "You must pass a valid sha256 hash in the hash= querystring parameter.")
+
+
+    def testCheckhashUppercase(self):
+        self.__setUpMocks(None, None)
+
+        validationhash = "f5f9b9b2f166aa50e3bba3200857ed9fbfc1feccdc7ac2fce9796e55cba82cda".upper()
+
+        self.assertIsNone(self.processor.checkhash("host.domain.com", validationhash, "1.1.1.1", "1234567890"))
+
+
     def testCheckhashWrongValidation(self):
         self.__setUpMocks(None, None)
 
@@ -59,6 +98,125 @@ class TestProcessor(unittest.TestCase):
         self.assertEqual(str(result), "Validation of hashes failed.")
 
 
+    def testCheckhashSigned(self):
+        self.__setUpMocks(None, None)
+
+        timestamp = str(int(time.time()))
+        validationhash = hmac.new(b"1234567890", ("1.1.1.1\nhost.domain.com\n" + timestamp + "\nnonce-0001").encode('utf-8'), hashlib.sha256).hexdigest()
+
+        result = self.processor.checkhash("host.domain.com", validationhash, "2.2.2.2", "1234567890", timestamp, "nonce-0001")
+        self.assertEqual(str(result), "Validation of hashes failed.")
+
+        self.assertIsNone(self.processor.checkreplay("host.domain.com", timestamp, "nonce-0001"))
+        self.assertIsNone(self.processor.checkhash("host.domain.com", validationhash.upper(), "1.1.1.1", "1234567890", timestamp, "nonce-0001"))
+
+
+    def testCheckhashSignedHost(self):
+        self.__setUpMocks(None, None)
+        self.nonces.single_process = True
+
+        timestamp = str(int(time.time()))
+        validationhash = hmac.new(b"1234567890", ("host.domain.com\n" + timestamp + "\nnonce-0001").encode('utf-8'), hashlib.sha256).hexdigest()
+        sourcebound = signing.sign("1234567890", "1.1.1.1", "host.domain.com", timestamp, "nonce-0001")
+
+        self.assertEqual(str(self.processor.checkhash("host.domain.com", sourcebound, "1.1.1.1", "1234567890", timestamp, "nonce-0001", 'host')), "Validation of hashes failed.")
+        self.assertEqual(str(self.processor.checkhash("host.domain.com", validationhash, "1.1.1.1", "1234567890", timestamp, "nonce-0001")), "Validation of hashes failed.")
+        self.assertIsNone(self.processor.checkhash("host.domain.com", validationhash, "2.2.2.2", "1234567890", timestamp, "nonce-0001", 'host'))
+        self.assertEqual(str(self.processor.checkhash("host.domain.com", validationhash, "3.3.3.3", "1234567890", timestamp, "nonce-0001", 'host')), "The request has been replayed.")
+
+
+    def testCheckhashSignedHostWithoutTimestamp(self):
+        self.__setUpMocks(None, None)
+        self.nonces.single_process = True
+
+        validationhash = signing.legacy("1234567890", "1.1.1.1", "host.domain.com")
+
+        self.assertEqual(str(self.processor.checkhash("host.domain.com", validationhash, "1.1.1.1", "1234567890", None, None, 'host')), "You have to pass 'timestamp' querystring parameters.")
+
+
+    def testCheckhashSignedHostUnsharedNonces(self):
+        self.__setUpMocks(None, None)
+
+        timestamp = str(int(time.time()))
+        validationhash = signing.sign("1234567890", None, "host.domain.com", timestamp, "nonce-0001")
+
+        self.assertEqual(str(self.processor.checkhash("host.domain.com", validationhash, "1.1.1.1", "1234567890", timestamp, "nonce-0001", 'host')), "This server does not accept sign=host, sign with the source IP instead.")
+        self.assertFalse(self.nonces.seen("host.domain.com\nnonce-0001"))
+
+
+    def testCheckhashSignedInternalIp(self):
+        self.__setUpMocks(None, None)
+
+        timestamp = str(int(time.time()))
+        validationhash = signing.sign("1234567890", "1.1.1.1", "host.domain.com", timestamp, "nonce-0001", "10.0.0.1")
+
+        self.assertEqual(str(self.processor.checkhash("host.domain.com", validationhash, "1.1.1.1", "1234567890", timestamp, "nonce-0001")), "Validation of hashes failed.")
+        self.assertEqual(str(self.processor.checkhash("host.domain.com", validationhash, "1.1.1.1", "1234567890", timestamp, "nonce-0001", 'sourceip', "10.0.0.2")), "Validation of hashes failed.")
+        self.assertIsNone(self.processor.checkhash("host.domain.com", validationhash, "1.1.1.1", "1234567890", timestamp, "nonce-0001", 'sourceip', "10.0.0.1"))
+
+
+    def testCheckhashSignedDualStack(self):
+        self.__setUpMocks(None, None)
+
+        timestamp = str(int(time.time()))
+        validationhash = signing.sign("1234567890", "1.1.1.1", "host.domain.com", timestamp, "nonce-0001", "", None, "2001:db8::1")
+
+        self.assertEqual(str(self.processor.checkhash("host.domain.com", validationhash, "1.1.1.1", "1234567890", timestamp, "nonce-0001")), "Validation of hashes failed.")
+        self.assertEqual(str(self.processor.checkhash("host.domain.com", validationhash, "1.1.1.1", "1234567890", timestamp, "nonce-0001", 'sourceip', "", None, "2001:db8::2")), "Validation of hashes failed.")
+        self.assertIsNone(self.processor.checkhash("host.domain.com", validationhash, "1.1.1.1", "1234567890", timestamp, "nonce-0001", 'sourceip', "", None, "2001:db8::1"))
+
+
+    def testCheckhashNonceStoreFailed(self):
+        self.__setUpMocks(None, None)
+        self.processor.nonces = MagicMock()
+        self.processor.nonces.seen = MagicMock(return_value = False)
+        self.processor.nonces.add = MagicMock(side_effect = Exception("Unavailable"))
+
+        timestamp = str(int(time.time()))
+        validationhash = signing.sign("1234567890", "1.1.1.1", "host.domain.com", timestamp, "nonce-0001")
+
+        self.assertEqual(str(self.processor.checkhash("host.domain.com", validationhash, "1.1.1.1", "1234567890", timestamp, "nonce-0001")), "Nonce could not be recorded. Exception: Unavailable")
+
+
+    def testCheckhashSignedTimestamp(self):
+        self.__setUpMocks(None, None)
+
+        for timestamp in [ str(int(time.time()) - 301), str(int(time.time()) + 301), "abc", "-1", "" ]:
+            validationhash = signing.sign("1234567890", "1.1.1.1", "host.domain.com", timestamp, "nonce-0001")
+
+            result = self.processor.checkhash("host.domain.com", validationhash, "1.1.1.1", "1234567890", timestamp, "nonce-0001")
+
+            self.assertEqual(str(result), "You must pass the current unix time in the timestamp= querystring parameter.")
+            self.assertEqual(str(self.processor.checkreplay("host.domain.com", timestamp, "nonce-0001")), str(result))
+
+
+    def testCheckhashReplayed(self):
+        self.__setUpMocks(None, None)
+
+        timestamp = str(int(time.time()))
+        validationhash = signing.sign("1234567890", "1.1.1.1", "host.domain.com", timestamp, "nonce-0001")
+
+        self.assertIsNone(self.processor.checkhash("host.domain.com", validationhash, "1.1.1.1", "1234567890", timestamp, "nonce-0001"))
+
+        self.assertEqual(str(self.processor.checkreplay("host.domain.com", timestamp, "nonce-0001")), "The request has been replayed.")
+        self.assertEqual(str(self.processor.checkhash("host.domain.com", validationhash, "1.1.1.1", "1234567890", timestamp, "nonce-0001")), "The request has been replayed.")
+        self.assertIsNone(self.processor.checkreplay("other.domain.com", timestamp, "nonce-0001"))
+        self.assertIsNone(self.processor.checkreplay("host.domain.com", None, None))
+
+        for nonce in [ None, "short", "not a nonce!" ]:
+            result = self.processor.checkreplay("host.domain.com", timestamp, nonce)
+            self.assertEqual(str(result), "You must pass 8 to 64 random letters, digits, '-' or '_' in the nonce= querystring parameter.")
+
+
+    def testCheckhashLegacyDisabled(self):
+        self.__setUpMocks(None, None)
+
+        with patch.object(signing, 'LEGACY', False):
+            result = self.processor.checkhash("host.domain.com", "f5f9b9b2f166aa50e3bba3200857ed9fbfc1feccdc7ac2fce9796e55cba82cda", "1.1.1.1", "1234567890")
+
+        self.assertEqual(str(result), "You have to pass 'timestamp' querystring parameters.")
+
+
     def testUpdateCurrentEqualsUpdate(self):
         self.__setUpMocks("1.1.1.1", None)
 
@@ -121,12 +279,259 @@ class TestProcessor(unittest.TestCase):
         self.assertEqual(str(result), "Your hostname record 'host.domain.com' has been updated from '2.2.2.2' to '3.3.3.3'.")
 
 
-    def __setUpMocks(self, readReturnValue, updateReturnValue):
+    def testUpdateBatch(self):
+        self.__setUpMocks(None, None)
+        self.processor.dns.read = MagicMock(side_effect=lambda hostname: { 'a': '1.1.1.1', 'b': '2.2.2.2', 'c': Error("Read failed") }[hostname])
+        self.processor.dns.update_batch = MagicMock(side_effect=lambda updates: updates)
+
+        result = self.processor.update_batch([('a', '1.1.1.1', ''), ('b', '1.1.1.1', ''), ('c', '1.1.1.1', ''), ('b', '1.1.1.1', '3.3.3.3')])
+
+        self.processor.dns.update_batch.assert_called_once_with({ 'b': '3.3.3.3' })
+        self.assertEqual(result['a'], "Your IP '1.1.1.1' address matches the current DNS record for 'a'.")
+        self.assertEqual(result['b'], "Your hostname record 'b' has been updated from '2.2.2.2' to '3.3.3.3'.")
+        self.assertEqual(str(result['c']), "Read failed")
+
+
+    def testUpdateBatchWriteFailed(self):
+        self.__setUpMocks("2.2.2.2", None)
+        self.processor.dns.update_batch = MagicMock(return_value={ 'a': Error("Write failed") })
+
+        result = self.processor.update_batch([('a', '1.1.1.1', '')])
+
+        self.assertEqual(str(result['a']), "Write failed")
+
+
+    def testUpdateDeferred(self):
+        self.__setUpMocks("2.2.2.2", Deferred("1.1.1.1"))
+
+        result = self.processor.update("host.domain.com", "1.1.1.1", "")
+
+        self.assertEqual(result, "Your hostname record 'host.domain.com' update from '2.2.2.2' to '1.1.1.1' has been deferred, it has been written recently.")
+
+
+    def testUpdateAsync(self):
+        self.__setUpMocks("2.2.2.2", None)
+        self.processor.queue = LocalQueue()
+
+        result = self.processor.update("host.domain.com", "1.1.1.1", "")
+
+        self.assertEqual(result, "Your hostname record 'host.domain.com' update from '2.2.2.2' to '1.1.1.1' has been accepted.")
+        self.processor.dns.update.assert_not_called()
+        messages = self.processor.queue.receive(10)
+        self.assertEqual(messages[0][1]['hostname'], "host.domain.com")
+        self.assertEqual(messages[0][1]['ip'], "1.1.1.1")
+
+
+    def testUpdateAsyncUnchanged(self):
+        self.__setUpMocks("1.1.1.1", None)
+        self.processor.queue = LocalQueue()
+
+        result = self.processor.update("host.domain.com", "1.1.1.1", "")
+
+        self.assertEqual(result, "Your IP '1.1.1.1' address matches the current DNS record for 'host.domain.com'.")
+        self.assertEqual(self.processor.queue.receive(10), [])
+
+
+    def testUpdateAsyncQueueFailed(self):
+        self.__setUpMocks("2.2.2.2", None)
+        self.processor.queue = LocalQueue()
+        self.processor.queue.send = MagicMock(side_effect=Exception("SendException"))
+
+        result = self.processor.update("host.domain.com", "1.1.1.1", "")
+
+        self.assertTrue(isinstance(result, Error))
+        self.assertEqual(str(result), "Queueing of DNS update failed. Exception: SendException")
+
+
+    def testUpdateBatchAsync(self):
+        self.__setUpMocks("2.2.2.2", None)
+        self.processor.queue = LocalQueue()
+        self.processor.dns.update_batch = MagicMock()
+
+        result = self.processor.update_batch([('a', '1.1.1.1', ''), ('b', '2.2.2.2', '')])
+
+        self.assertEqual(result['a'], "Your hostname record 'a' update from '2.2.2.2' to '1.1.1.1' has been accepted.")
+        self.processor.dns.update_batch.assert_not_called()
+        self.assertEqual(len(self.processor.queue.receive(10)), 1)
+
+
+    def testFlushCoalesces(self):
+        self.__setUpMocks(None, None)
+        self.processor.dns.update_batch = MagicMock(side_effect=lambda updates: updates)
+
+        result = self.processor.flush([
+            { 'hostname': 'a', 'ip': '3.3.3.3', 'timestamp': 3 },
+            { 'hostname': 'a', 'ip': '1.1.1.1', 'timestamp': 1 },
+            { 'hostname': 'b', 'ip': '2.2.2.2', 'timestamp': 2 }
+        ])
+
+        self.assertEqual(result, { 'a': '3.3.3.3', 'b': '2.2.2.2' })
+
+
+    def testDrain(self):
+        self.__setUpMocks(None, None)
+        self.processor.queue = LocalQueue()
+        self.processor.dns.update_batch = MagicMock(return_value={ 'a': '3.3.3.3', 'b': Error("Update failed") })
+        self.processor.queue.send({ 'hostname': 'a', 'ip': '1.1.1.1', 'timestamp': 1 })
+        self.processor.queue.send({ 'hostname': 'b', 'ip': '2.2.2.2', 'timestamp': 2 })
+        self.processor.queue.send({ 'hostname': 'a', 'ip': '3.3.3.3', 'timestamp': 3 })
+        self.processor.queue.send({ 'hostname': 'c', 'ip': '4.4.4.4' })
+
+        result = self.processor.drain(10)
+
+        self.processor.dns.update_batch.assert_called_once_with({ 'a': '3.3.3.3', 'b': '2.2.2.2' })
+        self.assertEqual(result['a'], '3.3.3.3')
+        self.assertEqual(self.processor.queue.inflight, {})
+        self.assertEqual([ update for _, update in self.processor.queue.receive(10) ], [ { 'hostname': 'b', 'ip': '2.2.2.2', 'timestamp': 2 } ])
+        self.assertEqual(self.processor.drain(10), {})
+
+
+    def testUnchanged(self):
+        self.__setUpMocks("1.1.1.1", None, live=True)
+
+        self.assertIsNone(self.processor.token("host.domain.com", "1.1.1.1", ""))
+        self.processor.update("host.domain.com", "1.1.1.1", "")
+        token = self.processor.token("host.domain.com", "1.1.1.1", "")
+
+        self.__setUpMocks(None, None)
+        result = self.processor.unchanged("host.domain.com", "1.1.1.1", "", "1.1.1.1", token)
+
+        self.assertEqual(result, "Your IP '1.1.1.1' address matches the current DNS record for 'host.domain.com'.")
+        self.processor.dns.read.assert_not_called()
+        self.assertIsNone(self.processor.unchanged("host.domain.com", "2.2.2.2", "", "1.1.1.1", token))
+        self.assertIsNone(self.processor.unchanged("host.domain.com", "1.1.1.1", "", "1.1.1.1", "1." + "0" * 64))
+        self.assertEqual(self.processor.unchanged("host.domain.com", "1.1.1.1", "", None, token), result)
+        self.assertIsNone(self.processor.unchanged("host.domain.com", "2.2.2.2", "", None, token))
+
+
+    def testUnchangedOtherAddressKnown(self):
+        self.__setUpMocks("1.1.1.1", None, live=True)
+        self.processor.update("host.domain.com", "1.1.1.1", "")
+        token = self.processor.token("host.domain.com", "1.1.1.1", "")
+
+        self.__setUpMocks("1.1.1.1", "3.3.3.3")
+        self.processor.update("host.domain.com", "1.1.1.1", "3.3.3.3")
+
+        self.assertIsNone(self.processor.unchanged("host.domain.com", "1.1.1.1", "", "1.1.1.1", token))
+        self.assertIsNotNone(self.processor.token("host.domain.com", "1.1.1.1", "3.3.3.3"))
+
+
+    def testUnchangedSnapshotRead(self):
+        self.__setUpMocks("1.1.1.1", None, live=False)
+
+        self.assertEqual(self.processor.update("host.domain.com", "1.1.1.1", ""), "Your IP '1.1.1.1' address matches the current DNS record for 'host.domain.com'.")
+        self.assertIsNone(self.processor.token("host.domain.com", "1.1.1.1", ""))
+        self.processor.update_batch([ ("host.domain.com", "1.1.1.1", "") ])
+        self.assertIsNone(self.processor.token("host.domain.com", "1.1.1.1", ""))
+
+        self.__setUpMocks("1.1.1.1", "2.2.2.2", live=False)
+        self.processor.update("host.domain.com", "2.2.2.2", "")
+        self.assertIsNotNone(self.processor.token("host.domain.com", "2.2.2.2", ""))
+
+
+    def testDualstack(self):
+        self.__setUpMocks(None, None)
+
+        self.assertEqual(self.processor.dualstack("1.1.1.1", "", None, "::1"), { 'A': '1.1.1.1', 'AAAA': '::1' })
+        self.assertEqual(self.processor.dualstack("::1", "", "1.1.1.1", None), { 'AAAA': '::1', 'A': '1.1.1.1' })
+        self.assertEqual(self.processor.dualstack("1.1.1.1", "::2", "3.3.3.3", None), { 'AAAA': '::2', 'A': '3.3.3.3' })
+        self.assertEqual(str(self.processor.dualstack("1.1.1.1", "", None, "1.1.1.1")), "You must pass an IPv6 address in the ipv6= querystring parameter.")
+        self.assertEqual(str(self.processor.dualstack("1.1.1.1", "", "abc", None)), "You must pass an IPv4 address in the ipv4= querystring parameter.")
+        self.assertEqual(str(self.processor.dualstack("1.1.1.1", "abc", None, "::1")), "You must pass a valid IP address in the internalip= querystring parameter.")
+
+
+    def testUpdateRecords(self):
+        self.__setUpMocks(None, None)
+        self.processor.dns.read_records = MagicMock(return_value={ 'A': '1.1.1.1', 'AAAA': '' })
+        self.processor.dns.update_records = MagicMock(side_effect=lambda hostname, records: records)
+
+        result = self.processor.update_records("host.domain.com", { 'A': '1.1.1.1', 'AAAA': '::1' })
+
+        self.assertEqual(result, "Your hostname records 'host.domain.com' have been updated, AAAA from '' to '::1'.")
+        self.processor.dns.read_records.assert_called_once_with("host.domain.com", [ 'A', 'AAAA' ])
+        self.processor.dns.update_records.assert_called_once_with("host.domain.com", { 'AAAA': '::1' })
+
+
+    def testUpdateRecordsUnchanged(self):
+        self.__setUpMocks(None, None)
+        self.processor.dns.read_records = MagicMock(return_value={ 'A': '1.1.1.1', 'AAAA': '::1' })
+        self.processor.dns.update_records = MagicMock()
+
+        result = self.processor.update_records("host.domain.com", { 'A': '1.1.1.1', 'AAAA': '::1' })
+
+        self.assertEqual(result, "Your IP addresses '1.1.1.1' and '::1' match the current DNS records for 'host.domain.com'.")
+        self.processor.dns.update_records.assert_not_called()
+
+
+    def testUpdateRecordsReadFailed(self):
+        self.__setUpMocks(None, None)
+        self.processor.dns.read_records = MagicMock(return_value=Error("Read failed"))
+
+        result = self.processor.update_records("host.domain.com", { 'A': '1.1.1.1', 'AAAA': '::1' })
+
+        self.assertEqual(str(result), "Read failed")
+
+
+    def testFetchOverlapped(self):
+        config = MemoryConfigProvider(CONFIG)
+        config.load()
+        barrier = threading.Barrier(2, timeout=5)
+        load = config.load
+        config.load = lambda: (barrier.wait(), load())[1]
+        dns = MemoryDNSProvider({ 'host.domain.com': '1.1.1.1' })
+        read = dns.read
+        dns.read = lambda hostname: (barrier.wait(), read(hostname))[1]
+
+        self.assertEqual(Processor(dns).fetch(config, 'host.domain.com'), (None, '1.1.1.1'))
+
+
+    def testFetchCold(self):
+        config = MemoryConfigProvider(CONFIG)
+        dns = MemoryDNSProvider({ 'host.domain.com': '1.1.1.1' })
+        dns.read = MagicMock()
+
+        self.assertEqual(Processor(dns).fetch(config, 'host.domain.com'), (None, None))
+        dns.read.assert_not_called()
+
+        config = MemoryConfigProvider({ 'host.domain.com': { 'shared_secret': 'secret' } })
+        self.assertEqual(Processor(dns).fetch(config, 'host.domain.com'), (None, None))
+        self.assertRaises(InvalidHost, config.host, 'host.domain.com')
+
+
+    def testFetchMovedZone(self):
+        config = MemoryConfigProvider(CONFIG)
+        config.load()
+        moved = MemoryConfigProvider({ 'host.domain.com': dict(CONFIG['host.domain.com'], route_53_zone_id='other-zone') })
+        moved.load()
+        config.load = lambda: setattr(config, 'config', moved.config)
+        dns = MemoryDNSProvider({ 'host.domain.com': '1.1.1.1' })
+
+        self.assertEqual(Processor(dns).fetch(config, 'host.domain.com'), (None, None))
+
+
+    def testUpdateFetched(self):
+        self.__setUpMocks("1.1.1.1", "2.2.2.2")
+
+        result = self.processor.update("host.domain.com", "2.2.2.2", "", "2.2.2.2")
+
+        self.assertEqual(result, "Your IP '2.2.2.2' address matches the current DNS record for 'host.domain.com'.")
+        self.processor.dns.read.assert_not_called()
+        self.assertTrue(isinstance(self.processor.update("host.domain.com", "2.2.2.2", "", Error("Read failed")), Error))
+
+
+    def __setUpMocks(self, readReturnValue, updateReturnValue, live=None):
         dns = route53.factory(None, None)
         dns.read = MagicMock(return_value=readReturnValue)
         dns.update = MagicMock(return_value=updateReturnValue)
+        if live is not None:
+            dns.live = MagicMock(return_value=live)
         
-        self.processor = dynamicdns.processor.factory(dns)
+        if not hasattr(self, 'known'):
+            self.known = KnownAddresses(60, 100)
+            self.tokens = Tokens(b'secret', 60)
+            self.nonces = NonceFilter(600, 1000, 0.001)
+
+        self.processor = Processor(dns, None, self.known, self.tokens, self.nonces)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,39 @@
+import tempfile
+import unittest
+
+from dynamicdns import queues
+
+from dynamicdns.queues import LocalQueue, FileQueue
+
+
+class TestQueues(unittest.TestCase):
+
+
+    def testLocalQueue(self):
+        self.__testQueue(queues.factory())
+
+
+    def testFileQueue(self):
+        with tempfile.TemporaryDirectory() as directory:
+            queue = queues.factory(directory)
+            self.assertTrue(isinstance(queue, FileQueue))
+            self.__testQueue(queue)
+            self.assertEqual(queue.receive(10), [])
+
+
+    def __testQueue(self, queue):
+        queue.send({ 'hostname': 'a', 'ip': '1.1.1.1', 'timestamp': 1 })
+        queue.send({ 'hostname': 'b', 'ip': '2.2.2.2', 'timestamp': 2 })
+        queue.send({ 'hostname': 'a', 'ip': '3.3.3.3', 'timestamp': 3 })
+
+        messages = queue.receive(2)
+        self.assertEqual([ update['timestamp'] for _, update in messages ], [1, 2])
+        queue.delete([ receipt for receipt, _ in messages ])
+
+        messages = queue.receive(10)
+        self.assertEqual([ update['ip'] for _, update in messages ], ['3.3.3.3'])
+        queue.delete([ receipt for receipt, _ in messages ])
+
+
+if __name__ == '__main__':
+    unittest.main()
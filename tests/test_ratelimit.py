@@ -0,0 +1,90 @@
+import unittest
+
+from unittest.mock import MagicMock, patch
+
+from dynamicdns import ratelimit
+
+from dynamicdns.models import Error
+from dynamicdns.ratelimit import MemoryBucketStore, RateLimiter
+
+
+class TestMemoryBucketStore(unittest.TestCase):
+
+
+    def testTakeAndRefill(self):
+        store = MemoryBucketStore(10)
+
+        with patch('time.monotonic', return_value=100):
+            self.assertEqual(store.take('a', 0.5, 2), 0)
+            self.assertEqual(store.take('a', 0.5, 2), 0)
+            self.assertEqual(store.take('a', 0.5, 2), 2)
+            self.assertEqual(store.take('b', 0.5, 2), 0)
+        with patch('time.monotonic', return_value=102):
+            self.assertEqual(store.take('a', 0.5, 2), 0)
+        with patch('time.monotonic', return_value=1000):
+            self.assertEqual(store.take('a', 0.5, 2), 0)
+            self.assertEqual(store.take('a', 0.5, 2), 0)
+            self.assertGreater(store.take('a', 0.5, 2), 0)
+
+
+    def testLeastRecentlyUsedDropped(self):
+        store = MemoryBucketStore(2)
+
+        store.take('a', 1, 5)
+        store.take('b', 1, 5)
+        store.take('a', 1, 5)
+        store.take('c', 1, 5)
+
+        self.assertEqual(list(store.buckets), [ 'a', 'c' ])
+
+
+class TestRateLimiter(unittest.TestCase):
+
+
+    def testCheck(self):
+        limiter = RateLimiter(MemoryBucketStore(10), { 'host': (0.1, 1), 'source': (1, 2) })
+
+        self.assertIsNone(limiter.check('a', '1.1.1.1'))
+
+        result = limiter.check('a', '1.1.1.1')
+        self.assertTrue(isinstance(result, Error))
+        self.assertEqual(str(result), "Too many requests for hostname 'a', retry in 10 seconds.")
+
+        result = limiter.check('b', '1.1.1.1')
+        self.assertEqual(str(result), "Too many requests for source IP '1.1.1.1', retry in 1 seconds.")
+
+
+    def testCheckSourceAndHost(self):
+        limiter = RateLimiter(MemoryBucketStore(10), { 'host': (0.1, 1), 'source': (1, 1) })
+
+        self.assertIsNone(limiter.check_source('1.1.1.1'))
+        self.assertEqual(str(limiter.check_source('1.1.1.1')), "Too many requests for source IP '1.1.1.1', retry in 1 seconds.")
+        self.assertIsNone(limiter.check_host('a'))
+        self.assertIsNone(limiter.check_host('b'))
+        self.assertEqual(str(limiter.check_host('a')), "Too many requests for hostname 'a', retry in 10 seconds.")
+
+
+    def testDisabled(self):
+        store = MemoryBucketStore(10)
+        store.take = MagicMock()
+
+        self.assertIsNone(RateLimiter(store, { 'host': (0, 1), 'source': (0, 1) }).check('a', '1.1.1.1'))
+        store.take.assert_not_called()
+
+
+    def testStoreFailure(self):
+        store = MemoryBucketStore(10)
+        store.take = MagicMock(side_effect=Exception("StoreException"))
+
+        self.assertIsNone(RateLimiter(store, { 'host': (1, 1), 'source': (1, 1) }).check('a', '1.1.1.1'))
+
+
+    def testLimits(self):
+        with patch.dict('os.environ', { 'RATE_LIMIT_HOST_RATE': '0.2', 'RATE_LIMIT_HOST_BURST': '5' }, clear=True):
+            limits = ratelimit.limits()
+
+        self.assertEqual(limits, { 'host': (0.2, 5), 'source': (0, 30) })
+
+
+if __name__ == '__main__':
+    unittest.main()
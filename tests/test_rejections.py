@@ -0,0 +1,66 @@
+import unittest
+
+from unittest.mock import patch
+
+from dynamicdns.models import Error
+from dynamicdns.rejections import RejectionCache
+
+
+class TestRejectionCache(unittest.TestCase):
+
+
+    def testRejectHost(self):
+        cache = RejectionCache(30, 10)
+
+        cache.reject_host('a', Error("Unknown"))
+
+        self.assertEqual(str(cache.get('a', '1.1.1.1', 'hash')), "Unknown")
+        self.assertEqual(str(cache.get('a', '2.2.2.2', None)), "Unknown")
+        self.assertIsNone(cache.get('b', '1.1.1.1', 'hash'))
+        self.assertEqual(cache.stats(), { 'hits': 2, 'hosts': 1, 'hashes': 0 })
+
+
+    def testRejectHash(self):
+        cache = RejectionCache(30, 10)
+
+        cache.reject_hash('a', '1.1.1.1', 'hash', Error("Validation of hashes failed."))
+
+        self.assertEqual(str(cache.get('a', '1.1.1.1', 'hash')), "Validation of hashes failed.")
+        self.assertIsNone(cache.get('a', '2.2.2.2', 'hash'))
+        self.assertIsNone(cache.get('a', '1.1.1.1', 'other'))
+        self.assertEqual(cache.stats(), { 'hits': 1, 'hosts': 0, 'hashes': 1 })
+
+
+    def testExpiry(self):
+        cache = RejectionCache(30, 10)
+
+        with patch('time.monotonic', return_value=100):
+            cache.reject_host('a', Error("Unknown"))
+        with patch('time.monotonic', return_value=129):
+            self.assertIsNotNone(cache.get('a', '1.1.1.1', None))
+        with patch('time.monotonic', return_value=130):
+            self.assertIsNone(cache.get('a', '1.1.1.1', None))
+
+
+    def testLeastRecentlyUsedEvicted(self):
+        cache = RejectionCache(30, 2)
+
+        cache.reject_host('a', Error("Unknown"))
+        cache.reject_host('b', Error("Unknown"))
+        cache.get('a', '1.1.1.1', None)
+        cache.reject_host('c', Error("Unknown"))
+
+        self.assertIsNotNone(cache.get('a', '1.1.1.1', None))
+        self.assertIsNone(cache.get('b', '1.1.1.1', None))
+
+
+    def testDisabled(self):
+        cache = RejectionCache(0, 10)
+
+        cache.reject_host('a', Error("Unknown"))
+
+        self.assertIsNone(cache.get('a', '1.1.1.1', None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import unittest
+
+from unittest.mock import patch
+
+import dynamicdns.backend
+
+from dynamicdns import server
+from dynamicdns.debounce import Debouncer, DebouncedDNSProvider
+from dynamicdns.memory import MemoryConfigProvider, MemoryDNSProvider
+
+
+class TestServer(unittest.TestCase):
+
+
+    def testEvent(self):
+        event = server.event('POST', '/dynamicdns-v1/dns?raw&hostname=abc&hash=xyz', { 'host': 'localhost' }, '1.1.1.1')
+
+        self.assertEqual(event['resource'], '/dns')
+        self.assertEqual(event['httpMethod'], 'POST')
+        self.assertEqual(event['queryStringParameters'], { 'raw': '', 'hostname': 'abc', 'hash': 'xyz' })
+        self.assertEqual(event['requestContext']['identity']['sourceIp'], '1.1.1.1')
+
+        event = server.event('GET', '/myip/', {}, '1.1.1.1')
+
+        self.assertEqual(event['resource'], '/myip')
+        self.assertIsNone(event['queryStringParameters'])
+
+
+    def testEventForwarded(self):
+        headers = { 'x-forwarded-for': '2.2.2.2, 10.0.0.1' }
+
+        self.assertEqual(server.event('GET', '/myip', headers, '10.0.0.1')['requestContext']['identity']['sourceIp'], '10.0.0.1')
+        with patch.object(server, 'TRUST_FORWARDED', True):
+            self.assertEqual(server.event('GET', '/myip', headers, '10.0.0.1')['requestContext']['identity']['sourceIp'], '2.2.2.2')
+
+
+    def testSerialize(self):
+        message = server.serialize({ 'statusCode': 429, 'headers': { 'Content-Type': 'text/plain' }, 'body': 'FAIL\nä' }, True)
+
+        self.assertEqual(message, b'HTTP/1.1 429 Too Many Requests\r\nContent-Type: text/plain\r\nContent-Length: 7\r\nConnection: keep-alive\r\n\r\nFAIL\n\xc3\xa4')
+
+
+    def testFlush(self):
+        memory = MemoryDNSProvider()
+        dns = DebouncedDNSProvider(memory, Debouncer(60))
+        dns.debouncer.written['a'] = 1000.0
+        dns.debouncer.pending['a'] = '2.2.2.2'
+
+        with patch.object(dynamicdns.backend, 'current', lambda: (MemoryConfigProvider({}), dns)), patch('time.monotonic', return_value=1010.0):
+            self.assertEqual(server.flush(), {})
+        with patch.object(dynamicdns.backend, 'current', lambda: (MemoryConfigProvider({}), dns)), patch('time.monotonic', return_value=1060.0):
+            self.assertEqual(server.flush(), { 'a': '2.2.2.2' })
+            self.assertEqual(server.flush(), {})
+        self.assertEqual(memory.read('a'), '2.2.2.2')
+
+
+    def testKeepAlive(self):
+        responses = asyncio.run(self.__exchange(
+            b'GET /dynamicdns-v1/myip?raw HTTP/1.1\r\nHost: localhost\r\n\r\n' +
+            b'GET /myip HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n'))
+
+        self.assertEqual(len(responses), 2)
+        self.assertTrue(responses[0].startswith(b'HTTP/1.1 200 OK\r\n'))
+        self.assertIn(b'Connection: keep-alive', responses[0])
+        self.assertTrue(responses[0].endswith(b'\r\n\r\nSUCCESS\n127.0.0.1'))
+        self.assertIn(b'Connection: close', responses[1])
+        self.assertEqual(json.loads(responses[1].split(b'\r\n\r\n')[1]), { 'status': 'SUCCESS', 'message': '127.0.0.1' })
+
+
+    def testUnknownRoute(self):
+        responses = asyncio.run(self.__exchange(b'GET /unknown?raw HTTP/1.0\r\n\r\n'))
+
+        self.assertEqual(len(responses), 1)
+        self.assertTrue(responses[0].endswith(b'FAIL\nResource / Handler mapping not found.'))
+
+
+    def testBadRequests(self):
+        responses = asyncio.run(self.__exchange(b'GET /myip\r\n\r\n'))
+        self.assertTrue(responses[0].startswith(b'HTTP/1.1 400 Bad Request\r\n'))
+
+        responses = asyncio.run(self.__exchange(b'POST /dns HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n'))
+        self.assertTrue(responses[0].startswith(b'HTTP/1.1 411 Length Required\r\n'))
+
+        responses = asyncio.run(self.__exchange(b'POST /dns/batch HTTP/1.1\r\nContent-Length: 2\r\n\r\n\xff\xfe'))
+        self.assertTrue(responses[0].startswith(b'HTTP/1.1 400 Bad Request\r\n'))
+        self.assertTrue(responses[0].endswith(b'"Request body is not UTF-8."}'))
+
+        responses = asyncio.run(self.__exchange(b'GET //[x HTTP/1.1\r\n\r\n'))
+        self.assertTrue(responses[0].startswith(b'HTTP/1.1 400 Bad Request\r\n'))
+        self.assertTrue(responses[0].endswith(b'"Malformed request target."}'))
+
+        responses = asyncio.run(self.__exchange(b'POST /dns HTTP/1.1\r\nContent-Length: 1x\r\n\r\n'))
+        self.assertTrue(responses[0].startswith(b'HTTP/1.1 400 Bad Request\r\n'))
+
+        responses = asyncio.run(self.__exchange(b'POST /dns HTTP/1.1\r\nContent-Length: 2000000\r\n\r\n'))
+        self.assertTrue(responses[0].startswith(b'HTTP/1.1 413 Request Entity Too Large\r\n'))
+
+
+    async def __exchange(self, requests: bytes):
+        instance = server.Server(2, 4, 1.0)
+        listener = await instance.start('127.0.0.1', 0)
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', listener.sockets[0].getsockname()[1])
+            writer.write(requests)
+            await writer.drain()
+            data = await reader.read()
+            writer.close()
+        finally:
+            listener.close()
+            await listener.wait_closed()
+            instance.close()
+        responses = []
+        while data:
+            head, _, rest = data.partition(b'\r\n\r\n')
+            length = [ int(line.split(b':')[1]) for line in head.split(b'\r\n') if line.lower().startswith(b'content-length:') ][0]
+            responses.append(head + b'\r\n\r\n' + rest[:length])
+            data = rest[length:]
+        return responses
+
+
+if __name__ == '__main__':
+    unittest.main()
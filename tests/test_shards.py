@@ -0,0 +1,72 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+from unittest.mock import patch
+
+from dynamicdns import shards
+
+from dynamicdns.shards import Manifest
+
+
+class TestShards(unittest.TestCase):
+
+    HOST = {
+        "route_53_region": "region",
+        "route_53_zone_id": "zone-id",
+        "route_53_record_ttl": 42,
+        "route_53_record_type": "A",
+        "shared_secret": "shared-secret"
+    }
+
+
+    def testShard(self):
+        self.assertEqual(shards.shard('Host.Domain.com', 16), shards.shard('host.domain.com', 16))
+        self.assertTrue(0 <= shards.shard('host.domain.com', 16) < 16)
+        self.assertEqual(Manifest(1, 'prefix/').key('host.domain.com'), 'prefix/00000.json')
+
+
+    def testManifest(self):
+        manifest = shards.manifest({ 'format': 'sharded', 'shards': 8, 'prefix': 'shards/' })
+
+        self.assertEqual(manifest.shards, 8)
+        self.assertEqual(manifest.prefix, 'shards/')
+        self.assertIsNone(shards.manifest({ 'host.domain.com': self.HOST }))
+        self.assertRaises(ValueError, shards.manifest, { 'format': 'sharded', 'shards': 0, 'prefix': 'shards/' })
+        self.assertRaises(ValueError, shards.manifest, { 'format': 'sharded', 'shards': 8 })
+
+
+    def testSplit(self):
+        config = { 'host' + str(i) + '.domain.com': self.HOST for i in range(100) }
+
+        manifest, objects = shards.split(config, 8, 'shards/')
+
+        self.assertEqual(manifest.document(), { 'format': 'sharded', 'shards': 8, 'prefix': 'shards/' })
+        self.assertEqual(len(objects), 8)
+        self.assertEqual(sum(len(shard) for shard in objects.values()), 100)
+        for hostname in config:
+            self.assertIn(hostname, objects[manifest.key(hostname)])
+
+
+    def testSplitInvalid(self):
+        self.assertRaises(ValueError, shards.split, { 'host.domain.com': {} }, 8, 'shards/')
+
+
+    def testMain(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'server.config')
+            with open(path, 'w') as file:
+                json.dump({ 'host.domain.com': self.HOST }, file)
+
+            with patch.object(sys, 'argv', ['shards', '--shards', '2', '--prefix', 'shards/', path, os.path.join(directory, 'out')]):
+                shards.main()
+
+            with open(os.path.join(directory, 'out', 'server.config')) as file:
+                self.assertEqual(json.load(file), { 'format': 'sharded', 'shards': 2, 'prefix': 'shards/' })
+            self.assertEqual(sorted(os.listdir(os.path.join(directory, 'out', 'shards'))), ['00000.json', '00001.json'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import hashlib
+import hmac
+import unittest
+
+from dynamicdns import signing
+
+from unittest.mock import patch
+
+from dynamicdns.signing import KeySchedules, NonceFilter
+
+
+class TestSigning(unittest.TestCase):
+
+
+    def testSign(self):
+        expected = hmac.new(b'secret', b'1.1.1.1\nhost.domain.com\n1000', hashlib.sha256).hexdigest()
+
+        self.assertEqual(signing.sign('secret', '1.1.1.1', 'host.domain.com', '1000', key_schedules=KeySchedules(10)), expected)
+
+
+    def testSignHost(self):
+        expected = hmac.new(b'secret', b'host.domain.com\n1000\nnonce-0001', hashlib.sha256).hexdigest()
+
+        self.assertEqual(signing.sign('secret', None, 'host.domain.com', '1000', 'nonce-0001', key_schedules=KeySchedules(10)), expected)
+
+
+    def testSignInternalIp(self):
+        expected = hmac.new(b'secret', b'1.1.1.1\nhost.domain.com\n1000\nnonce-0001\n10.0.0.1', hashlib.sha256).hexdigest()
+
+        self.assertEqual(signing.sign('secret', '1.1.1.1', 'host.domain.com', '1000', 'nonce-0001', '10.0.0.1', key_schedules=KeySchedules(10)), expected)
+        self.assertEqual(signing.sign('secret', '1.1.1.1', 'host.domain.com', '1000', 'nonce-0001', ""), signing.sign('secret', '1.1.1.1', 'host.domain.com', '1000', 'nonce-0001'))
+
+
+    def testSignDualStack(self):
+        expected = hmac.new(b'secret', b'host.domain.com\n1000\nnonce-0001\nipv4=1.1.1.1\nipv6=2001:db8::1', hashlib.sha256).hexdigest()
+
+        self.assertEqual(signing.sign('secret', None, 'host.domain.com', '1000', 'nonce-0001', "", '1.1.1.1', '2001:db8::1', key_schedules=KeySchedules(10)), expected)
+        self.assertNotEqual(signing.sign('secret', None, 'host.domain.com', '1000', 'nonce-0001', "", None, '2001:db8::1'), signing.sign('secret', None, 'host.domain.com', '1000', 'nonce-0001', "", '2001:db8::1', None))
+
+
+    def testLegacy(self):
+        self.assertEqual(signing.legacy('1234567890', '1.1.1.1', 'host.domain.com'), 'f5f9b9b2f166aa50e3bba3200857ed9fbfc1feccdc7ac2fce9796e55cba82cda')
+
+
+    def testKeySchedulesCopied(self):
+        schedules = KeySchedules(1)
+
+        first = schedules.get('secret')
+        first.update(b'message')
+        second = schedules.get('secret')
+
+        self.assertIsNot(first, second)
+        self.assertEqual(second.hexdigest(), hmac.new(b'secret', digestmod=hashlib.sha256).hexdigest())
+
+        schedules.get('other')
+        self.assertEqual(list(schedules.entries), [ 'other' ])
+
+
+    def testNonceFilter(self):
+        nonces = NonceFilter(60, 1000, 0.001)
+
+        self.assertEqual((nonces.bits, nonces.hashes), (14378, 10))
+        self.assertFalse(nonces.seen('a'))
+        self.assertTrue(nonces.add('a'))
+        self.assertTrue(nonces.seen('a'))
+        self.assertFalse(nonces.add('a'))
+        self.assertFalse(nonces.seen('b'))
+        self.assertFalse(nonces.shared())
+        self.assertTrue(NonceFilter(60, 1000, 0.001, single_process=True).shared())
+
+
+    def testNonceFilterRotation(self):
+        with patch('time.monotonic', return_value=0):
+            nonces = NonceFilter(60, 1000, 0.001)
+            nonces.add('a')
+        with patch('time.monotonic', return_value=60):
+            self.assertTrue(nonces.seen('a'))
+            nonces.add('b')
+        with patch('time.monotonic', return_value=120):
+            self.assertFalse(nonces.seen('a'))
+            self.assertTrue(nonces.seen('b'))
+        with patch('time.monotonic', return_value=300):
+            self.assertFalse(nonces.seen('b'))
+
+
+    def testNonceFilterErrorRate(self):
+        nonces = NonceFilter(60, 1000, 0.01)
+        for i in range(1000):
+            nonces.add('nonce-' + str(i))
+
+        false_positives = sum(nonces.seen('other-' + str(i)) for i in range(10000))
+
+        self.assertLess(false_positives, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
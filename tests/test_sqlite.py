@@ -0,0 +1,153 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from dynamicdns import sqlite
+from dynamicdns.models import Error, HostNotFound, RecordType
+
+
+CONFIG = {
+    'a.example.com': {
+        'route_53_region': 'region',
+        'route_53_zone_id': 'zone-id',
+        'route_53_record_ttl': 42,
+        'route_53_record_type': 'A',
+        'shared_secret': 'secret-a'
+    },
+    'b.example.com': {
+        'route_53_region': 'region',
+        'route_53_zone_id': 'zone-id',
+        'route_53_record_ttl': 60,
+        'route_53_record_type': 'AAAA',
+        'shared_secret': 'secret-b'
+    },
+    'c.example.org': {
+        'route_53_region': 'region',
+        'route_53_zone_id': 'other-zone-id',
+        'route_53_record_ttl': 60,
+        'route_53_record_type': 'A',
+        'shared_secret': 'secret-c'
+    }
+}
+
+
+class TestSQLite(unittest.TestCase):
+
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database = sqlite.Database(os.path.join(self.directory.name, 'dynamicdns.db'))
+        sqlite.import_config(self.database, CONFIG)
+        self.config = sqlite.SQLiteConfigProvider(self.database)
+        self.dns = sqlite.SQLiteDNSProvider(self.database, self.config)
+
+
+    def tearDown(self):
+        self.database.connection().close()
+        self.directory.cleanup()
+
+
+    def testWAL(self):
+        self.assertEqual(self.database.connection().execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+
+
+    def testConfigProvider(self):
+        self.assertIsNone(self.config.load())
+        self.assertIsNone(self.config.cached('a.example.com'))
+
+        host = self.config.host('a.example.com')
+        self.assertEqual(host.route_53_zone_id, 'zone-id')
+        self.assertEqual(host.route_53_record_ttl, 42)
+        self.assertEqual(host.route_53_record_type, RecordType.A)
+        self.assertEqual(self.config.shared_secret('b.example.com'), 'secret-b')
+        self.assertIs(self.config.cached('a.example.com'), host)
+        with self.assertRaises(HostNotFound):
+            self.config.host('unknown.example.com')
+
+
+    def testImportInvalid(self):
+        with self.assertRaises(ValueError):
+            sqlite.import_config(self.database, { 'd.example.com': { 'shared_secret': 'secret-d' } })
+
+        with self.assertRaises(HostNotFound):
+            self.config.host('d.example.com')
+
+
+    def testDNSProvider(self):
+        self.assertEqual(self.dns.read('a.example.com'), '')
+        self.assertEqual(self.dns.update('a.example.com', '1.1.1.1'), '1.1.1.1')
+        self.assertEqual(self.dns.read('a.example.com'), '1.1.1.1')
+        self.assertEqual(self.dns.update('a.example.com', '2.2.2.2'), '2.2.2.2')
+        self.assertEqual(self.dns.read('a.example.com'), '2.2.2.2')
+
+        self.assertTrue(isinstance(self.dns.read('unknown.example.com'), Error))
+        self.assertEqual(str(self.dns.update('unknown.example.com', '1.1.1.1')), "Update of DNS record failed. Exception: Configuration for hostname 'unknown.example.com' not found.")
+
+
+    def testUpdateBatch(self):
+        results = self.dns.update_batch({ 'a.example.com': '1.1.1.1', 'b.example.com': '::1', 'unknown.example.com': '3.3.3.3' })
+
+        self.assertEqual(results['a.example.com'], '1.1.1.1')
+        self.assertEqual(results['b.example.com'], '::1')
+        self.assertTrue(isinstance(results['unknown.example.com'], Error))
+        self.assertEqual(self.dns.read('b.example.com'), '::1')
+
+
+    def testUpdateBatchRolledBack(self):
+        self.dns.update('a.example.com', '1.1.1.1')
+        self.database.connection().execute("CREATE TRIGGER fail BEFORE INSERT ON records WHEN NEW.hostname = 'b.example.com' BEGIN SELECT RAISE(ABORT, 'failed'); END")
+
+        results = self.dns.update_batch({ 'a.example.com': '2.2.2.2', 'b.example.com': '::1' })
+
+        self.assertTrue(isinstance(results['a.example.com'], Error))
+        self.assertTrue(isinstance(results['b.example.com'], Error))
+        self.assertEqual(self.dns.read('a.example.com'), '1.1.1.1')
+
+
+    def testRecords(self):
+        self.assertEqual(self.dns.update_records('a.example.com', { 'A': '1.1.1.1', 'AAAA': '::1' }), { 'A': '1.1.1.1', 'AAAA': '::1' })
+        self.assertEqual(self.dns.read_records('a.example.com', [ 'A', 'AAAA' ]), { 'A': '1.1.1.1', 'AAAA': '::1' })
+        self.assertEqual(self.dns.read_records('b.example.com', [ 'AAAA' ]), { 'AAAA': '' })
+        self.assertTrue(isinstance(self.dns.read_records('unknown.example.com', [ 'A' ]), Error))
+
+
+    def testThreads(self):
+        results = []
+        def update():
+            dns = sqlite.SQLiteDNSProvider(self.database, sqlite.SQLiteConfigProvider(self.database))
+            results.append(dns.update('a.example.com', '1.1.1.1'))
+            dns.database.connection().close()
+
+        threads = [ threading.Thread(target=update) for _ in range(4) ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [ '1.1.1.1' ] * 4)
+        self.assertEqual(self.dns.read('a.example.com'), '1.1.1.1')
+
+
+    def testExport(self):
+        self.dns.update_batch({ 'a.example.com': '1.1.1.1', 'b.example.com': '::1', 'c.example.org': '3.3.3.3' })
+
+        lines = sqlite.export(self.database, 'zone-id', 'example.com').splitlines()
+
+        self.assertTrue(lines[0].startswith("; Records of zone zone-id exported "))
+        self.assertEqual(lines[1:], [
+            "$ORIGIN example.com.",
+            "a.example.com.\t42\tIN\tA\t1.1.1.1",
+            "b.example.com.\t60\tIN\tAAAA\t::1"
+        ])
+
+
+    def testDatabase(self):
+        path = os.path.join(self.directory.name, 'shared.db')
+
+        self.assertIs(sqlite.database(path), sqlite.database(path))
+        sqlite.databases.pop(path)
+
+
+if __name__ == '__main__':
+    unittest.main()